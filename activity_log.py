@@ -0,0 +1,299 @@
+# activity_log.py — Registro de actividad sin bloqueo: cola, hilo escritor, JSON por lotes y rotación
+import atexit
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler
+from typing import Dict, List, Optional
+
+# Atributos propios de LogRecord: el resto son campos 'extra' y van tal cual al JSON
+_STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro: ts, level, logger, thread, msg, campos 'extra' y exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        attrs = record.__dict__
+        rec = {"ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+               "level": record.levelname, "logger": record.name, "thread": record.threadName,
+               "msg": record.getMessage()}
+        for k in attrs.keys() - _STANDARD:
+            if not k.startswith("_"):
+                rec[k] = attrs[k]
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            rec["exc"] = record.exc_text
+        return json.dumps(rec, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Encola sin esperar nunca: con 'capacity' registros pendientes, el siguiente se descarta y se cuenta."""
+
+    def __init__(self, q: "queue.SimpleQueue", capacity: int):
+        super().__init__(q)
+        self.capacity = capacity
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Solo se congela el mensaje (los argumentos pueden cambiar después); campos 'extra' y JSON
+        # los resuelve el escritor. Sin copia: el resto de handlers ve el mismo mensaje ya resuelto.
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.queue.qsize() >= self.capacity:
+            self.dropped += 1
+        else:
+            self.queue.put(record)
+
+
+class RotatingWriter:
+    """Archivo de líneas que rota por tamaño ('max_bytes') o por tiempo ('interval' segundos).
+
+    Los rotados se renombran con la fecha (activity.20261017-120000.jsonl), opcionalmente se
+    comprimen con gzip y se conservan los 'backups' más recientes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 << 20, interval: float = 86400.0,
+                 backups: int = 7, compress: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backups = backups
+        self.compress = compress
+        self.rotations = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._open()
+
+    def _started(self) -> float:
+        """Fecha del primer registro del archivo actual (la rotación por tiempo cuenta desde ahí)."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return datetime.fromisoformat(json.loads(f.readline())["ts"]).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            return os.path.getmtime(self.path)
+
+    def _open(self):
+        self._f = open(self.path, "a", encoding="utf-8")
+        self._size = self._f.tell()
+        started = self._started() if self._size else time.time()
+        self._rollover_at = started + self.interval if self.interval else float("inf")
+
+    def _rotated_name(self) -> str:
+        base, ext = os.path.splitext(self.path)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        name, n = f"{base}.{stamp}{ext}", 1
+        while os.path.exists(name) or os.path.exists(name + ".gz"):
+            n += 1
+            name = f"{base}.{stamp}-{n}{ext}"
+        return name
+
+    def rotate(self):
+        self._f.close()
+        target = self._rotated_name()
+        try:
+            os.replace(self.path, target)
+            if self.compress:
+                with open(target, "rb") as src, gzip.open(target + ".gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(target)
+            self.rotations += 1
+        except OSError as e:
+            # Otro proceso con el archivo abierto (Windows): se sigue escribiendo en el mismo
+            logging.getLogger("driveraid.log").debug("No se pudo rotar %s: %s", self.path, e)
+        self._prune()
+        self._open()
+
+    def _prune(self):
+        base, ext = os.path.splitext(self.path)
+        old = sorted(glob.glob(f"{glob.escape(base)}.*{ext}") + glob.glob(f"{glob.escape(base)}.*{ext}.gz"),
+                     key=os.path.getmtime)
+        for p in old[:max(0, len(old) - self.backups)]:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+    def _append(self, lines: List[str]):
+        if lines:
+            data = "\n".join(lines) + "\n"
+            self._f.write(data)
+            self._size += len(data)
+
+    def write(self, lines: List[str]):
+        """Escribe un lote de líneas; rota antes de la que haría pasar el archivo de 'max_bytes'."""
+        if self._size and time.time() >= self._rollover_at:
+            self.rotate()
+        start, size = 0, self._size
+        for i, line in enumerate(lines):
+            n = len(line) + 1
+            if size and size + n > self.max_bytes:
+                self._append(lines[start:i])
+                self.rotate()
+                start, size = i, 0
+            size += n
+        self._append(lines[start:])
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+class ActivityLog:
+    """Cola + hilo escritor: quien registra solo encola; el hilo formatea y escribe por lotes.
+
+    El escritor espera a que la ráfaga se calme ('linger' sin registros nuevos, como mucho
+    'max_delay' segundos o hasta media cola): formatear JSON a la vez que el escaneo le
+    quitaría el GIL. Cada lote (hasta 'batch_size' registros) se escribe con una sola llamada.
+    La cola está acotada ('capacity'): si el disco no da abasto se descartan registros y se
+    deja constancia en el archivo, en vez de frenar el escaneo o la instalación.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 << 20, interval: float = 86400.0, backups: int = 7,
+                 compress: bool = False, batch_size: int = 1000, capacity: int = 100_000,
+                 linger: float = 0.05, max_delay: float = 1.0):
+        self.queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self.handler = DroppingQueueHandler(self.queue, capacity)
+        self.writer = RotatingWriter(path, max_bytes, interval, backups, compress)
+        self.formatter = JsonFormatter()
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_delay = max_delay
+        self.high_water = max(1, capacity // 2)
+        self.written = 0
+        self.batches = 0
+        self._reported_drops = 0
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="activity-log", daemon=True)
+        self._thread.start()
+
+    def _format(self, records: List[logging.LogRecord]) -> List[str]:
+        lines = []
+        for r in records:
+            try:
+                lines.append(self.formatter.format(r))
+            except Exception as e:  # un 'extra' que ni str() acepta no debe perder el lote
+                lines.append(json.dumps({"level": "ERROR", "logger": "driveraid.log",
+                                         "msg": f"registro ilegible de {r.name}: {e}"}))
+        dropped = self.handler.dropped
+        if dropped > self._reported_drops:
+            lines.append(json.dumps({"ts": datetime.now().isoformat(timespec="milliseconds"),
+                                     "level": "WARNING", "logger": "driveraid.log",
+                                     "msg": f"{dropped - self._reported_drops} registros descartados (cola llena)"}))
+            self._reported_drops = dropped
+        return lines
+
+    def _write(self, batch: List[logging.LogRecord]):
+        try:
+            self.writer.write(self._format(batch))
+        except (OSError, ValueError):
+            # Disco lleno, sin permisos o archivo ya cerrado: el registro nunca debe tumbar la aplicación
+            pass
+        self.written += len(batch)
+        self.batches += 1
+
+    def _wait_lull(self):
+        deadline = time.monotonic() + self.max_delay
+        seen = self.queue.qsize()
+        while not self._stopping and seen < self.high_water and time.monotonic() < deadline:
+            time.sleep(self.linger)
+            n = self.queue.qsize()
+            if n == seen:
+                return
+            seen = n
+
+    def _run(self):
+        q = self.queue
+        while True:
+            pending = [q.get()]
+            self._wait_lull()
+            pending.extend(q.get() for _ in range(q.qsize()))
+            batch: List[logging.LogRecord] = []
+            for item in pending:
+                if isinstance(item, logging.LogRecord):
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        self._write(batch)
+                        batch = []
+                    continue
+                if batch:
+                    self._write(batch)
+                    batch = []
+                if item is None:  # centinela de stop()
+                    return
+                item.set()  # marca de flush()
+            if batch:
+                self._write(batch)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que todo lo encolado hasta ahora esté escrito."""
+        if not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread.is_alive():
+            self._stopping = True
+            self.queue.put(None)
+            self._thread.join(timeout)
+        if not self._thread.is_alive():  # un escritor aún ocupado no debe encontrarse el archivo cerrado
+            self.writer.close()
+
+
+# -------------------- Niveles por subsistema --------------------
+def parse_levels(spec: str) -> Dict[str, int]:
+    """'scan=DEBUG,install=WARNING' -> {'driveraid.scan': 10, 'driveraid.install': 30}.
+
+    Un nombre sin punto es un subsistema de DriverAid; 'root' es el nivel general.
+    """
+    out: Dict[str, int] = {}
+    for part in (spec or "").split(","):
+        name, sep, level = part.partition("=")
+        name, level = name.strip(), level.strip().upper()
+        value = logging.getLevelName(level) if sep else None
+        if not name or not isinstance(value, int):
+            continue
+        if name == "root":
+            out[""] = value
+        else:
+            out[name if "." in name else f"driveraid.{name}"] = value
+    return out
+
+
+def apply_levels(spec: str) -> Dict[str, int]:
+    levels = parse_levels(spec)
+    for name, value in levels.items():
+        logging.getLogger(name or None).setLevel(value)
+    return levels
+
+
+_active: Optional[ActivityLog] = None
+
+
+def install(path: str, level: int = logging.INFO, levels: str = "", **options) -> ActivityLog:
+    """Conecta el registro de actividad al logger raíz (una sola vez por proceso).
+
+    'levels' ajusta subsistemas concretos (ver parse_levels); las opciones van a ActivityLog.
+    """
+    global _active
+    if _active is None:
+        _active = ActivityLog(path, **options)
+        root = logging.getLogger()
+        root.addHandler(_active.handler)
+        root.setLevel(level)
+        atexit.register(_active.stop)
+    apply_levels(levels)
+    return _active
@@ -0,0 +1,465 @@
+# bench.py — Benchmarks de DriverAid con datos sintéticos (no requiere Windows)
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from driver_table import DriverTable
+from installer import InstallScheduler
+from matching import UpdateIndex
+from report import export_report
+from scan_pipeline import delayed, delayed_call
+from sim_backend import Driver, SimBackend, synthetic_data
+from versions import compare_many, version_key
+
+VENDORS = ["Intel", "Realtek", "AMD", "NVIDIA", "Broadcom", "Qualcomm", "Microsoft", "Synaptics", "Logitech", "HP"]
+CLASSES = ["Network Adapter", "Audio", "Display", "Bluetooth", "Chipset", "Storage", "Touchpad", "Camera", "USB Hub"]
+
+
+def _synthetic(n_drivers: int, n_titles: int, seed: int = 7):
+    rnd = random.Random(seed)
+    drivers = []
+    for i in range(n_drivers):
+        vendor = rnd.choice(VENDORS)
+        dev = f"{vendor} {rnd.choice(CLASSES)} {i:05d}"
+        drivers.append(Driver(i + 1, dev, vendor, "1.0.0.0", "", f"PCI\\VEN_{i % 0xFFFF:04X}&DEV_{i:04X}"))
+    updates = []
+    # Solo algunos fabricantes publican updates: el resto de drivers no debe coincidir
+    publishing = set(VENDORS[:3])
+    candidates = [d for d in drivers if d.provider in publishing] or drivers
+    for j in range(n_titles):
+        d = rnd.choice(candidates)
+        updates.append({"Title": f"{d.provider} - {d.device.split(' ', 1)[1]} - {rnd.randint(1, 40)}.0.{j}"})
+    return drivers, updates
+
+
+def _naive(drivers, updates):
+    titles = [u.get("Title", "") for u in updates]
+    out = []
+    for drv in drivers:
+        low_dev = drv.device.lower() if drv.device else ""
+        low_prov = drv.provider.lower() if drv.provider else ""
+        out.append(any((low_dev and low_dev in t.lower()) or (low_prov and low_prov in t.lower()) for t in titles))
+    return out
+
+
+def bench_matching(drivers: int = 10000, titles: int = 5000):
+    drv, upd = _synthetic(drivers, titles)
+    t0 = time.perf_counter()
+    idx = UpdateIndex(upd)
+    t1 = time.perf_counter()
+    matched = sum(m is not None for m in idx.match_all(drv))
+    t2 = time.perf_counter()
+    print(f"matching {drivers} drivers x {titles} títulos")
+    print(f"  índice: build {t1 - t0:.3f}s, match {t2 - t1:.3f}s, coincidencias {matched}")
+    # El método original es cuadrático: se mide sobre una muestra y se extrapola
+    sample = max(1, min(drivers, 200))
+    picked = random.Random(1).sample(drv, sample)
+    t3 = time.perf_counter()
+    _naive(picked, upd)
+    t4 = time.perf_counter()
+    print(f"  lineal (estimado): {(t4 - t3) * drivers / sample:.3f}s")
+
+
+def _driver_stream(n: int):
+    for i in range(n):
+        latest = "1.0.0.1" if i % 10 == 0 else "1.0.0.0"  # ~10 % desactualizados
+        d = Driver(i + 1, f"Dispositivo sintético {i}", VENDORS[i % len(VENDORS)], "1.0.0.0", latest,
+                   f"PCI\\VEN_{i % 0xFFFF:04X}&DEV_{i:04X}")
+        d.refresh_status()
+        yield d
+
+
+def bench_export(sizes=(10_000, 100_000, 1_000_000)):
+    """Tiempo sin trazar y pico de memoria con tracemalloc (que ralentiza mucho) en pasadas separadas."""
+    print("export_report en streaming (HTML + CSV + JSONL)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            folder = os.path.join(tmp, str(n))
+            os.makedirs(folder)
+            t0 = time.perf_counter()
+            paths = export_report(_driver_stream(n), folder, "benchmark")
+            elapsed = time.perf_counter() - t0
+            size = sum(os.path.getsize(p) for p in paths)
+            for p in paths:
+                os.remove(p)
+            tracemalloc.start()
+            paths = export_report(_driver_stream(n), folder, "benchmark")
+            _cur, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            for p in paths:
+                os.remove(p)
+            print(f"  {n:>9} filas: {elapsed:7.2f}s, pico {peak / 1024:8.1f} KiB, salida {size / 2**20:8.1f} MiB")
+
+
+def _measure(fn):
+    """(resultado, segundos, bytes retenidos según tracemalloc)."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    cur, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, cur
+
+
+def _timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_table(sizes=(100_000, 1_000_000)):
+    """DriverTable frente a la lista de dataclasses Driver: memoria retenida y operaciones típicas."""
+    print("DriverTable vs List[Driver]")
+    for n in sizes:
+        def build_list():
+            return list(_driver_stream(n))
+
+        def build_table():
+            t = DriverTable()
+            for d in _driver_stream(n):
+                t.append(d.id, d.device, d.provider, d.version_installed, d.version_latest,
+                         d.hardware_id, d.status, d.manual_link)
+            return t
+
+        lst, _t, mem_list = _measure(build_list)
+        tbl, _t, mem_table = _measure(build_table)
+        ids = random.Random(3).sample(range(1, n + 1), 10_000)
+        by_id = lambda: [next(d for d in lst if d.id == i) for i in ids[:20]]  # búsqueda lineal original
+        print(f"  {n:>9} filas")
+        print(f"    memoria       lista {mem_list / 2**20:8.1f} MiB | tabla {mem_table / 2**20:8.1f} MiB")
+        print(f"    outdated()    lista {_timed(lambda: [d for d in lst if d.status == 'Desactualizado']):8.4f}s"
+              f" | tabla {_timed(tbl.outdated):8.4f}s")
+        print(f"    10k por ID    lista {_timed(by_id, 1) * 500:8.4f}s (est.)"
+              f" | tabla {_timed(lambda: [tbl.get(i) for i in ids]):8.4f}s")
+        print(f"    recorrido     lista {_timed(lambda: [(d.device, d.status) for d in lst]):8.4f}s"
+              f" | tabla {_timed(lambda: [(d.device, d.status) for d in tbl]):8.4f}s"
+              f" | columnas {_timed(lambda: list(tbl.columns('device', 'status'))):8.4f}s")
+        del lst, tbl
+
+
+def bench_versions(rows: int = 1_000_000, distinct: int = 5_000):
+    """Clasificación por lotes de un inventario de flota (muchas versiones repetidas)."""
+    rnd = random.Random(5)
+    pool = [f"{rnd.randint(1, 31)}.{rnd.randint(0, 9)}.{rnd.randint(0, 999)}.{rnd.randint(0, 9999)}"
+            for _ in range(distinct)]
+    pairs = [(rnd.choice(pool), rnd.choice(pool)) for _ in range(rows)]
+    version_key.cache_clear()
+    t0 = time.perf_counter()
+    res = compare_many(pairs)
+    t1 = time.perf_counter()
+    info = version_key.cache_info()
+    print(f"compare_many: {rows} pares en {t1 - t0:.3f}s "
+          f"({res.count(-1)} older, {res.count(0)} equal, {res.count(1)} newer; "
+          f"caché {info.hits} hits / {info.misses} misses)")
+
+
+def bench_history(snapshots: int = 2_000, drivers: int = 500, hosts: int = 50):
+    """Historial SQLite: inserción por lotes de muchos snapshots y latencia de consultas/deltas."""
+    from history import HistoryStore
+
+    rnd = random.Random(11)
+    fleet = [synthetic_data(drivers, seed=h) for h in range(hosts)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.sqlite")
+        store = HistoryStore(path)
+
+        def batches(size: int = 100):
+            batch = []
+            for i in range(snapshots):
+                h = i % hosts
+                inv = fleet[h]
+                # Entre snapshots de un equipo cambia ~2 % de los drivers (subidas y alguna bajada)
+                for d in rnd.sample(inv, max(1, drivers // 50)):
+                    d.version_installed = d.version_latest if rnd.random() < 0.9 else "1.0.0.0"
+                    d.refresh_status()
+                day, sec = divmod(i, hosts)
+                batch.append((f"PC-{h:03d}", inv, f"2024-01-01T00:00:00+{day:05d}.{sec:03d}"))
+                if len(batch) == size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        t0 = time.perf_counter()
+        for batch in batches():
+            store.record_many(batch, mode="benchmark")
+        elapsed = time.perf_counter() - t0
+        rows = snapshots * drivers
+        print(f"historial: {snapshots} snapshots x {drivers} drivers en {hosts} equipos")
+        print(f"  inserción    {elapsed:7.2f}s ({rows / elapsed:,.0f} filas/s), "
+              f"base {os.path.getsize(path) / 2**20:.1f} MiB")
+
+        host = "PC-007"
+        snaps = store.snapshots(host=host, limit=snapshots)
+        pairs = [(snaps[i + 1].id, snaps[i].id) for i in range(min(20, len(snaps) - 1))]
+        delta_s = _timed(lambda: [store.delta(a, b) for a, b in pairs], 1) / max(1, len(pairs))
+        last = store.delta(snaps[-1].id, snaps[0].id)
+        print(f"  delta        {delta_s * 1000:7.2f} ms entre snapshots consecutivos; "
+              f"primero -> último: {last.summary()}")
+        print(f"  latest       {_timed(lambda: store.latest(host)) * 1000:7.2f} ms")
+        found = store.find(provider="Realtek", limit=100_000)
+        print(f"  find         {_timed(lambda: store.find(provider='Realtek', limit=100_000)) * 1000:7.2f} ms "
+              f"(Realtek en el último snapshot de cada equipo: {len(found)} filas)")
+        print(f"  find below   {_timed(lambda: store.find(provider='Realtek', below='10.50.5.5000', limit=100_000)) * 1000:7.2f} ms")
+        hwid = fleet[7][0].hardware_id
+        print(f"  timeline     {_timed(lambda: store.timeline(hwid, limit=snapshots)) * 1000:7.2f} ms")
+        store.close()
+
+
+def bench_catalog(entries: int = 200_000, drivers: int = 20_000):
+    """Catálogo local: compilación, apertura y resolución en bloque de version_latest para un inventario."""
+    from catalog import CatalogEntry, LocalCatalog, compile_catalog
+
+    devices = synthetic_data(entries, seed=5)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.bin")
+        # La mitad de las entradas usa el ID genérico (VEN&DEV): el driver cae a esa variante
+        rows = [CatalogEntry(d.hardware_id if i % 2 else "&".join(d.hardware_id.split("&")[:2]),
+                             d.version_latest, d.provider, "", d.device) for i, d in enumerate(devices)]
+        compile_s = _timed(lambda: compile_catalog(rows, path), 1)
+        print(f"catálogo: {entries} HWIDs, {os.path.getsize(path) / 2**20:.1f} MiB")
+        print(f"  compilar     {compile_s:7.2f}s")
+        print(f"  abrir        {_timed(lambda: LocalCatalog(path).close()) * 1000:7.2f} ms")
+        with LocalCatalog(path) as cat:
+            hwids = [d.hardware_id for d in devices[:drivers]]
+            found = sum(1 for e in cat.resolve(hwids) if e is not None)
+            print(f"  resolver     {_timed(lambda: cat.resolve(hwids)) * 1000:7.2f} ms para {drivers} drivers "
+                  f"({found} resueltos)")
+            cat.add(rows[:1000])
+            print(f"  delta        {_timed(lambda: cat.add([r._replace(version='99.0') for r in rows[:1000]]), 1) * 1000:7.2f} ms "
+                  f"para 1000 entradas")
+
+
+def bench_pipeline(drivers: int = 600, enum_s: float = 1.0, updates_s: float = 1.5):
+    """Escaneo en tubería frente a secuencial con latencias simuladas (WMI por fila, búsqueda de updates)."""
+    devices = synthetic_data(drivers, seed=3)
+    backend = SimBackend(devices=devices)
+    backend.enum_latency, backend.updates_latency = enum_s / drivers, updates_s
+    # Secuencial: las mismas fuentes con latencia, primero la enumeración y después la búsqueda
+    sequential = _timed(lambda: (list(delayed(devices, backend.enum_latency)),
+                                 delayed_call([], backend.updates_latency)()), 1)
+    t0 = time.perf_counter()
+    first = None
+    for _ in backend.scan_iter():
+        if first is None:
+            first = time.perf_counter() - t0
+    total = time.perf_counter() - t0
+    print(f"escaneo: {drivers} drivers, enumeración {enum_s:.1f}s, updates {updates_s:.1f}s")
+    print(f"  secuencial   {sequential:7.2f}s")
+    print(f"  en tubería   {total:7.2f}s (primer driver a los {first * 1000:.0f} ms)")
+
+
+def bench_logging(drivers: int = 20_000):
+    """scan y update_all con un registro por driver: sin registro, archivo síncrono y registro en cola.
+
+    'solo crear' usa un handler que no hace nada: es lo que cuesta el propio logging (LogRecord),
+    el mínimo al que puede aspirar cualquier destino.
+    """
+    import logging
+    from activity_log import ActivityLog, JsonFormatter
+
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    scan_log = logging.getLogger("driveraid.scan")
+    devices = synthetic_data(drivers, seed=9)
+    with tempfile.TemporaryDirectory() as tmp:
+        def run(label, handler, level, flush=lambda: None, repeat=3):
+            root.handlers[:] = [handler] if handler else []
+            root.setLevel(level)
+            scan_log.setLevel(logging.DEBUG if handler else logging.NOTSET)
+            scan_s = update_s = float("inf")
+            drain_s = 0.0
+            for _ in range(repeat):  # mejor de 'repeat' (update_all necesita un backend nuevo)
+                backend = SimBackend(devices=[d.__class__(**vars(d)) for d in devices])
+                flush()
+                scan_s = min(scan_s, _timed(backend.scan, 1))
+                drain_s += _timed(flush, 1)  # lo pendiente se escribe antes del paso siguiente
+                update_s = min(update_s, _timed(backend.update_all, 1))
+                drain_s += _timed(flush, 1)
+            print(f"  {label:<13} scan {scan_s * 1000:8.1f} ms   update_all {update_s * 1000:8.1f} ms", end="")
+            return drain_s / repeat
+
+        print(f"registro de actividad: {drivers} drivers (un registro por driver en scan y en update_all)")
+        try:
+            run("sin registro", None, logging.WARNING)
+            print()
+            run("solo crear", logging.NullHandler(), logging.INFO)
+            print()
+            sync = logging.FileHandler(os.path.join(tmp, "sync.jsonl"), encoding="utf-8")
+            sync.setFormatter(JsonFormatter())
+            run("síncrono", sync, logging.INFO)
+            sync.close()
+            print()
+            activity = ActivityLog(os.path.join(tmp, "activity.jsonl"), max_bytes=8 << 20)
+            drain_s = run("en cola", activity.handler, logging.INFO, activity.flush)
+            activity.stop()
+            print(f"   (+{drain_s * 1000:.0f} ms después en el hilo escritor; {activity.written} registros en "
+                  f"{activity.batches} lotes, {activity.writer.rotations} rotaciones, "
+                  f"{activity.handler.dropped} descartados)")
+        finally:
+            root.handlers[:], _ = saved[0], root.setLevel(saved[1])
+            scan_log.setLevel(logging.NOTSET)
+
+
+# -------------------- Suite sobre SimBackend --------------------
+SUITE_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), "reports", "bench-results.json")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "bench-baseline.json")
+
+
+class _NullInstaller:
+    """Descarga e instala sin hacer nada: install_plan mide solo el planificador (plan, lotes, resultados)."""
+    parallel_downloads = False
+
+    def download(self, item):
+        pass
+
+    def install(self, items):
+        return {item.key: (True, "") for item in items}
+
+
+def _suite_steps(backend: SimBackend, folder: str, rnd: random.Random):
+    """Escenarios en orden; update_all va al final porque deja todo actualizado."""
+    from main import print_table
+
+    def table():
+        with open(os.devnull, "w", encoding="utf-8") as null, redirect_stdout(null):
+            print_table(backend.drivers)
+
+    def export():
+        for p in backend.export_report(folder):
+            os.remove(p)
+
+    n = len(backend.drivers)
+    # (nombre, función, repetible): los pasos sin efectos se miden varias veces y se toma el mínimo
+    return [
+        ("scan", backend.scan, True),
+        ("outdated", lambda: list(backend.outdated()), True),
+        ("update_one", lambda: backend.update_one(rnd.randint(1, n)), False),
+        ("manual_links", backend.manual_links, True),
+        ("export_report", export, True),
+        ("print_table", table, True),
+        ("install_plan", lambda: InstallScheduler(_NullInstaller()).run(backend.plan_updates()[0]), True),
+        ("update_all", backend.update_all, False),
+    ]
+
+
+def run_suite(sizes=SUITE_SIZES, seed: int = 0, memory: bool = True) -> dict:
+    """Tiempo de cada escenario y, en una segunda pasada con tracemalloc, memoria pico y asignaciones."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            t0 = time.perf_counter()
+            devices = synthetic_data(n, seed)
+            backend = SimBackend(devices)
+            print(f"{n:>9} drivers (preparación {time.perf_counter() - t0:.2f}s)")
+            rows = {}
+            for name, step, repeatable in _suite_steps(backend, tmp, random.Random(seed)):
+                wall = _timed(step, 3 if repeatable and n <= 100_000 else 1)
+                rows[name] = {"size": n, "scenario": name, "wall_s": round(wall, 6)}
+            if memory:
+                backend = SimBackend(synthetic_data(n, seed))
+                for name, step, _rep in _suite_steps(backend, tmp, random.Random(seed)):
+                    blocks = sys.getallocatedblocks()
+                    tracemalloc.start()
+                    step()
+                    _cur, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    rows[name]["peak_kib"] = round(peak / 1024, 1)
+                    rows[name]["alloc_blocks"] = sys.getallocatedblocks() - blocks
+            del backend, devices
+            for r in rows.values():
+                extra = f" pico {r['peak_kib']:>10.1f} KiB, bloques netos {r['alloc_blocks']:>8}" if memory else ""
+                print(f"    {r['scenario']:<14} {r['wall_s']:9.4f}s{extra}")
+            results.extend(rows.values())
+    return {
+        "meta": {"date": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                 "platform": platform.platform(), "seed": seed},
+        "results": results,
+    }
+
+
+def compare_baseline(current: dict, baseline: dict, tolerance: float) -> list:
+    """Escenarios cuyo tiempo supera al de la línea base en más de 'tolerance' (fracción)."""
+    base = {(r["size"], r["scenario"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in current["results"]:
+        b = base.get((r["size"], r["scenario"]))
+        # Diferencias de pocos milisegundos son ruido: no se consideran regresión
+        if b and r["wall_s"] - b["wall_s"] > 0.005 and r["wall_s"] > b["wall_s"] * (1 + tolerance):
+            regressions.append((r, b))
+    return regressions
+
+
+def suite_main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="bench.py suite", description="Suite de escala sobre SimBackend")
+    ap.add_argument("--sizes", default=",".join(str(n) for n in SUITE_SIZES),
+                    help="tamaños separados por comas (admite k/M: 1k,10k,1M)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=RESULTS_PATH, help="archivo JSON de resultados")
+    ap.add_argument("--baseline", default=BASELINE_PATH if os.path.exists(BASELINE_PATH) else None,
+                    help="JSON de referencia con el que comparar (por defecto bench-baseline.json)")
+    ap.add_argument("--save-baseline", action="store_true", help="guardar estos resultados como nueva línea base")
+    ap.add_argument("--tolerance", type=float, default=0.5, help="margen permitido sobre la línea base (0.5 = 50 %%)")
+    ap.add_argument("--no-memory", action="store_true", help="omitir la pasada de memoria (más rápida)")
+    args = ap.parse_args(argv)
+
+    mult = {"k": 1_000, "m": 1_000_000}
+    sizes = [int(float(x[:-1]) * mult[x[-1].lower()]) if x[-1].lower() in mult else int(x)
+             for x in args.sizes.split(",") if x]
+    data = run_suite(sizes, args.seed, memory=not args.no_memory)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    print(f"Resultados: {args.out}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        print(f"Línea base actualizada: {BASELINE_PATH}")
+    elif args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_baseline(data, json.load(f), args.tolerance)
+        for cur, base in regressions:
+            print(f"REGRESIÓN {cur['scenario']} @ {cur['size']}: {base['wall_s']:.4f}s -> {cur['wall_s']:.4f}s")
+        if regressions:
+            return 1
+        print(f"Sin regresiones frente a {args.baseline} (tolerancia {args.tolerance:.0%})")
+    return 0
+
+
+SCENARIOS = {
+    "matching": bench_matching,
+    "export": bench_export,
+    "table": bench_table,
+    "versions": bench_versions,
+    "history": bench_history,
+    "catalog": bench_catalog,
+    "pipeline": bench_pipeline,
+    "logging": bench_logging,
+}
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "suite":
+        sys.exit(suite_main(sys.argv[2:]))
+    ap = argparse.ArgumentParser(description="Benchmarks sintéticos de DriverAid ('suite' para la suite completa)")
+    ap.add_argument("scenario", choices=sorted(SCENARIOS))
+    args = ap.parse_args()
+    SCENARIOS[args.scenario]()
+
+
+if __name__ == "__main__":
+    main()
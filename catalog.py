@@ -0,0 +1,344 @@
+# catalog.py — Catálogo local de drivers (HWID -> última versión): importación, binario ordenado y deltas
+import bisect
+import csv
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import telemetry
+from hwid import candidate_keys, parse_hwid, split_hwids
+from update_cache import atomic_write_bytes
+from versions import NEWER, compare
+
+log = logging.getLogger("driveraid.catalog")
+
+MAGIC = b"DAIDCATL"
+FORMAT_VERSION = 2
+
+# url/sha256: paquete descargable (opcional) para la caché de paquetes (package_cache.py)
+ENTRY_FIELDS = ("hardware_id", "version", "provider", "date", "title", "url", "sha256")
+CatalogEntry = namedtuple("CatalogEntry", ENTRY_FIELDS, defaults=("", ""))
+
+# magic, versión, reservado, nº de entradas, fecha de compilación, bytes de strings, crc32
+_HEADER = struct.Struct("<8sHHIdQI")
+# (offset, longitud) en la tabla de strings por campo
+_RECORD = struct.Struct("<" + "II" * len(ENTRY_FIELDS))
+# Registros por versión de formato: la 1 no tenía url/sha256 (se leen vacíos)
+_RECORDS = {1: struct.Struct("<" + "II" * 5), FORMAT_VERSION: _RECORD}
+# Delante de los registros: hash de 64 bits de cada HWID, en el mismo orden (ascendente)
+_HASH = struct.Struct("<Q")
+
+# Nombres de columna aceptados al importar (exportaciones de WSUS, SCCM, hojas propias...)
+_ALIASES = {
+    "hardware_id": ("hardware_id", "hardwareid", "hwid", "hardware id"),
+    "version": ("version", "driverversion", "driver_version", "latest", "version_latest"),
+    "provider": ("provider", "driverprovidername", "manufacturer", "vendor"),
+    "date": ("date", "driverdate", "driver_date", "released"),
+    "title": ("title", "name", "description", "device"),
+    "url": ("url", "download", "download_url", "package_url"),
+    "sha256": ("sha256", "hash", "package_sha256"),
+}
+
+
+class CatalogError(Exception):
+    pass
+
+
+def _checksum(header_wo_crc: bytes, body) -> int:
+    return zlib.crc32(body, zlib.crc32(header_wo_crc)) & 0xFFFFFFFF
+
+
+def _normalize_row(row: dict) -> List[CatalogEntry]:
+    """Una fila del dataset -> una entrada por HWID (canónico); [] si falta HWID o versión."""
+    lower = {str(k).strip().lower(): v for k, v in row.items() if k is not None}
+    values = {}
+    for name, aliases in _ALIASES.items():
+        values[name] = next((str(lower[a]).strip() for a in aliases if lower.get(a) not in (None, "")), "")
+    if not values["hardware_id"] or not values["version"]:
+        return []
+    values["sha256"] = values["sha256"].lower()
+    out = []
+    for raw in split_hwids(values["hardware_id"]):
+        hw = parse_hwid(raw)
+        if hw is not None:
+            out.append(CatalogEntry(**{**values, "hardware_id": hw.canonical()}))
+    return out
+
+
+def read_dataset(path: str) -> List[CatalogEntry]:
+    """Lee un dataset CSV o JSON (lista de objetos, o {"entries": [...]}).
+
+    Si un mismo HWID aparece varias veces se queda la versión más alta.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".json"):
+            data = json.load(f)
+            rows = data.get("entries", []) if isinstance(data, dict) else data
+        else:
+            rows = list(csv.DictReader(f))
+    best: Dict[str, CatalogEntry] = {}
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        for e in _normalize_row(row):
+            cur = best.get(e.hardware_id)
+            if cur is None or compare(e.version, cur.version) == NEWER:
+                best[e.hardware_id] = e
+    return list(best.values())
+
+
+def _key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def encode(entries: Iterable[CatalogEntry], built_at: Optional[float] = None) -> bytes:
+    """Serializa el catálogo ordenado por hash de HWID (búsqueda binaria sin cargarlo); strings deduplicados."""
+    by_key = {(_key_hash(e.hardware_id), e.hardware_id): e for e in entries}
+    strings = bytearray()
+    offsets = {}
+
+    def ref(value: str):
+        pos = offsets.get(value)
+        if pos is None:
+            raw = (value or "").encode("utf-8")
+            pos = offsets[value] = (len(strings), len(raw))
+            strings.extend(raw)
+        return pos
+
+    hashes, records = bytearray(), bytearray()
+    for key in sorted(by_key):
+        hashes.extend(_HASH.pack(key[0]))
+        refs = []
+        for value in by_key[key]:
+            refs.extend(ref(value))
+        records.extend(_RECORD.pack(*refs))
+    body = bytes(hashes) + bytes(records) + bytes(strings)
+    head = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(by_key), built_at or time.time(), len(strings), 0)
+    crc = _checksum(head[:-4], body)
+    return head[:-4] + struct.pack("<I", crc) + body
+
+
+def compile_catalog(entries: Iterable[CatalogEntry], path: str, built_at: Optional[float] = None):
+    atomic_write_bytes(path, encode(entries, built_at))
+
+
+class LocalCatalog:
+    """Catálogo compilado (mapeado en memoria) más un archivo de deltas con los cambios incrementales.
+
+    Las búsquedas consultan primero los deltas (en memoria) y luego el binario por búsqueda
+    binaria; abrir el catálogo no decodifica nada. compact() funde los deltas en un binario nuevo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.delta_path = path + ".delta"
+        self._mm: Optional[mmap.mmap] = None
+        self.count = 0
+        self.built_at = 0.0
+        self._delta: Dict[str, CatalogEntry] = {}
+        self._open_base()
+        self._load_delta()
+
+    def _open_base(self):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                raise CatalogError("archivo demasiado corto")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _flags, count, built_at, str_len, crc = _HEADER.unpack_from(mm, 0)
+            if magic != MAGIC:
+                raise CatalogError("no es un catálogo de DriverAid")
+            if version not in _RECORDS:
+                raise CatalogError(f"versión de formato {version} no soportada")
+            self._rec = _RECORDS[version]
+            self._records = _HEADER.size + count * _HASH.size
+            self._strings = self._records + count * self._rec.size
+            if self._strings + str_len != len(mm):
+                raise CatalogError("tamaño inconsistente (archivo truncado)")
+            body = memoryview(mm)[_HEADER.size:]
+            try:
+                ok = _checksum(bytes(mm[:_HEADER.size - 4]), body) == crc
+            finally:
+                body.release()
+            if not ok:
+                raise CatalogError("checksum incorrecto")
+            self._hashes = memoryview(mm)[_HEADER.size:self._records].cast("Q")
+        except Exception:
+            mm.close()
+            raise
+        self._mm, self.count, self.built_at = mm, count, built_at
+
+    def _load_delta(self):
+        try:
+            with open(self.delta_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        e = CatalogEntry(*json.loads(line))
+                    except (ValueError, TypeError):
+                        continue  # línea a medio escribir tras un corte
+                    self._delta[e.hardware_id] = e
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        # Liberar el mapeo pronto: en Windows impide reemplazar el archivo
+        if self._mm is not None and not self._mm.closed:
+            self._hashes.release()
+            self._mm.close()
+        self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # -------------------- Lectura --------------------
+    def _key_at(self, index: int) -> str:
+        off, length = struct.unpack_from("<II", self._mm, self._records + index * self._rec.size)
+        start = self._strings + off
+        return self._mm[start:start + length].decode("utf-8")
+
+    def _entry_at(self, index: int) -> CatalogEntry:
+        rec = self._rec.unpack_from(self._mm, self._records + index * self._rec.size)
+        mm, base = self._mm, self._strings
+        return CatalogEntry(*(mm[base + rec[j]:base + rec[j] + rec[j + 1]].decode("utf-8")
+                              for j in range(0, len(rec), 2)))
+
+    def get(self, key: str) -> Optional[CatalogEntry]:
+        """Entrada exacta para un HWID canónico."""
+        e = self._delta.get(key)
+        return e if e is not None else self._base_get(key)
+
+    def _base_get(self, key: str) -> Optional[CatalogEntry]:
+        if self._mm is None:
+            return None
+        h = _key_hash(key)
+        i = bisect.bisect_left(self._hashes, h)
+        # Colisiones de hash: entradas contiguas con el mismo valor
+        while i < self.count and self._hashes[i] == h:
+            if self._key_at(i) == key:
+                return self._entry_at(i)
+            i += 1
+        return None
+
+    def lookup(self, hardware_id: str) -> Optional[CatalogEntry]:
+        """Mejor entrada para el campo 'hardware_id' de un driver (del ID más específico al más genérico).
+
+        Primero los IDs tal como los lista Windows (ya vienen de más a menos específico); solo si
+        ninguno está se prueban las variantes genéricas derivadas de cada uno.
+        """
+        for raw in split_hwids(hardware_id):
+            e = self.get(raw.upper())
+            if e is not None:
+                return e
+        for key in candidate_keys(hardware_id):
+            e = self.get(key)
+            if e is not None:
+                return e
+        return None
+
+    def resolve(self, hardware_ids: Iterable[str]) -> List[Optional[CatalogEntry]]:
+        """lookup() en bloque; cada campo distinto se resuelve una sola vez."""
+        memo: Dict[str, Optional[CatalogEntry]] = {}
+        out = []
+        for hw in hardware_ids:
+            if hw not in memo:
+                memo[hw] = self.lookup(hw)
+            out.append(memo[hw])
+        return out
+
+    def fill(self, drivers) -> int:
+        """Completa version_latest desde el catálogo si es más nueva que la conocida; devuelve cuántos cambió."""
+        drivers = list(drivers)
+        with telemetry.span("catalog.fill", drivers=len(drivers)) as sp:
+            changed = 0
+            for d, e in zip(drivers, self.resolve(d.hardware_id or "" for d in drivers)):
+                if e is None:
+                    continue
+                if not d.version_latest or compare(e.version, d.version_latest) == NEWER:
+                    d.version_latest = e.version
+                    changed += 1
+            sp.set(filled=changed)
+        return changed
+
+    def __iter__(self) -> Iterator[CatalogEntry]:
+        """Todas las entradas, con los deltas aplicados."""
+        for i in range(self.count if self._mm is not None else 0):
+            e = self._entry_at(i)
+            if e.hardware_id not in self._delta:
+                yield e
+        yield from sorted(self._delta.values())
+
+    def __len__(self):
+        return self.count + sum(1 for k in self._delta if self._base_get(k) is None)
+
+    @property
+    def pending(self) -> int:
+        """Entradas en el archivo de deltas (aún no fundidas con compact())."""
+        return len(self._delta)
+
+    # -------------------- Escritura --------------------
+    def add(self, entries: Iterable[CatalogEntry]) -> int:
+        """Actualización incremental: añade al archivo de deltas solo lo que cambia. Devuelve cuántas entradas."""
+        lines = []
+        for e in entries:
+            if self.get(e.hardware_id) != e:
+                self._delta[e.hardware_id] = e
+                lines.append(json.dumps(list(e), ensure_ascii=False) + "\n")
+        if lines:
+            with open(self.delta_path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+        return len(lines)
+
+    def compact(self):
+        """Funde los deltas en un binario nuevo (escritura atómica) y los borra."""
+        entries = list(self)
+        self.close()
+        compile_catalog(entries, self.path)
+        try:
+            os.remove(self.delta_path)
+        except FileNotFoundError:
+            pass
+        self._delta = {}
+        self._open_base()
+
+
+def load_catalog(path: str) -> Optional[LocalCatalog]:
+    """El catálogo si existe (binario o solo deltas) y es válido; None en otro caso."""
+    if not os.path.exists(path) and not os.path.exists(path + ".delta"):
+        return None
+    try:
+        return LocalCatalog(path)
+    except (OSError, ValueError, struct.error, CatalogError) as e:
+        # Sin catálogo el modo offline no tiene versiones: que quede constancia de por qué
+        log.warning("Catálogo local %s ilegible (%s): vuelve a importarlo con --import-catalog", path, e)
+        return None
+
+
+def import_dataset(dataset: str, path: str, incremental: bool = False) -> LocalCatalog:
+    """Importa un dataset al catálogo: completo (recompila el binario) o incremental (deltas)."""
+    entries = read_dataset(dataset)
+    if not incremental:
+        with telemetry.span("catalog.compile", entries=len(entries)):
+            compile_catalog(entries, path)
+        try:
+            os.remove(path + ".delta")
+        except FileNotFoundError:
+            pass
+        return LocalCatalog(path)
+    catalog = LocalCatalog(path)
+    catalog.add(entries)
+    return catalog
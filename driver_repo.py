@@ -0,0 +1,212 @@
+# driver_repo.py — Índice del repositorio OFFLINE de drivers (.INF): parseo, caché y matching por HWID
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from hwid import HwidTrie
+from update_cache import atomic_write_text
+from versions import NEWER, compare, version_key
+
+INDEX_VERSION = 1
+
+_STRING_REF = re.compile(r"%([^%]+)%")
+
+
+# -------------------- Parseo de INF --------------------
+def _decode(raw: bytes) -> str:
+    if raw.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return raw.decode("utf-16")
+    if raw.startswith(b"\xef\xbb\xbf"):
+        return raw[3:].decode("utf-8", errors="replace")
+    # UTF-16 sin BOM: muchos bytes nulos en posiciones impares
+    if len(raw) > 1 and raw[1:200:2].count(0) > 50:
+        return raw.decode("utf-16-le", errors="replace")
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("cp1252", errors="replace")
+
+
+def _strip_comment(line: str) -> str:
+    quoted = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == ";" and not quoted:
+            return line[:i]
+    return line
+
+
+def parse_sections(text: str) -> Dict[str, List[Tuple[Optional[str], List[str]]]]:
+    """Secciones del INF (nombre en minúsculas) -> líneas (clave o None, valores separados por comas)."""
+    sections: Dict[str, List[Tuple[Optional[str], List[str]]]] = {}
+    current: Optional[List] = None
+    pending = ""
+    for raw in text.splitlines():
+        line = _strip_comment(raw).strip()
+        if line.endswith("\\"):
+            pending += line[:-1] + " "
+            continue
+        line, pending = (pending + line).strip(), ""
+        if not line:
+            continue
+        if line.startswith("[") and "]" in line:
+            current = sections.setdefault(line[1:line.index("]")].strip().lower(), [])
+            continue
+        if current is None:
+            continue
+        key = None
+        if "=" in line:
+            key, line = line.split("=", 1)
+            key = key.strip()
+        values = [v.strip().strip('"') for v in line.split(",")]
+        current.append((key, values))
+    return sections
+
+
+@dataclass
+class InfPackage:
+    path: str
+    provider: str
+    driver_class: str
+    date: str
+    version: str
+    hwids: List[str]
+
+
+def parse_inf(path: str) -> InfPackage:
+    with open(path, "rb") as f:
+        sections = parse_sections(_decode(f.read()))
+
+    strings = {}
+    for name, lines in sections.items():
+        if name == "strings" or name.startswith("strings."):
+            for key, values in lines:
+                if key:
+                    strings.setdefault(key.lower(), ",".join(values))
+
+    def subst(value: str) -> str:
+        return _STRING_REF.sub(lambda m: strings.get(m.group(1).lower(), m.group(0)), value)
+
+    version = {(k or "").lower(): v for k, v in sections.get("version", [])}
+    drv_ver = version.get("driverver", ["", ""])
+    date, ver = (drv_ver + ["", ""])[:2]
+
+    hwids: List[str] = []
+    seen = set()
+    for _key, values in sections.get("manufacturer", []):
+        if not values or not values[0]:
+            continue
+        models = subst(values[0]).lower()
+        names = [models] + [f"{models}.{deco.lower()}" for deco in values[1:] if deco]
+        for name in names:
+            for _desc, entry in sections.get(name, []):
+                # Modelo: %Desc% = SeccionInstalacion, HWID[, IDs compatibles...]
+                for hw in entry[1:]:
+                    hw = subst(hw).strip().upper()
+                    if hw and hw not in seen:
+                        seen.add(hw)
+                        hwids.append(hw)
+
+    return InfPackage(
+        path=path,
+        provider=subst(",".join(version.get("provider", [""]))),
+        driver_class=subst(",".join(version.get("class", [""]))),
+        date=date,
+        version=ver,
+        hwids=hwids,
+    )
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# -------------------- Repositorio indexado --------------------
+@dataclass
+class OfflineMatch:
+    package: InfPackage
+    driver: object
+
+
+class DriverRepository:
+    """Índice persistente de los .INF bajo 'root'.
+
+    Un INF solo se vuelve a parsear si cambian tamaño/mtime y además su hash.
+    """
+
+    def __init__(self, root: str, index_path: str):
+        self.root = os.path.abspath(root)
+        self.index_path = index_path
+        self.packages: List[InfPackage] = []
+        self.parsed = 0  # INF parseados en el último refresh (el resto salió del índice)
+
+    def _load_index(self) -> Dict[str, dict]:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                return data.get("packages", {})
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def refresh(self) -> List[InfPackage]:
+        index = self._load_index()
+        # Se conservan entradas de otras raíces que comparten el mismo archivo de índice
+        fresh = {p: e for p, e in index.items() if not p.startswith(self.root + os.sep)}
+        self.packages, self.parsed = [], 0
+        for dirpath, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]  # p. ej. drivers/.cache (descargas en curso)
+            for name in files:
+                if not name.lower().endswith(".inf"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                    entry = index.get(path)
+                    if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+                        pkg = entry["pkg"]
+                    else:
+                        digest = _file_hash(path)
+                        if entry and entry["sha256"] == digest:
+                            pkg = entry["pkg"]
+                        else:
+                            pkg = parse_inf(path).__dict__
+                            self.parsed += 1
+                        entry = {"size": st.st_size, "mtime": st.st_mtime, "sha256": digest, "pkg": pkg}
+                except (OSError, UnicodeError):
+                    continue
+                fresh[path] = entry
+                self.packages.append(InfPackage(**pkg))
+        if fresh != index:
+            atomic_write_text(self.index_path, json.dumps({"version": INDEX_VERSION, "packages": fresh}))
+        return self.packages
+
+    def match(self, drivers) -> List[OfflineMatch]:
+        """Paquetes que aplican a dispositivos presentes y son más nuevos que lo instalado.
+
+        Un INF cubre un dispositivo si alguno de sus IDs coincide con uno del dispositivo o con
+        una variante más genérica (sin SUBSYS/REV). Si varios INF lo cubren, gana el de versión más alta.
+        """
+        trie: HwidTrie[InfPackage] = HwidTrie()
+        for pkg in self.packages:
+            for hw in set(pkg.hwids):
+                trie.insert(hw, pkg)
+
+        drivers = list(drivers)
+        chosen: Dict[str, OfflineMatch] = {}
+        for d, cands in zip(drivers, trie.lookup_many(d.hardware_id or "" for d in drivers)):
+            if not cands:
+                continue
+            best = max(cands, key=lambda p: version_key(p.version) or ((), 0))
+            if compare(best.version, d.version_installed) == NEWER:
+                chosen.setdefault(best.path, OfflineMatch(best, d))
+        return list(chosen.values())
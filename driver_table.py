@@ -0,0 +1,316 @@
+# driver_table.py — Tabla columnar de drivers (arrays + valores internados, índice por ID)
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from hwid import primary_hwid
+
+OUTDATED = "Desactualizado"
+CATALOG_URL = "https://www.catalog.update.microsoft.com/Search.aspx?q="
+
+FIELDS = ("device", "provider", "version_installed", "version_latest", "hardware_id",
+          "status", "manual_link", "instance_id")
+_COLUMN_ATTR = {"device": "_device", "version_installed": "_ver_inst", "version_latest": "_ver_latest",
+                "hardware_id": "_hwid", "instance_id": "_instance"}
+
+
+def default_link(hardware_id: str) -> str:
+    first = primary_hwid(hardware_id)
+    return CATALOG_URL + first.replace(" ", "%20") if first else ""
+
+
+class _Pool:
+    """Valores repetidos (proveedor, estado) guardados una vez; las filas guardan un código."""
+    __slots__ = ("values", "codes")
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def copy(self) -> "_Pool":
+        p = _Pool()
+        p.values, p.codes = self.values[:], dict(self.codes)
+        return p
+
+    def code(self, value: str) -> int:
+        c = self.codes.get(value)
+        if c is None:
+            c = self.codes[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return c
+
+
+def _column(name: str, getter):
+    def fset(self, value):
+        self._t.update(self.id, **{name: value})
+    return property(getter, fset)
+
+
+class DriverRow:
+    """Vista de una fila: mismos atributos que Driver, leídos/escritos en las columnas de la tabla.
+
+    Guarda el ID y la posición; si la tabla se compacta o pierde filas, la posición se
+    vuelve a resolver por ID, así que la vista sigue siendo válida.
+    """
+    __slots__ = ("_t", "id", "_r", "_e")
+
+    def __init__(self, table: "DriverTable", driver_id: int, row: Optional[int] = None):
+        self._t = table
+        self.id = driver_id
+        self._r = table._row_of[driver_id] if row is None else row
+        self._e = table._epoch
+
+    def _row(self) -> int:
+        t = self._t
+        if self._e != t._epoch:
+            self._r = t._row_of[self.id]
+            self._e = t._epoch
+        return self._r
+
+    device = _column("device", lambda self: self._t._device[self._row()])
+    provider = _column("provider", lambda self: self._t._providers.values[self._t._provider[self._row()]])
+    version_installed = _column("version_installed", lambda self: self._t._ver_inst[self._row()])
+    version_latest = _column("version_latest", lambda self: self._t._ver_latest[self._row()])
+    hardware_id = _column("hardware_id", lambda self: self._t._hwid[self._row()])
+    status = _column("status", lambda self: self._t._statuses.values[self._t._status[self._row()]])
+    instance_id = _column("instance_id", lambda self: self._t._instance[self._row()])
+
+    def _link(self) -> str:
+        r = self._row()
+        link = self._t._link[r]
+        return default_link(self._t._hwid[r]) if link is None else link
+
+    manual_link = _column("manual_link", _link)
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, **{f: getattr(self, f) for f in FIELDS}}
+
+    def __repr__(self):
+        return f"DriverRow(id={self.id}, device={self.device!r}, status={self.status!r})"
+
+
+# Lectura directa de un campo por posición (sin crear la vista de fila)
+_READ = {
+    "device": lambda t, r: t._device[r],
+    "provider": lambda t, r: t._providers.values[t._provider[r]],
+    "version_installed": lambda t, r: t._ver_inst[r],
+    "version_latest": lambda t, r: t._ver_latest[r],
+    "hardware_id": lambda t, r: t._hwid[r],
+    "status": lambda t, r: t._statuses.values[t._status[r]],
+    "manual_link": lambda t, r: default_link(t._hwid[r]) if t._link[r] is None else t._link[r],
+    "instance_id": lambda t, r: t._instance[r],
+}
+
+
+class DriverView:
+    """Subconjunto de filas (por ID, en orden). Barato de crear; se evalúa al recorrerlo.
+
+    Si la tabla pierde filas, len(), el índice y el recorrido dejan de verlas a la vez
+    (los IDs se vuelven a filtrar cuando cambia la época de la tabla).
+    """
+    __slots__ = ("_t", "_ids_all", "_e")
+
+    def __init__(self, table: "DriverTable", ids: List[int]):
+        self._t = table
+        self._ids_all = ids
+        self._e = table._epoch
+
+    @property
+    def _ids(self) -> List[int]:
+        t = self._t
+        if self._e != t._epoch:
+            row_of = t._row_of
+            self._ids_all = [i for i in self._ids_all if i in row_of]
+            self._e = t._epoch
+        return self._ids_all
+
+    def __iter__(self) -> Iterator[DriverRow]:
+        t = self._t
+        row_of = t._row_of
+        return (DriverRow(t, i, row_of[i]) for i in self._ids if i in row_of)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, index: int) -> DriverRow:
+        return DriverRow(self._t, self._ids[index])
+
+    @property
+    def ids(self) -> List[int]:
+        return list(self._ids)
+
+    def where(self, provider: Optional[str] = None, status: Optional[str] = None) -> "DriverView":
+        return self._t._filter(self._ids, provider, status)
+
+
+class DriverTable:
+    """Inventario en columnas: sin __dict__ por driver, proveedor/estado internados,
+    índice ID -> fila en O(1) y conjunto de desactualizados mantenido en cada escritura."""
+
+    def __init__(self):
+        self._ids = array("q")
+        self._device: List[str] = []
+        self._provider = array("I")
+        self._ver_inst: List[str] = []
+        self._ver_latest: List[str] = []
+        self._hwid: List[str] = []
+        self._status = array("B")
+        self._link: List[Optional[str]] = []  # None: se deriva del HWID al leer
+        self._instance: List[str] = []
+        self._providers = _Pool()
+        self._statuses = _Pool()
+        self._row_of: Dict[int, int] = {}
+        self._outdated: Set[int] = set()
+        self._dead = 0
+        self._epoch = 0  # cambia al quitar filas o compactar: invalida posiciones cacheadas
+
+    # ---- lectura ----
+    def __len__(self):
+        return len(self._row_of)
+
+    def __bool__(self):
+        return bool(self._row_of)
+
+    def __contains__(self, driver_id: int):
+        return driver_id in self._row_of
+
+    def __iter__(self) -> Iterator[DriverRow]:
+        row_of = self._row_of
+        return (DriverRow(self, i, r) for r, i in enumerate(self._ids) if row_of.get(i) == r)
+
+    def columns(self, *names: str) -> Iterator[tuple]:
+        """Recorrido rápido por columnas: tuplas (id, *names) sin crear vistas de fila."""
+        cols = []
+        for n in names:
+            if n == "provider":
+                cols.append(map(self._providers.values.__getitem__, self._provider))
+            elif n == "status":
+                cols.append(map(self._statuses.values.__getitem__, self._status))
+            elif n == "manual_link":
+                cols.append(link if link is not None else default_link(hw)
+                            for link, hw in zip(self._link, self._hwid))
+            else:
+                cols.append(iter(getattr(self, _COLUMN_ATTR[n])))
+        rows = zip(self._ids, *cols)
+        if not self._dead:
+            return rows
+        row_of = self._row_of
+        return (t for r, t in enumerate(rows) if row_of.get(t[0]) == r)
+
+    def get(self, driver_id: int) -> Optional[DriverRow]:
+        return DriverRow(self, driver_id) if driver_id in self._row_of else None
+
+    def values(self, driver_id: int, names: Iterable[str]) -> tuple:
+        r = self._row_of[driver_id]
+        return tuple(_READ[n](self, r) for n in names)
+
+    def ids(self) -> List[int]:
+        row_of = self._row_of
+        return [i for r, i in enumerate(self._ids) if row_of.get(i) == r]
+
+    def view(self, ids: Optional[Iterable[int]] = None) -> DriverView:
+        return DriverView(self, self.ids() if ids is None else [i for i in ids if i in self._row_of])
+
+    def outdated(self) -> DriverView:
+        return DriverView(self, sorted(self._outdated, key=self._row_of.__getitem__))
+
+    def where(self, provider: Optional[str] = None, status: Optional[str] = None) -> DriverView:
+        return self._filter(self.ids(), provider, status)
+
+    def _filter(self, ids: List[int], provider: Optional[str], status: Optional[str]) -> DriverView:
+        pc = self._providers.codes.get(provider, -1) if provider is not None else None
+        sc = self._statuses.codes.get(status, -1) if status is not None else None
+        row_of, prov, stat = self._row_of, self._provider, self._status
+        out = []
+        for i in ids:
+            r = row_of.get(i)
+            if r is None:
+                continue
+            if pc is not None and prov[r] != pc:
+                continue
+            if sc is not None and stat[r] != sc:
+                continue
+            out.append(i)
+        return DriverView(self, out)
+
+    def copy(self) -> "DriverTable":
+        """Copia independiente (columnas copiadas en bloque): permite preparar cambios aparte y
+        publicarlos de una vez mientras otros hilos siguen leyendo la tabla actual."""
+        t = DriverTable.__new__(DriverTable)
+        t._ids, t._provider, t._status = array("q", self._ids), array("I", self._provider), array("B", self._status)
+        for name in ("_device", "_ver_inst", "_ver_latest", "_hwid", "_link", "_instance"):
+            setattr(t, name, getattr(self, name)[:])
+        t._providers, t._statuses = self._providers.copy(), self._statuses.copy()
+        t._row_of, t._outdated = dict(self._row_of), set(self._outdated)
+        t._dead, t._epoch = self._dead, self._epoch
+        return t
+
+    # ---- escritura ----
+    def append(self, driver_id: int, device: str = "", provider: str = "", version_installed: str = "",
+               version_latest: str = "", hardware_id: str = "", status: str = "Desconocido",
+               manual_link: str = "", instance_id: str = "") -> DriverRow:
+        if driver_id in self._row_of:
+            raise KeyError(f"ID duplicado: {driver_id}")
+        self._row_of[driver_id] = len(self._ids)
+        self._ids.append(driver_id)
+        self._device.append(device)
+        self._provider.append(self._providers.code(provider))
+        self._ver_inst.append(sys.intern(version_installed))
+        self._ver_latest.append(sys.intern(version_latest))
+        self._hwid.append(hardware_id)
+        self._status.append(self._statuses.code(status))
+        self._link.append(None if manual_link == default_link(hardware_id) else manual_link)
+        self._instance.append(instance_id)
+        if status == OUTDATED:
+            self._outdated.add(driver_id)
+        return DriverRow(self, driver_id)
+
+    def update(self, driver_id: int, **fields):
+        r = self._row_of[driver_id]
+        link = fields.pop("manual_link", None)
+        for name, value in fields.items():
+            if name == "device":
+                self._device[r] = value
+            elif name == "provider":
+                self._provider[r] = self._providers.code(value)
+            elif name == "version_installed":
+                self._ver_inst[r] = sys.intern(value)
+            elif name == "version_latest":
+                self._ver_latest[r] = sys.intern(value)
+            elif name == "hardware_id":
+                self._hwid[r] = value
+            elif name == "status":
+                self._status[r] = self._statuses.code(value)
+                if value == OUTDATED:
+                    self._outdated.add(driver_id)
+                else:
+                    self._outdated.discard(driver_id)
+            elif name == "instance_id":
+                self._instance[r] = value
+            else:
+                raise AttributeError(name)
+        if link is not None:
+            self._link[r] = None if link == default_link(self._hwid[r]) else link
+
+    def remove(self, driver_id: int) -> dict:
+        """Quita la fila y devuelve una copia de sus valores."""
+        snapshot = DriverRow(self, driver_id).as_dict()
+        del self._row_of[driver_id]
+        self._outdated.discard(driver_id)
+        self._epoch += 1
+        self._dead += 1
+        if self._dead > 64 and self._dead * 2 > len(self._ids):
+            self._compact()
+        return snapshot
+
+    def _compact(self):
+        keep = [r for r, i in enumerate(self._ids) if self._row_of.get(i) == r]
+        self._ids = array("q", (self._ids[r] for r in keep))
+        self._provider = array("I", (self._provider[r] for r in keep))
+        self._status = array("B", (self._status[r] for r in keep))
+        for name in ("_device", "_ver_inst", "_ver_latest", "_hwid", "_link", "_instance"):
+            col = getattr(self, name)
+            setattr(self, name, [col[r] for r in keep])
+        self._row_of = {i: r for r, i in enumerate(self._ids)}
+        self._dead = 0
+        self._epoch += 1
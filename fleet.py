@@ -0,0 +1,208 @@
+# fleet.py — Escaneo concurrente de varios equipos (asyncio) con inventario agregado
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass
+class HostResult:
+    host: str
+    status: str = "pendiente"  # "ok" | "error" | "timeout"
+    attempts: int = 0
+    elapsed: float = 0.0
+    drivers: List = field(default_factory=list)
+    outdated: int = 0
+    error: str = ""
+
+
+@dataclass
+class FleetEntry:
+    """Un par driver/versión idéntico, con los equipos en los que aparece."""
+    device: str
+    provider: str
+    hardware_id: str
+    version_installed: str
+    version_latest: str
+    hosts: List[str] = field(default_factory=list)
+    outdated_hosts: List[str] = field(default_factory=list)
+
+
+@dataclass
+class FleetInventory:
+    hosts: List[HostResult]
+    entries: List[FleetEntry]
+
+    def summary(self) -> str:
+        ok = sum(1 for h in self.hosts if h.status == "ok")
+        rows = sum(len(h.drivers) for h in self.hosts)
+        return f"{ok}/{len(self.hosts)} equipos OK, {rows} drivers, {len(self.entries)} pares driver/versión únicos"
+
+    def to_dict(self) -> dict:
+        return {
+            "hosts": [{k: v for k, v in h.__dict__.items() if k != "drivers"} | {"drivers": len(h.drivers)}
+                      for h in self.hosts],
+            "entries": [e.__dict__ for e in self.entries],
+        }
+
+
+def aggregate(results: Iterable[HostResult]) -> FleetInventory:
+    results = list(results)
+    entries: Dict[Tuple[str, str, str], FleetEntry] = {}
+    for r in results:
+        for d in r.drivers:
+            ident = (d.hardware_id or d.device or "").lower()
+            key = (ident, (d.provider or "").lower(), d.version_installed)
+            e = entries.get(key)
+            if e is None:
+                e = entries[key] = FleetEntry(d.device, d.provider, d.hardware_id,
+                                              d.version_installed, d.version_latest)
+            if r.host not in e.hosts:
+                e.hosts.append(r.host)
+                if d.status == "Desactualizado":
+                    e.outdated_hosts.append(r.host)
+    return FleetInventory(results, list(entries.values()))
+
+
+# -------------------- Transportes --------------------
+def _settle(fut: asyncio.Future, result, error: Optional[BaseException]):
+    if fut.done():  # ya expiró (wait_for la canceló): el resultado tardío se descarta
+        return
+    if error is not None:
+        fut.set_exception(error)
+    else:
+        fut.set_result(result)
+
+
+class BackendTransport:
+    """Ejecuta scan()/outdated() de un backend local por equipo, en un hilo propio.
+
+    Con una fábrica de SimBackend sirve como sustituto local de una flota real. Cada equipo
+    usa un hilo daemon en vez del executor por defecto de asyncio: el executor limitaría la
+    concurrencia a su tamaño y asyncio.run() esperaría al cerrar a un equipo colgado, aunque
+    su timeout ya hubiera saltado. El hilo colgado se abandona y no impide salir.
+    """
+
+    def __init__(self, factory: Callable[[str], object]):
+        self.factory = factory
+
+    def _scan(self, host: str):
+        backend = self.factory(host)
+        drivers = list(backend.scan())
+        return drivers, len(backend.outdated())
+
+    async def scan(self, host: str):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+
+        def work():
+            try:
+                result, error = self._scan(host), None
+            except BaseException as e:
+                result, error = None, e
+            try:
+                loop.call_soon_threadsafe(_settle, fut, result, error)
+            except RuntimeError:
+                pass  # el bucle ya terminó: nadie espera este equipo
+
+        threading.Thread(target=work, name=f"fleet-{host}", daemon=True).start()
+        return await fut
+
+
+_REMOTE_SCRIPT = r"""
+$ErrorActionPreference='SilentlyContinue'
+Invoke-Command -ComputerName '{host}' -ErrorAction Stop -ScriptBlock {{
+  $d = Get-CimInstance Win32_PnPSignedDriver |
+       Select-Object DeviceID,DeviceName,FriendlyName,DriverVersion,DriverProviderName,HardWareID
+  $u = @()
+  if (Get-Module -ListAvailable -Name PSWindowsUpdate) {{
+    Import-Module PSWindowsUpdate
+    $u = Get-WindowsUpdate -MicrosoftUpdate -Category 'Drivers' -IgnoreReboot |
+         Select-Object Title,KB,@{{n='UpdateID';e={{$_.Identity.UpdateID}}}}
+  }}
+  @{{ drivers = @($d); updates = @($u) }}
+}} | ConvertTo-Json -Depth 4 -Compress
+"""
+
+
+class PowerShellRemoteTransport:
+    """Inventario remoto vía PowerShell Remoting (WinRM); el matching de updates se hace localmente."""
+
+    def __init__(self, command: Optional[List[str]] = None, catalog=None):
+        self.command = command or ["powershell", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command"]
+        self.catalog = catalog  # LocalCatalog compartido por todos los equipos (solo lectura)
+
+    async def scan(self, host: str):
+        from win_backend import classify, driver_from_wmi
+
+        script = _REMOTE_SCRIPT.format(host=host.replace("'", "''"))
+        proc = await asyncio.create_subprocess_exec(
+            *self.command, script, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        try:
+            out, err = await proc.communicate()
+        except asyncio.CancelledError:
+            proc.kill()
+            raise
+        if proc.returncode != 0:
+            raise RuntimeError((err or b"").decode(errors="replace").strip() or f"rc={proc.returncode}")
+        data = json.loads(out.decode("utf-8", errors="replace") or "{}")
+        drivers = []
+        for i, row in enumerate(data.get("drivers") or [], 1):
+            row["HardwareID"] = row.pop("HardWareID", None)
+            d = driver_from_wmi(SimpleNamespace(**row))
+            d.id = i
+            drivers.append(d)
+        classify(drivers, data.get("updates") or [], catalog=self.catalog)
+        return drivers, sum(1 for d in drivers if d.status == "Desactualizado")
+
+
+# -------------------- Planificador --------------------
+class FleetScanner:
+    def __init__(self, transport, concurrency: int = 8, timeout: float = 900.0,
+                 retries: int = 1, backoff: float = 2.0,
+                 on_result: Optional[Callable[[HostResult], None]] = None):
+        self.transport = transport
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.on_result = on_result
+
+    async def _scan_host(self, host: str, sem: asyncio.Semaphore) -> HostResult:
+        res = HostResult(host)
+        async with sem:
+            t0 = time.perf_counter()
+            for attempt in range(self.retries + 1):
+                res.attempts = attempt + 1
+                try:
+                    res.drivers, res.outdated = await asyncio.wait_for(self.transport.scan(host), self.timeout)
+                    res.status, res.error = "ok", ""
+                    break
+                except asyncio.TimeoutError:
+                    res.status, res.error = "timeout", f"sin respuesta en {self.timeout:g}s"
+                except Exception as e:
+                    res.status, res.error = "error", str(e) or type(e).__name__
+                if attempt < self.retries:
+                    await asyncio.sleep(self.backoff * (attempt + 1))
+            res.elapsed = time.perf_counter() - t0
+        if self.on_result:
+            self.on_result(res)
+        return res
+
+    async def run(self, hosts: Iterable[str]) -> FleetInventory:
+        sem = asyncio.Semaphore(self.concurrency)
+        unique = list(dict.fromkeys(h.strip() for h in hosts if h.strip()))
+        results = await asyncio.gather(*(self._scan_host(h, sem) for h in unique))
+        return aggregate(results)
+
+    def scan(self, hosts: Iterable[str]) -> FleetInventory:
+        return asyncio.run(self.run(hosts))
+
+
+def read_hosts(path: str) -> List[str]:
+    """Lista de equipos: uno por línea; '#' inicia un comentario."""
+    with open(path, encoding="utf-8") as f:
+        return [ln.split("#", 1)[0].strip() for ln in f if ln.split("#", 1)[0].strip()]
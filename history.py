@@ -0,0 +1,391 @@
+# history.py — Historial de inventarios en SQLite: un snapshot por escaneo, consultas indexadas y deltas
+import os
+import platform
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import telemetry
+from inventory import driver_key
+from versions import NEWER, OLDER, compare
+
+SCHEMA_VERSION = 1
+
+# Estados guardados como entero (se repiten en cada fila de cada snapshot)
+STATUSES = ("Desconocido", "Actualizado", "Desactualizado")
+_STATUS_CODE = {s: i for i, s in enumerate(STATUSES)}
+
+# devices es la identidad estable (driver_key); HWID, nombre y proveedor van en device_attrs, una fila
+# por combinación vista, y cada entrada apunta a la suya: un cambio de nombre o de HWID no reescribe
+# snapshots anteriores ni los de otros equipos con el mismo DeviceID.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS hosts(id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS snapshots(
+    id INTEGER PRIMARY KEY,
+    host_id INTEGER NOT NULL REFERENCES hosts(id),
+    taken_at TEXT NOT NULL,
+    mode TEXT NOT NULL DEFAULT '',
+    total INTEGER NOT NULL,
+    outdated INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_snapshots_host_time ON snapshots(host_id, taken_at);
+CREATE INDEX IF NOT EXISTS ix_snapshots_time ON snapshots(taken_at);
+CREATE TABLE IF NOT EXISTS devices(id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS device_attrs(
+    id INTEGER PRIMARY KEY,
+    hardware_id TEXT NOT NULL,
+    device TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    UNIQUE(hardware_id, device, provider)
+);
+CREATE INDEX IF NOT EXISTS ix_attrs_provider ON device_attrs(provider COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS versions(id INTEGER PRIMARY KEY, version TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS entries(
+    snapshot_id INTEGER NOT NULL,
+    device_id INTEGER NOT NULL,
+    attrs_id INTEGER NOT NULL,
+    installed_id INTEGER NOT NULL,
+    latest_id INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    PRIMARY KEY(snapshot_id, device_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_entries_attrs ON entries(attrs_id, snapshot_id);
+CREATE INDEX IF NOT EXISTS ix_entries_version ON entries(installed_id);
+"""
+
+@dataclass
+class Snapshot:
+    id: int
+    host: str
+    taken_at: str
+    mode: str
+    total: int
+    outdated: int
+
+
+@dataclass
+class DeltaRow:
+    device: str
+    provider: str
+    hardware_id: str
+    old: str = ""
+    new: str = ""
+
+
+@dataclass
+class Delta:
+    """Diferencias entre dos snapshots (normalmente del mismo equipo)."""
+    old: Snapshot
+    new: Snapshot
+    added: List[DeltaRow] = field(default_factory=list)
+    removed: List[DeltaRow] = field(default_factory=list)
+    upgraded: List[DeltaRow] = field(default_factory=list)
+    regressed: List[DeltaRow] = field(default_factory=list)
+    changed: List[DeltaRow] = field(default_factory=list)  # versión distinta pero no comparable
+
+    def summary(self) -> str:
+        return (f"#{self.old.id} -> #{self.new.id}: +{len(self.added)} -{len(self.removed)} "
+                f"↑{len(self.upgraded)} ↓{len(self.regressed)} ~{len(self.changed)}")
+
+    def rows(self) -> Iterable[Tuple[str, DeltaRow]]:
+        for kind in ("added", "removed", "upgraded", "regressed", "changed"):
+            for r in getattr(self, kind):
+                yield kind, r
+
+
+def _vercmp(a: Optional[str], b: Optional[str]) -> int:
+    return compare(a or "", b or "")
+
+
+class HistoryStore:
+    """Snapshots de inventario en una base SQLite local (tablas normalizadas e indexadas).
+
+    Los dispositivos y las versiones se guardan una sola vez; cada snapshot solo añade
+    una fila de enteros por driver. Las comparaciones de versión se hacen dentro de
+    SQLite (función vercmp), así que los deltas y búsquedas no cargan inventarios enteros.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.create_function("vercmp", 2, _vercmp, deterministic=True)
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+        # Cachés de IDs: evitan un SELECT por driver al insertar
+        self._hosts: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}
+        self._devices: Dict[str, int] = {}
+        self._attrs: Dict[Tuple[str, str, str], int] = {}
+        self._caches_loaded = False
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # -------------------- Escritura --------------------
+    def _load_caches(self):
+        if self._caches_loaded:
+            return
+        cur = self._conn.cursor()
+        self._hosts = {name.lower(): i for i, name in cur.execute("SELECT id, name FROM hosts")}
+        self._versions = {v: i for i, v in cur.execute("SELECT id, version FROM versions")}
+        self._devices = {k: i for i, k in cur.execute("SELECT id, key FROM devices")}
+        self._attrs = {(hw, dev, prov): i for i, hw, dev, prov
+                       in cur.execute("SELECT id, hardware_id, device, provider FROM device_attrs")}
+        self._caches_loaded = True
+
+    def _host_id(self, cur, name: str) -> int:
+        hid = self._hosts.get(name.lower())
+        if hid is None:
+            hid = self._resolve(cur, "hosts", "name", [name]).get(name)
+            if hid is None:  # mismo equipo escrito con otras mayúsculas por otro proceso
+                (hid,) = cur.execute("SELECT id FROM hosts WHERE name = ?", (name,)).fetchone()
+            self._hosts[name.lower()] = hid
+        return hid
+
+    def _resolve(self, cur, table: str, column: str, values: List[str]) -> Dict[str, int]:
+        """Inserta los valores nuevos de una tabla de diccionario y devuelve sus IDs."""
+        cur.executemany(f"INSERT OR IGNORE INTO {table}({column}) VALUES (?)", [(v,) for v in values])
+        found: Dict[str, int] = {}
+        for i in range(0, len(values), 500):  # límite de parámetros de SQLite
+            chunk = values[i:i + 500]
+            found.update((v, vid) for vid, v in cur.execute(
+                f"SELECT id, {column} FROM {table} WHERE {column} IN ({','.join('?' * len(chunk))})", chunk))
+        return found
+
+    def _resolve_attrs(self, cur, values: List[Tuple[str, str, str]]) -> Dict[Tuple[str, str, str], int]:
+        """Como _resolve, para las combinaciones (HWID, dispositivo, proveedor) de device_attrs."""
+        cur.executemany("INSERT OR IGNORE INTO device_attrs(hardware_id, device, provider) VALUES (?, ?, ?)", values)
+        found: Dict[Tuple[str, str, str], int] = {}
+        for i in range(0, len(values), 300):  # 3 parámetros por combinación
+            chunk = values[i:i + 300]
+            found.update(((hw, dev, prov), aid) for aid, hw, dev, prov in cur.execute(
+                "SELECT id, hardware_id, device, provider FROM device_attrs WHERE (hardware_id, device, provider) "
+                f"IN (VALUES {','.join(['(?, ?, ?)'] * len(chunk))})", [v for t in chunk for v in t]))
+        return found
+
+    def record(self, drivers: Iterable, host: Optional[str] = None, mode: str = "",
+               taken_at: Optional[str] = None) -> int:
+        """Guarda un snapshot y devuelve su ID."""
+        return self.record_many([(host, drivers, taken_at)], mode=mode)[0]
+
+    def record_many(self, snapshots: Iterable[Tuple[Optional[str], Iterable, Optional[str]]],
+                    mode: str = "") -> List[int]:
+        """Guarda varios snapshots (host, drivers, fecha ISO o None) en una sola transacción."""
+        self._load_caches()
+        try:
+            return self._record_many(snapshots, mode)
+        except Exception:
+            self._caches_loaded = False  # la transacción se deshizo: los IDs en caché pueden no existir
+            raise
+
+    def _record_many(self, snapshots, mode: str) -> List[int]:
+        ids: List[int] = []
+        with telemetry.span("history.record") as sp, self._conn:
+            cur = self._conn.cursor()
+            rows = 0
+            for host, drivers, taken_at in snapshots:
+                entries = []
+                outdated = 0
+                for d in drivers:
+                    status = _STATUS_CODE.get(d.status, 0)
+                    outdated += status == 2
+                    entries.append((driver_key(d), ((d.hardware_id or "").upper(), d.device or "", d.provider or ""),
+                                    d.version_installed or "", d.version_latest or "", status))
+
+                versions, devices, attrs = self._versions, self._devices, self._attrs
+                missing = {v for _k, _a, inst, latest, _st in entries for v in (inst, latest) if v not in versions}
+                if missing:
+                    versions.update(self._resolve(cur, "versions", "version", sorted(missing)))
+                new_keys = {k for k, _a, _i, _l, _st in entries if k not in devices}
+                if new_keys:
+                    devices.update(self._resolve(cur, "devices", "key", sorted(new_keys)))
+                new_attrs = {a for _k, a, _i, _l, _st in entries if a not in attrs}
+                if new_attrs:
+                    attrs.update(self._resolve_attrs(cur, list(new_attrs)))
+
+                cur.execute(
+                    "INSERT INTO snapshots(host_id, taken_at, mode, total, outdated) VALUES (?, ?, ?, ?, ?)",
+                    (self._host_id(cur, host or platform.node() or "local"),
+                     taken_at or datetime.now().isoformat(timespec="seconds"), mode, len(entries), outdated))
+                sid = cur.lastrowid
+                # INSERT OR IGNORE: dos instancias indistinguibles (misma clave) dejan una sola fila
+                cur.executemany(
+                    "INSERT OR IGNORE INTO entries(snapshot_id, device_id, attrs_id, installed_id, latest_id, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(sid, devices[k], attrs[a], versions[inst], versions[latest], st)
+                     for k, a, inst, latest, st in entries])
+                ids.append(sid)
+                rows += len(entries)
+            sp.set(snapshots=len(ids), rows=rows)
+        return ids
+
+    def prune(self, keep: int = 100) -> int:
+        """Deja los 'keep' snapshots más recientes de cada equipo; devuelve cuántos borró.
+
+        Las versiones, dispositivos y equipos que ya no usa ningún snapshot se borran también.
+        """
+        with telemetry.span("history.prune") as sp, self._conn:
+            cur = self._conn.cursor()
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS doomed(id INTEGER PRIMARY KEY)")
+            cur.execute("DELETE FROM doomed")
+            cur.execute("INSERT INTO doomed SELECT id FROM (SELECT id, ROW_NUMBER() OVER "
+                        "(PARTITION BY host_id ORDER BY taken_at DESC, id DESC) AS n FROM snapshots) WHERE n > ?",
+                        (max(0, keep),))
+            removed = cur.rowcount
+            if removed:
+                cur.execute("DELETE FROM entries WHERE snapshot_id IN doomed")
+                cur.execute("DELETE FROM snapshots WHERE id IN doomed")
+                cur.execute("DELETE FROM versions WHERE id NOT IN (SELECT installed_id FROM entries) "
+                            "AND id NOT IN (SELECT latest_id FROM entries)")
+                cur.execute("DELETE FROM device_attrs WHERE id NOT IN (SELECT attrs_id FROM entries)")
+                cur.execute("DELETE FROM devices WHERE id NOT IN (SELECT device_id FROM entries)")
+                cur.execute("DELETE FROM hosts WHERE id NOT IN (SELECT host_id FROM snapshots)")
+                self._caches_loaded = False  # los IDs borrados no deben reutilizarse desde la caché
+            sp.set(removed=removed)
+        return removed
+
+    # -------------------- Consultas --------------------
+    def _snapshot(self, row) -> Optional[Snapshot]:
+        return Snapshot(*row) if row else None
+
+    _SNAP_SELECT = ("SELECT s.id, h.name, s.taken_at, s.mode, s.total, s.outdated "
+                    "FROM snapshots s JOIN hosts h ON h.id = s.host_id ")
+
+    def get(self, snapshot_id: int) -> Optional[Snapshot]:
+        return self._snapshot(self._conn.execute(self._SNAP_SELECT + "WHERE s.id = ?", (snapshot_id,)).fetchone())
+
+    def snapshots(self, host: Optional[str] = None, since: Optional[str] = None, limit: int = 20) -> List[Snapshot]:
+        """Snapshots más recientes primero; 'since' es una fecha ISO (p. ej. '2024-05-01')."""
+        where, args = [], []
+        if host:
+            where.append("h.name = ?")
+            args.append(host)
+        if since:
+            where.append("s.taken_at >= ?")
+            args.append(since)
+        sql = self._SNAP_SELECT + (("WHERE " + " AND ".join(where)) if where else "")
+        sql += " ORDER BY s.taken_at DESC, s.id DESC LIMIT ?"
+        return [Snapshot(*r) for r in self._conn.execute(sql, (*args, limit))]
+
+    def latest(self, host: Optional[str] = None) -> Optional[Snapshot]:
+        found = self.snapshots(host=host, limit=1)
+        return found[0] if found else None
+
+    def previous(self, snapshot: Snapshot) -> Optional[Snapshot]:
+        """Snapshot anterior del mismo equipo."""
+        return self._snapshot(self._conn.execute(
+            self._SNAP_SELECT + "WHERE h.name = ? AND (s.taken_at < ? OR (s.taken_at = ? AND s.id < ?)) "
+            "ORDER BY s.taken_at DESC, s.id DESC LIMIT 1",
+            (snapshot.host, snapshot.taken_at, snapshot.taken_at, snapshot.id)).fetchone())
+
+    def at(self, when: str, host: Optional[str] = None) -> Optional[Snapshot]:
+        """Último snapshot tomado en o antes de 'when' (fecha ISO)."""
+        sql = self._SNAP_SELECT + "WHERE s.taken_at <= ?" + (" AND h.name = ?" if host else "")
+        sql += " ORDER BY s.taken_at DESC, s.id DESC LIMIT 1"
+        return self._snapshot(self._conn.execute(sql, (when, host) if host else (when,)).fetchone())
+
+    def delta(self, old_id: int, new_id: int) -> Delta:
+        """Altas, bajas, subidas y bajadas de versión entre dos snapshots, calculadas en SQLite."""
+        old, new = self.get(old_id), self.get(new_id)
+        if old is None or new is None:
+            raise KeyError(f"Snapshot inexistente: {old_id if old is None else new_id}")
+        delta = Delta(old, new)
+        with telemetry.span("history.delta"):
+            cur = self._conn.cursor()
+            one_side = """
+                SELECT d.device, d.provider, d.hardware_id, v.version
+                FROM entries e JOIN device_attrs d ON d.id = e.attrs_id JOIN versions v ON v.id = e.installed_id
+                WHERE e.snapshot_id = ? AND NOT EXISTS
+                    (SELECT 1 FROM entries o WHERE o.snapshot_id = ? AND o.device_id = e.device_id)
+                ORDER BY d.device"""
+            delta.added = [DeltaRow(dev, prov, hw, "", ver) for dev, prov, hw, ver in cur.execute(one_side, (new_id, old_id))]
+            delta.removed = [DeltaRow(dev, prov, hw, ver, "") for dev, prov, hw, ver in cur.execute(one_side, (old_id, new_id))]
+            both = """
+                SELECT d.device, d.provider, d.hardware_id, va.version, vb.version, vercmp(vb.version, va.version)
+                FROM entries a
+                JOIN entries b ON b.snapshot_id = ? AND b.device_id = a.device_id
+                JOIN device_attrs d ON d.id = b.attrs_id
+                JOIN versions va ON va.id = a.installed_id
+                JOIN versions vb ON vb.id = b.installed_id
+                WHERE a.snapshot_id = ? AND a.installed_id != b.installed_id
+                ORDER BY d.device"""
+            for dev, prov, hw, va, vb, cmp in cur.execute(both, (new_id, old_id)):
+                row = DeltaRow(dev, prov, hw, va, vb)
+                if cmp == NEWER:
+                    delta.upgraded.append(row)
+                elif cmp == OLDER:
+                    delta.regressed.append(row)
+                else:
+                    delta.changed.append(row)
+        return delta
+
+    def find(self, provider: Optional[str] = None, version: Optional[str] = None,
+             hardware_id: Optional[str] = None, below: Optional[str] = None,
+             latest_only: bool = True, limit: int = 1000) -> List[Tuple[str, str, str, str, str, str]]:
+        """Equipos con drivers que cumplen el filtro: (host, fecha, dispositivo, proveedor, HWID, versión).
+
+        'hardware_id' se busca por prefijo (p. ej. 'PCI\\VEN_10EC'); 'below' deja solo versiones
+        anteriores a la indicada. Con 'latest_only' se mira solo el último snapshot de cada equipo.
+        """
+        where, args = [], []
+        if provider:
+            where.append("d.provider = ? COLLATE NOCASE")
+            args.append(provider)
+        if hardware_id:
+            prefix = hardware_id.upper()
+            where.append("d.hardware_id >= ? AND d.hardware_id < ?")
+            args.extend([prefix, prefix + "\uffff"])
+        if version:
+            where.append("v.version = ?")
+            args.append(version)
+        if below:
+            where.append("vercmp(v.version, ?) < 0")
+            args.append(below)
+        cols = "SELECT h.name, s.taken_at, d.device, d.provider, d.hardware_id, v.version "
+        joins = ("JOIN versions v ON v.id = e.installed_id "
+                 "JOIN snapshots s ON s.id = e.snapshot_id JOIN hosts h ON h.id = s.host_id")
+        if latest_only:
+            # Último snapshot de cada equipo: una búsqueda por host en ix_snapshots_host_time
+            sql = ("WITH latest(id) AS (SELECT (SELECT s2.id FROM snapshots s2 WHERE s2.host_id = h.id "
+                   "ORDER BY s2.taken_at DESC, s2.id DESC LIMIT 1) FROM hosts h) " + cols)
+            if hardware_id:
+                # Prefijo de HWID selectivo: se parte de los dispositivos
+                sql += "FROM device_attrs d JOIN entries e ON e.attrs_id = d.id " + joins
+                where.append("e.snapshot_id IN latest")
+            else:
+                # Proveedor/versión: se recorren solo las filas de los últimos snapshots
+                sql += ("FROM latest l CROSS JOIN entries e ON e.snapshot_id = l.id "
+                        "JOIN device_attrs d ON d.id = e.attrs_id " + joins)
+        else:
+            sql = cols + "FROM device_attrs d JOIN entries e ON e.attrs_id = d.id " + joins
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY h.name, s.taken_at DESC LIMIT ?"
+        with telemetry.span("history.find"):
+            return list(self._conn.execute(sql, (*args, limit)))
+
+    def timeline(self, hardware_id: str, host: Optional[str] = None, limit: int = 100) -> List[Tuple[str, str, str, str]]:
+        """Versiones instaladas de un HWID a lo largo del tiempo: (host, fecha, dispositivo, versión)."""
+        sql = ("SELECT h.name, s.taken_at, d.device, v.version "
+               "FROM device_attrs d JOIN entries e ON e.attrs_id = d.id "
+               "JOIN versions v ON v.id = e.installed_id "
+               "JOIN snapshots s ON s.id = e.snapshot_id JOIN hosts h ON h.id = s.host_id "
+               "WHERE d.hardware_id = ?" + (" AND h.name = ?" if host else "") +
+               " ORDER BY s.taken_at DESC, s.id DESC LIMIT ?")
+        args = (hardware_id.upper(), host, limit) if host else (hardware_id.upper(), limit)
+        return list(self._conn.execute(sql, args))
@@ -0,0 +1,229 @@
+# hwid.py — Hardware IDs: parseo a componentes, cadena de específico a genérico e índice trie
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+# Claves de los segmentos 'CLAVE_valor' -> componente normalizado
+_KEYS = {"VEN": "vendor", "VID": "vendor", "DEV": "device", "PID": "device",
+         "SUBSYS": "subsys", "REV": "rev", "FUNC": "func", "MI": "mi"}
+
+WILDCARD = "*"
+
+
+@dataclass(frozen=True)
+class HardwareId:
+    """Hardware ID normalizado (mayúsculas). 'other' guarda IDs sin estructura (ACPI\\PNP0A08, ROOT\\...)."""
+    bus: str
+    vendor: str = ""
+    device: str = ""
+    subsys: str = ""
+    rev: str = ""
+    func: str = ""
+    mi: str = ""
+    other: str = ""
+
+    def path(self) -> Tuple[str, ...]:
+        """Niveles del trie: bus, fabricante, dispositivo, subsistema/interfaz, revisión.
+
+        Los niveles omitidos antes de uno presente se rellenan con '*'; los finales se recortan.
+        Un ID opaco es un único nivel con el ID completo.
+        """
+        if self.other:
+            return (f"{self.bus}\\{self.other}" if self.bus else self.other,)
+        root = f"{self.bus}\\FUNC_{self.func}" if self.func else self.bus
+        levels = [root, self.vendor, self.device, self.mi if self.bus in _USB_BUSES else self.subsys, self.rev]
+        while not levels[-1]:
+            levels.pop()
+        return tuple(lv or WILDCARD for lv in levels)
+
+    def canonical(self) -> str:
+        return format_path(self.path())
+
+    def chain(self) -> List[Tuple[str, ...]]:
+        """Variantes de más específica a más genérica (el orden en que Windows lista los IDs).
+
+        VEN&DEV&SUBSYS&REV -> VEN&DEV&SUBSYS -> VEN&DEV&REV -> VEN&DEV; no baja al nivel solo-fabricante.
+        """
+        p = self.path()
+        if len(p) <= 3:
+            return [p]
+        base = p[:3]
+        out = [p]
+        if len(p) == 5 and p[3] != WILDCARD:
+            out.append(p[:4])
+            out.append(base + (WILDCARD, p[4]))
+        out.append(base)
+        return out
+
+
+_USB_BUSES = ("USB", "HID", "USBSTOR")
+
+
+def format_path(path: Tuple[str, ...]) -> str:
+    """Ruta del trie -> Hardware ID canónico ('PCI\\VEN_8086&DEV_15BE&REV_03')."""
+    root = path[0]
+    if len(path) == 1:
+        return root
+    bus = root.split("\\", 1)[0]
+    usb = bus in _USB_BUSES
+    names = ("VID", "PID", "MI", "REV") if usb else ("VEN", "DEV", "SUBSYS", "REV")
+    parts = [] if "\\" not in root else [root.split("\\", 1)[1]]
+    for name, value in zip(names, path[1:]):
+        if value != WILDCARD:
+            parts.append(f"{name}_{value}")
+    if usb:  # Windows escribe REV antes que MI en USB
+        parts.sort(key=lambda s: s.startswith("MI_"))
+    return f"{bus}\\" + "&".join(parts)
+
+
+@lru_cache(maxsize=65536)
+def parse_hwid(text: str) -> Optional[HardwareId]:
+    """'PCI\\VEN_8086&DEV_15BE&SUBSYS_00008086&REV_21' -> HardwareId; None si está vacío."""
+    text = (text or "").strip().upper()
+    if not text:
+        return None
+    bus, sep, body = text.partition("\\")
+    if not sep or not body:
+        return HardwareId(bus="", other=text)
+    fields: Dict[str, str] = {}
+    for seg in body.split("&"):
+        key, us, value = seg.partition("_")
+        name = _KEYS.get(key)
+        if not us or name is None or not value:
+            # Segmento desconocido: se trata el ID completo como opaco
+            return HardwareId(bus=bus, other=body)
+        fields[name] = value
+    if "vendor" not in fields:
+        return HardwareId(bus=bus, other=body)
+    return HardwareId(bus=bus, **fields)
+
+
+@lru_cache(maxsize=65536)
+def split_hwids(hardware_id: str) -> Tuple[str, ...]:
+    """Lista de IDs de un campo 'hardware_id' (separados por comas), sin vacíos, en su orden."""
+    return tuple(h for h in (p.strip() for p in (hardware_id or "").split(",")) if h)
+
+
+def primary_hwid(hardware_id: str) -> str:
+    """El ID más específico (el primero de la lista)."""
+    ids = split_hwids(hardware_id)
+    return ids[0] if ids else ""
+
+
+@lru_cache(maxsize=65536)
+def candidate_keys(hardware_id: str) -> Tuple[str, ...]:
+    """IDs canónicos a probar para un driver, en orden de preferencia y sin repetidos.
+
+    Primero todas las variantes del primer ID (el más específico), luego las del siguiente, etc.
+    """
+    out: List[str] = []
+    seen = set()
+    for raw in split_hwids(hardware_id):
+        hw = parse_hwid(raw)
+        if hw is None:
+            continue
+        for p in hw.chain():
+            key = format_path(p)
+            if key not in seen:
+                seen.add(key)
+                out.append(key)
+    return tuple(out)
+
+
+class HwidTrie(Generic[V]):
+    """Índice de patrones de Hardware ID (bus > fabricante > dispositivo > subsistema > revisión).
+
+    lookup() devuelve los valores cuyo patrón cubre un ID, del más específico al más genérico;
+    el coste depende solo de la profundidad (5 niveles), no del número de patrones.
+    """
+
+    _VALUES = None  # clave de los valores dentro de cada nodo
+
+    def __init__(self):
+        self._root: dict = {}
+        self.size = 0
+
+    def insert(self, hardware_id: str, value: V) -> bool:
+        hw = parse_hwid(hardware_id)
+        if hw is None:
+            return False
+        node = self._root
+        for part in hw.path():
+            node = node.setdefault(part, {})
+        node.setdefault(self._VALUES, []).append(value)
+        self.size += 1
+        return True
+
+    def _walk(self, node: dict, path: Tuple[str, ...], depth: int, mask: Tuple[int, ...], out: list):
+        values = node.get(self._VALUES)
+        if values:
+            out.append(((sum(mask), mask), values))
+        if depth == len(path):
+            return
+        part = path[depth]
+        child = node.get(part)
+        if child is not None:
+            self._walk(child, path, depth + 1, mask + (1,), out)
+        if part != WILDCARD and depth >= 3:  # comodín solo en subsistema/interfaz y revisión
+            child = node.get(WILDCARD)
+            if child is not None:
+                self._walk(child, path, depth + 1, mask + (0,), out)
+
+    def lookup(self, hardware_id: str, min_level: int = 3) -> List[Tuple[int, V]]:
+        """(nivel, valor) para un ID, del más específico al más genérico.
+
+        'min_level' descarta coincidencias demasiado genéricas (3 = exige bus, fabricante y dispositivo).
+        """
+        hw = parse_hwid(hardware_id)
+        if hw is None:
+            return []
+        found: list = []
+        self._walk(self._root, hw.path(), 0, (), found)
+        found.sort(key=lambda f: f[0], reverse=True)
+        return [(score[0], v) for score, values in found if score[0] >= min(min_level, len(hw.path()))
+                for v in values]
+
+    def lookup_many(self, hardware_ids: Iterable[str], min_level: int = 3) -> List[List[V]]:
+        """Para cada campo 'hardware_id' (lista separada por comas): valores que aplican, mejor primero.
+
+        Se recorren los IDs en el orden del campo (el primero es el más específico); los
+        campos repetidos se resuelven una sola vez.
+        """
+        memo: Dict[str, List[V]] = {}
+        out = []
+        for field in hardware_ids:
+            hit = memo.get(field)
+            if hit is None:
+                hit, seen = [], set()
+                for raw in split_hwids(field):
+                    for _level, v in self.lookup(raw, min_level):
+                        if id(v) not in seen:
+                            seen.add(id(v))
+                            hit.append(v)
+                memo[field] = hit
+            out.append(hit)
+        return out
+
+    def under(self, prefix: str) -> Iterator[V]:
+        """Todos los valores bajo un prefijo ('PCI\\VEN_8086' -> todo lo de Intel en PCI)."""
+        hw = parse_hwid(prefix)
+        if hw is None:
+            return
+        node = self._root
+        for part in hw.path():
+            node = node.get(part)
+            if node is None:
+                return
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            for k, v in n.items():
+                if k is self._VALUES:
+                    yield from v
+                else:
+                    stack.append(v)
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,235 @@
+# installer.py — Planificador de instalación: descargas concurrentes, instalación en lotes ordenados y progreso
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import telemetry
+
+INSTALLED, FAILED, SKIPPED = "instalado", "fallido", "omitido"
+
+log = logging.getLogger("driveraid.install")
+
+
+@dataclass(slots=True)
+class PlanItem:
+    """Un update a instalar y los drivers que lo necesitan (varios drivers pueden compartir update)."""
+    key: str
+    title: str
+    update: dict = field(default_factory=dict)
+    driver_ids: List[int] = field(default_factory=list)
+    devices: List[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class InstallResult:
+    driver_id: int
+    device: str
+    title: str
+    status: str
+    detail: str = ""
+    download_s: float = 0.0
+    install_s: float = 0.0
+
+
+Progress = Callable[[str, PlanItem, str], None]
+
+
+def update_key(update: dict) -> str:
+    return str(update.get("UpdateID") or update.get("Title") or "")
+
+
+def build_plan(drivers, updates: Iterable[Optional[dict]]) -> Tuple[List[PlanItem], List[InstallResult]]:
+    """Agrupa drivers por update (resuelto una sola vez). Los drivers sin update quedan omitidos."""
+    plan: Dict[str, PlanItem] = {}
+    skipped: List[InstallResult] = []
+    for d, upd in zip(drivers, updates):
+        if not upd:
+            skipped.append(InstallResult(d.id, d.device, "", SKIPPED, "sin update disponible"))
+            continue
+        key = update_key(upd)
+        item = plan.get(key)
+        if item is None:
+            item = plan[key] = PlanItem(key, upd.get("Title", key), upd)
+        item.driver_ids.append(d.id)
+        item.devices.append(d.device)
+    return list(plan.values()), skipped
+
+
+class InstallScheduler:
+    """Descarga en paralelo (hasta 'max_downloads') e instala en lotes, en el orden del plan.
+
+    La instalación se hace siempre desde un único hilo: Windows Update solo admite una
+    sesión de instalación a la vez. Mientras se instala un lote, los siguientes siguen
+    descargándose.
+
+    'installer' debe ofrecer download(item) (lanza excepción si falla) e
+    install(items) -> {item.key: (ok, detalle)}. Si declara parallel_downloads = False
+    (descargas instantáneas, como el simulador sin latencia) se descarga en el propio hilo,
+    sin hilos ni Condition.
+    """
+
+    def __init__(self, installer, max_downloads: int = 4, batch_size: int = 4,
+                 on_progress: Optional[Progress] = None):
+        self.installer = installer
+        self.max_downloads = max(1, max_downloads)
+        self.batch_size = max(1, batch_size)
+        self.on_progress = on_progress
+        self._progress_lock = threading.Lock()
+
+    def _emit(self, event: str, item: PlanItem, detail: str = ""):
+        if self.on_progress:
+            with self._progress_lock:
+                self.on_progress(event, item, detail)
+
+    def _download(self, item: PlanItem, parent) -> Tuple[bool, str, float]:
+        t0 = time.perf_counter()
+        self._emit("descargando", item)
+        with telemetry.span("install.download", parent=parent, update=item.title) as sp:
+            try:
+                self.installer.download(item)
+            except Exception as e:
+                sp.set(ok=False)
+                self._emit("fallido", item, f"descarga: {e}")
+                return False, f"descarga: {e}", time.perf_counter() - t0
+        self._emit("descargado", item)
+        return True, "", time.perf_counter() - t0
+
+    def _install_batch(self, batch: List[Tuple[PlanItem, float]], results: List[InstallResult]):
+        items = [item for item, _secs in batch]
+        for item in items:
+            self._emit("instalando", item)
+        t0 = time.perf_counter()
+        with telemetry.span("install.batch", size=len(items)):
+            try:
+                outcome = self.installer.install(items) or {}
+            except Exception as e:
+                outcome = {item.key: (False, f"instalación: {e}") for item in items}
+        secs = time.perf_counter() - t0
+        for item, dl_secs in batch:
+            ok, detail = outcome.get(item.key, (False, "el instalador no devolvió resultado"))
+            status = INSTALLED if ok else FAILED
+            for driver_id, device in zip(item.driver_ids, item.devices):
+                results.append(InstallResult(driver_id, device, item.title, status, detail, dl_secs, secs))
+            self._emit(status, item, detail)
+
+    def _safe_download(self, item: PlanItem, parent) -> Tuple[bool, str, float]:
+        try:
+            return self._download(item, parent)
+        except BaseException as e:  # p. ej. un callback de progreso que falla
+            return False, f"descarga: {e}", 0.0
+
+    def _threaded_downloads(self, plan: List[PlanItem], parent):
+        """Hilos de descarga que toman el siguiente item del plan; una sola Condition (en vez
+        de un Future por item) para avisar al hilo instalador. Devuelve (resultados en orden, hilos)."""
+        done: List[Optional[Tuple[bool, str, float]]] = [None] * len(plan)
+        cond = threading.Condition()
+        pending = iter(enumerate(plan))
+
+        def worker():
+            while True:
+                with cond:
+                    nxt = next(pending, None)
+                if nxt is None:
+                    return
+                i, item = nxt
+                res = self._safe_download(item, parent)
+                with cond:
+                    done[i] = res
+                    cond.notify_all()
+
+        def in_order():
+            for i in range(len(plan)):
+                with cond:
+                    while done[i] is None:
+                        cond.wait()
+                    yield done[i]
+
+        workers = [threading.Thread(target=worker, name=f"download-{n}", daemon=True)
+                   for n in range(min(self.max_downloads, len(plan)))]
+        for w in workers:
+            w.start()
+        return in_order(), workers
+
+    def run(self, plan: List[PlanItem]) -> List[InstallResult]:
+        results: List[InstallResult] = []
+        if not plan:
+            return results
+        parent = telemetry.current()
+        if getattr(self.installer, "parallel_downloads", True):
+            downloads, workers = self._threaded_downloads(plan, parent)
+        else:
+            downloads, workers = (self._safe_download(item, parent) for item in plan), []
+        batch: List[Tuple[PlanItem, float]] = []
+        for item, (ok, detail, dl_secs) in zip(plan, downloads):  # se respeta el orden del plan
+            if not ok:
+                for driver_id, device in zip(item.driver_ids, item.devices):
+                    results.append(InstallResult(driver_id, device, item.title, FAILED, detail, dl_secs))
+                continue
+            batch.append((item, dl_secs))
+            if len(batch) >= self.batch_size:
+                self._install_batch(batch, results)
+                batch = []
+        if batch:
+            self._install_batch(batch, results)
+        for w in workers:
+            w.join()
+        return results
+
+
+def verify(results: List[InstallResult], table) -> List[InstallResult]:
+    """Tras reescanear: un 'instalado' cuyo driver sigue desactualizado pasa a 'fallido'.
+
+    Cada resultado final queda en el registro de actividad (los fallidos como WARNING).
+    """
+    still_outdated = set(table.outdated().ids)
+    for r in results:
+        if r.status == INSTALLED:
+            if r.driver_id in still_outdated:
+                r.status = FAILED
+                r.detail = (r.detail + "; " if r.detail else "") + "sigue desactualizado tras instalar"
+        level = logging.WARNING if r.status == FAILED else logging.INFO
+        if log.isEnabledFor(level):
+            log.log(level, "Instalación %s: %s (%s)", r.status, r.device, r.title,
+                    extra={"driver": r.driver_id, "result": r.status, "detail": r.detail,
+                           "download_s": round(r.download_s, 3), "install_s": round(r.install_s, 3)})
+    return sorted(results, key=lambda r: r.driver_id)
+
+
+class SimInstaller:
+    """Instalador falso para SimBackend: latencia y fallos configurables por clave de update."""
+
+    def __init__(self, backend, download_delay: float = 0.0, install_delay: float = 0.0,
+                 fail_downloads: Iterable[str] = (), fail_installs: Iterable[str] = ()):
+        self.backend = backend
+        self.download_delay = download_delay
+        self.install_delay = install_delay
+        self.fail_downloads = set(fail_downloads)
+        self.fail_installs = set(fail_installs)
+
+    @property
+    def parallel_downloads(self) -> bool:
+        # Sin latencia de descarga, los hilos solo añadirían sincronización
+        return bool(self.download_delay)
+
+    def download(self, item: PlanItem):
+        if self.download_delay:
+            time.sleep(self.download_delay)
+        if item.key in self.fail_downloads:
+            raise RuntimeError("error de red simulado")
+
+    def install(self, items: List[PlanItem]) -> Dict[str, Tuple[bool, str]]:
+        if self.install_delay:
+            time.sleep(self.install_delay * len(items))
+        out = {}
+        for item in items:
+            if item.key in self.fail_installs:
+                out[item.key] = (False, "0x80070103 simulado")
+                continue
+            for driver_id in item.driver_ids:
+                row = self.backend.drivers.get(driver_id)
+                if row is not None:
+                    self.backend._install(row)
+            out[item.key] = (True, "")
+        return out
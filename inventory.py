@@ -0,0 +1,146 @@
+# inventory.py — Inventario incremental: IDs estables entre escaneos y conjunto de cambios
+import logging
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+
+import telemetry
+from driver_table import FIELDS, DriverRow, DriverTable
+
+log = logging.getLogger("driveraid.scan")
+
+# Campos que se comparan para decidir si un driver cambió entre dos escaneos
+TRACKED = ("device", "provider", "version_installed", "version_latest", "hardware_id", "status")
+
+
+def driver_key(d) -> str:
+    """Identidad estable de un driver.
+
+    Se usa el ID de instancia PnP (DeviceID) cuando existe, porque no cambia al actualizar el
+    driver (el INF del almacén y la versión sí cambian). Si no, HWID + nombre del dispositivo.
+    """
+    inst = getattr(d, "instance_id", "")
+    if inst:
+        return inst.lower()
+    return f"{(d.hardware_id or '').lower()}|{(d.device or '').lower()}"
+
+
+@dataclass
+class ChangeSet:
+    added: List = field(default_factory=list)
+    removed: List = field(default_factory=list)
+    changed: List = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        return f"+{len(self.added)} -{len(self.removed)} ~{len(self.changed)}"
+
+
+class Inventory:
+    """Último snapshot conocido, indexado por identidad estable.
+
+    Las filas viven en una DriverTable y se actualizan en sitio, así que un driver conserva su ID
+    entre escaneos y las vistas que tenga la UI siguen siendo válidas.
+
+    Con 'copy_on_write' cada reconcile() trabaja sobre una copia y la publica al final en
+    'table': quien lea desde otro hilo ve siempre una tabla completa que ya no cambia (la
+    anterior o la nueva), nunca una a medio fusionar.
+    """
+
+    def __init__(self, copy_on_write: bool = False):
+        self.table = DriverTable()
+        self.copy_on_write = copy_on_write
+        self._id_of: Dict[str, int] = {}
+        self._keys: Dict[int, str] = {}
+        self._next_id = 1
+
+    @property
+    def drivers(self) -> DriverTable:
+        return self.table
+
+    def __len__(self):
+        return len(self.table)
+
+    def get(self, driver_id: int) -> Optional[DriverRow]:
+        return self.table.get(driver_id)
+
+    def key_of(self, driver_id: int) -> Optional[str]:
+        return self._keys.get(driver_id)
+
+    def restore(self, records: Iterable):
+        """Carga un inventario guardado conservando sus IDs (solo sobre un inventario vacío)."""
+        if self._id_of:
+            raise ValueError("restore() requiere un inventario vacío")
+        table = self.table
+        for rec in records:
+            k = driver_key(rec)
+            if k in self._id_of:
+                # Misma regla que reconcile() para instancias indistinguibles
+                n = 2
+                while f"{k}#{n}" in self._id_of:
+                    n += 1
+                k = f"{k}#{n}"
+            self._id_of[k] = rec.id
+            self._keys[rec.id] = k
+            table.append(rec.id, **{f: getattr(rec, f) for f in FIELDS})
+            self._next_id = max(self._next_id, rec.id + 1)
+
+    def reconcile(self, fresh: Iterable, keys: Optional[Iterable[str]] = None) -> ChangeSet:
+        """Fusiona drivers recién leídos con el snapshot anterior.
+
+        Sin 'keys' es un escaneo completo: lo que no aparezca se da por eliminado.
+        Con 'keys' es un reescaneo parcial: solo esas identidades pueden eliminarse.
+        """
+        with telemetry.span("inventory.reconcile", partial=keys is not None) as sp:
+            table = self.table.copy() if self.copy_on_write else self.table
+            changes = self._reconcile(table, fresh, keys)
+            self.table = table
+            sp.set(changes=changes.summary())
+        return changes
+
+    def _reconcile(self, table: DriverTable, fresh: Iterable, keys: Optional[Iterable[str]]) -> ChangeSet:
+        changes = ChangeSet()
+        seen = set()
+        initial = not self._id_of
+        debug = log.isEnabledFor(logging.DEBUG)  # una comprobación por escaneo, no por driver
+        for rec in fresh:
+            k = driver_key(rec)
+            if k in seen:
+                # Dos instancias sin DeviceID con el mismo HWID y nombre
+                n = 2
+                while f"{k}#{n}" in seen:
+                    n += 1
+                k = f"{k}#{n}"
+            seen.add(k)
+            values = {f: getattr(rec, f) for f in FIELDS}
+            if debug:
+                log.debug("Driver %s: %s", values["device"], values["status"],
+                          extra={"key": k, "version": values["version_installed"],
+                                 "latest": values["version_latest"], "status": values["status"]})
+            cur = self._id_of.get(k)
+            if cur is None:
+                rec_id = self._next_id
+                self._next_id += 1
+                self._id_of[k] = rec_id
+                self._keys[rec_id] = k
+                changes.added.append(table.append(rec_id, **values))
+            elif table.values(cur, TRACKED) != tuple(values[f] for f in TRACKED):
+                table.update(cur, **values)
+                changes.changed.append(table.get(cur))
+
+        scope = set(self._id_of) if keys is None else set(keys)
+        for k in scope:
+            if k in self._id_of and k not in seen:
+                rec_id = self._id_of.pop(k)
+                del self._keys[rec_id]
+                changes.removed.append(SimpleNamespace(**table.remove(rec_id)))
+        if initial:
+            log.info("Inventario inicial: %d drivers", len(changes.added))
+        elif changes and log.isEnabledFor(logging.INFO):
+            for kind, rows in (("added", changes.added), ("changed", changes.changed), ("removed", changes.removed)):
+                for d in rows:
+                    log.info("Driver %s: %s", kind, d.device,
+                             extra={"change": kind, "version": d.version_installed, "status": d.status})
+        return changes
@@ -1,92 +1,60 @@
-# main.py - DriverAid (Simulador / Windows Real) con preflight automático + opción 7 OFFLINE
+# main.py - DriverAid (Simulador / Windows Real) con preflight diferido + opción 7 OFFLINE
 import os
 import sys
+import time
 import platform
 import logging
 from datetime import datetime
-import subprocess
 
-# ================== Preflight Windows ==================
-def _is_windows():
-    return platform.system() == "Windows"
-
-def ensure_admin_windows():
-    """Relanza el proceso con permisos de admin si no los tiene (dispara UAC)."""
-    if not _is_windows():
-        return
-    try:
-        import ctypes
-        if not ctypes.windll.shell32.IsUserAnAdmin():
-            params = " ".join([f'"{p}"' if " " in p else p for p in sys.argv])
-            ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, params, None, 1)
-            sys.exit(0)
-    except Exception:
-        # Si falla la detección, seguimos normal (algunas UIs especiales)
-        pass
+import telemetry
+import tview
 
-def ensure_python_dep(pkg, import_name=None):
-    """Instala un paquete pip si no está disponible."""
-    mod = import_name or pkg
-    try:
-        __import__(mod)
-    except ImportError:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", pkg])
+_T0 = time.perf_counter()
+_STARTUP = []  # (fase, segundos) para --timing
 
-def _prefer_local_pswindowsupdate():
-    """
-    Si existe un módulo local en .\modules\PSWindowsUpdate, lo antepone al PSModulePath
-    (útil en entornos corporativos sin PSGallery).
-    """
-    if not _is_windows():
-        return
-    local = os.path.join(os.path.dirname(__file__), "modules", "PSWindowsUpdate")
-    if os.path.isdir(local):
-        # Prepend al PSModulePath
-        cur = os.environ.get("PSModulePath", "")
-        if local not in cur:
-            os.environ["PSModulePath"] = f"{local};{cur}" if cur else local
-
-def ensure_pswindowsupdate():
-    """Instala y activa PSWindowsUpdate + Microsoft Update (si no está)."""
-    _prefer_local_pswindowsupdate()
-    ps = r"""
-$ErrorActionPreference='SilentlyContinue'
-# Instalar NuGet provider si falta
-if (-not (Get-PackageProvider -Name NuGet -ListAvailable)) {
-  Install-PackageProvider -Name NuGet -MinimumVersion 2.8.5.201 -Force | Out-Null
-}
-# Confiar en PSGallery
-try { Set-PSRepository -Name PSGallery -InstallationPolicy Trusted } catch {}
-# Instalar módulo si falta
-if (-not (Get-Module -ListAvailable -Name PSWindowsUpdate)) {
-  try { Install-Module PSWindowsUpdate -Force } catch {}
-}
-Import-Module PSWindowsUpdate -ErrorAction SilentlyContinue
-# Agregar Microsoft Update
-try { Add-WUServiceManager -MicrosoftUpdate -Confirm:$false | Out-Null } catch {}
-"""
-    subprocess.run(
-        ["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps],
-        check=False, text=True, capture_output=True
-    )
+def _is_windows():
+    return platform.system() == "Windows"
 
-# Ejecuta preflight si estamos en Windows
-ensure_admin_windows()
-if _is_windows():
-    ensure_python_dep("wmi")
-    ensure_pswindowsupdate()
+def _mark(phase: str, since: float) -> float:
+    now = time.perf_counter()
+    _STARTUP.append((phase, now - since))
+    return now
 
 # ================== Selección de backend ==================
-if _is_windows():
-    from win_backend import WinBackend as Backend
-else:
-    from sim_backend import SimBackend as Backend
+def load_backend():
+    """Importa el backend al primer uso (win_backend arrastra wmi y PowerShell)."""
+    if _is_windows():
+        from win_backend import WinBackend as Backend
+    else:
+        from sim_backend import SimBackend as Backend
+    return Backend
 
 # ================== Configuración ==================
 BASE_DIR = os.path.dirname(__file__)
 REPORTS_DIR = os.path.join(BASE_DIR, "reports")
 DRIVERS_DIR = os.path.join(BASE_DIR, "drivers")
-LOG_PATH = os.path.join(REPORTS_DIR, "activity.log")
+LOG_PATH = os.path.join(REPORTS_DIR, "activity.jsonl")
+PREFLIGHT_STAMP = os.path.join(REPORTS_DIR, "preflight.json")
+SPANS_PATH = os.path.join(REPORTS_DIR, "spans.jsonl")
+HISTORY_DB = os.path.join(REPORTS_DIR, "history.sqlite")
+CATALOG_PATH = os.path.join(REPORTS_DIR, "catalog.bin")
+
+_history = None
+
+def history_store():
+    """Historial SQLite de escaneos (se abre al primer uso)."""
+    global _history
+    if _history is None:
+        from history import HistoryStore
+        _history = HistoryStore(HISTORY_DB)
+    return _history
+
+def record_snapshot(drivers, host=None, mode=""):
+    try:
+        return history_store().record(drivers, host=host, mode=mode)
+    except Exception as e:  # el historial nunca debe impedir ver el inventario
+        logging.warning("No se pudo guardar el snapshot en el historial: %s", e)
+        return None
 
 class S:
     RESET = "\033[0m"; BOLD = "\033[1m"; DIM = "\033[2m"
@@ -106,17 +74,34 @@ def banner():
 def ensure_reports():
     os.makedirs(REPORTS_DIR, exist_ok=True)
 
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, "") or default)
+    except ValueError:
+        return default
+
 def setup_logging():
+    """Registro de actividad en JSON, escrito desde un hilo aparte y con rotación.
+
+    DRIVERAID_LOG_LEVELS ajusta subsistemas (p. ej. 'scan=DEBUG,install=INFO,updates=WARNING');
+    DRIVERAID_LOG_MAX_MB / DRIVERAID_LOG_ROTATE_HOURS / DRIVERAID_LOG_BACKUPS controlan la
+    rotación y DRIVERAID_LOG_GZIP=1 comprime los archivos rotados.
+    """
+    import activity_log
     ensure_reports()
-    logging.basicConfig(
-        filename=LOG_PATH,
+    activity_log.install(
+        LOG_PATH,
         level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
+        levels=os.environ.get("DRIVERAID_LOG_LEVELS", ""),
+        max_bytes=int(_env_float("DRIVERAID_LOG_MAX_MB", 10) * 2**20),
+        interval=_env_float("DRIVERAID_LOG_ROTATE_HOURS", 24) * 3600,
+        backups=int(_env_float("DRIVERAID_LOG_BACKUPS", 7)),
+        compress=os.environ.get("DRIVERAID_LOG_GZIP") == "1",
     )
     logging.info("=== Inicio de sesión DriverAid ===")
 
 def clear():
-    os.system("cls" if _is_windows() else "clear")
+    tview.clear_screen()
 
 def pause():
     try:
@@ -128,114 +113,433 @@ def print_header(title: str):
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(S.BOLD + f"\n{title}" + S.RESET + S.GRAY + f"  ({now})" + S.RESET)
 
-def color_status(status: str) -> str:
-    s = (status or "").lower()
-    if s.startswith("act"):
-        return S.GREEN + status + S.RESET
-    elif s.startswith(("des","out")):
-        return S.YELLOW + status + S.RESET
-    return S.RED + (status or "Desconocido") + S.RESET
-
-def print_table(items):
-    headers = ["ID", "Dispositivo", "Proveedor", "Instalada", "Última", "Estado"]
-    rows = [[str(d.id), d.device, d.provider, d.version_installed, d.version_latest, d.status] for d in items]
-    widths = [len(h) for h in headers]
-    for r in rows:
-        for i, cell in enumerate(r):
-            widths[i] = max(widths[i], len(cell))
-
-    line = " | ".join(h.ljust(widths[i]) for i, h in enumerate(headers))
-    print("\n" + S.BOLD + line + S.RESET)
-    print("-" * (len(line)))
-    for r in rows:
-        r[5] = color_status(r[5])
-        print(" | ".join(r[i].ljust(widths[i]) for i in range(len(headers))))
+def print_table(items, title: str = ""):
+    """En consola, si no cabe en pantalla: visor paginado con filtros. Si no, la tabla entera."""
+    view = tview.TableView(items, title=title)
+    if len(view.rows) > view.page_size and sys.stdin.isatty() and sys.stdout.isatty():
+        view.interactive()
+    else:
+        print()
+        view.print_all()
+
+def scan_live(backend, refresh: bool = False):
+    """Escaneo con contador en vivo cuando el backend entrega los drivers según se enumeran.
+
+    'refresh' ignora la caché de updates (TTL) y fuerza la búsqueda online.
+    """
+    scan_iter = getattr(backend, "scan_iter", None)
+    if scan_iter is None:
+        return backend.scan(refresh=refresh)
+    n = 0
+    for n, _drv in enumerate(scan_iter(refresh=refresh), 1):
+        if n % 25 == 0:
+            print(S.DIM + f"\rEscaneando… {n} drivers" + S.RESET, end="", flush=True)
+    if n:
+        print("\r" + " " * 40 + "\r", end="", flush=True)
+    return backend.drivers
+
+# ================== Instalación con progreso ==================
+_PROGRESS_COLORS = {"instalado": S.GREEN, "fallido": S.RED}
+
+def print_progress(event: str, item, detail: str = ""):
+    """Una línea por evento del planificador de instalación (descarga, lote, resultado)."""
+    color = _PROGRESS_COLORS.get(event, S.DIM)
+    devices = ", ".join(item.devices[:2]) + (" …" if len(item.devices) > 2 else "")
+    extra = f" — {detail}" if detail else ""
+    print(color + f"  [{event:<11}] {item.title[:60]} ({devices}){extra}" + S.RESET)
+
+def print_install_summary(results):
+    counts = {"instalado": 0, "fallido": 0, "omitido": 0}
+    for r in results:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    print(S.CYAN + f"\nActualizados: {counts['instalado']} | Fallidos: {counts['fallido']} | "
+          f"Omitidos: {counts['omitido']}" + S.RESET)
+    failed = [r for r in results if r.status == "fallido"]
+    for r in failed:
+        print(S.RED + f"  ✗ {r.driver_id} {r.device}: {r.detail}" + S.RESET)
+
+# ================== Flota ==================
+def run_fleet(hosts_file: str, concurrency: int = 8, timeout: float = 900.0, retries: int = 1,
+              force_preflight: bool = False):
+    """Escanea los equipos listados en 'hosts_file' y guarda el inventario agregado en reports/."""
+    import json
+    from fleet import BackendTransport, FleetScanner, PowerShellRemoteTransport, read_hosts
+
+    prepare(force_preflight)
+    hosts = read_hosts(hosts_file)
+    if _is_windows():
+        from catalog import load_catalog
+        transport = PowerShellRemoteTransport(catalog=load_catalog(CATALOG_PATH))
+    else:
+        from sim_backend import SimBackend
+        transport = BackendTransport(lambda host: SimBackend())
+
+    def report(res):
+        color = S.GREEN if res.status == "ok" else S.RED
+        print(f"{res.host.ljust(24)} {color}{res.status:<8}{S.RESET} "
+              f"{len(res.drivers):>5} drivers {res.outdated:>4} desact. "
+              f"{res.elapsed:6.1f}s (intentos: {res.attempts}) {res.error}")
+        logging.info("Flota: %s %s (%d drivers, %.1fs) %s", res.host, res.status, len(res.drivers), res.elapsed, res.error)
+
+    print_header(f"Escaneo de flota: {len(hosts)} equipos")
+    inv = FleetScanner(transport, concurrency=concurrency, timeout=timeout, retries=retries, on_result=report).scan(hosts)
+    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(REPORTS_DIR, f"DriverAid-Fleet-{ts}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(inv.to_dict(), f, ensure_ascii=False, indent=1)
+    print(S.CYAN + "\n" + inv.summary() + S.RESET)
+    print("•", path)
+    try:
+        ids = history_store().record_many(
+            [(r.host, r.drivers, None) for r in inv.hosts if r.status == "ok"], mode="flota")
+        print(S.DIM + f"Historial: {len(ids)} snapshots guardados en {HISTORY_DB}" + S.RESET)
+    except Exception as e:
+        logging.warning("No se pudo guardar la flota en el historial: %s", e)
+
+# ================== Catálogo local ==================
+def run_catalog(dataset=None, incremental: bool = False, compact: bool = False):
+    """Importa un dataset (CSV/JSON) al catálogo local y/o funde sus deltas."""
+    from catalog import LocalCatalog, import_dataset
+
+    ensure_reports()
+    setup_logging()
+    t0 = time.perf_counter()
+    if dataset:
+        catalog = import_dataset(dataset, CATALOG_PATH, incremental=incremental)
+        mode = "incremental" if incremental else "completa"
+        logging.info("Catálogo: importación %s de %s", mode, dataset)
+    else:
+        catalog = LocalCatalog(CATALOG_PATH)
+    if compact:
+        catalog.compact()
+    with catalog:
+        print(f"Catálogo {CATALOG_PATH}: {len(catalog)} HWIDs "
+              f"({catalog.pending} en deltas) en {time.perf_counter() - t0:.2f}s")
+
+# ================== Caché de paquetes ==================
+def prefetch_packages(backend, max_parallel: int = 4):
+    """Descarga a ./drivers los paquetes del catálogo local que necesitan los drivers desactualizados.
+
+    None si no hay catálogo local; si no, el resultado por paquete.
+    """
+    from catalog import load_catalog
+    from package_cache import FAILED, PackageCache, plan_packages
+
+    catalog = load_catalog(CATALOG_PATH)
+    if catalog is None:
+        return None
+    with catalog:
+        refs = plan_packages(backend.outdated(), catalog)
+    if not refs:
+        print(S.DIM + "El catálogo local no tiene paquetes descargables para los drivers desactualizados." + S.RESET)
+        return []
+    cache = PackageCache(DRIVERS_DIR)
+    print(S.DIM + f"Precargando {len(refs)} paquetes ({max_parallel} en paralelo)..." + S.RESET)
+
+    def show(res):
+        color = S.RED if res.status == FAILED else S.GREEN
+        extra = ", reanudado" if res.resumed else ""
+        print(f"  {color}{res.status:<11}{S.RESET} {res.ref.name} "
+              f"({res.received / 2**20:.1f} MiB en {res.seconds:.1f}s{extra}) {res.detail}")
+
+    results = cache.prefetch(refs, max_parallel, on_progress=show)
+    failed = sum(1 for r in results if r.status == FAILED)
+    print(S.CYAN + f"{len(results) - failed} paquetes listos, {failed} fallidos; caché: {len(cache)} paquetes, "
+          f"{cache.size / 2**20:.1f} MiB" + S.RESET)
+    logging.info("Prefetch: %d paquetes, %d fallidos", len(results), failed)
+    return results
+
+def run_prefetch(max_parallel: int = 4, force_preflight: bool = False):
+    prepare(force_preflight)
+    backend = load_backend()()
+    print_header("Precarga de paquetes del catálogo local")
+    if prefetch_packages(backend, max_parallel) is None:
+        print(S.YELLOW + f"No hay catálogo local en {CATALOG_PATH} (importa uno con --import-catalog)." + S.RESET)
+
+# ================== Vigilancia ==================
+def run_watch(publish, debounce: float = 2.0, max_wait: float = 15.0, force_preflight: bool = False,
+              refresh: bool = False):
+    """Modo vigilancia: reescanea solo los dispositivos que cambian y publica eventos/estado."""
+    from watch import SimEventSource, Watcher, WmiEventSource, make_sink
+
+    prepare(force_preflight)
+    backend = load_backend()()
+    if _is_windows():
+        backend.warm_start(refresh=refresh)
+        backend.wait_background()
+        source = WmiEventSource()
+    else:
+        source = SimEventSource(backend)
+    sinks = [make_sink(t) for t in (publish or [REPORTS_DIR])]
+
+    def show(batch, events):
+        print(S.DIM + datetime.now().strftime("%H:%M:%S") + S.RESET +
+              f" {batch.events} eventos, {len(batch.instance_ids)} dispositivos -> {watcher.last_summary}")
+        for e in events:
+            print(f"    {e['event']:<8} {e['device']} ({e['version_installed']})")
+
+    watcher = Watcher(backend, source, sinks, debounce=debounce, max_wait=max_wait, on_batch=show)
+    targets = ", ".join(str(getattr(s, "address", None) or getattr(s, "status_path", "")) for s in sinks)
+    print_header(f"Vigilando cambios de dispositivos (Ctrl+C para salir) -> {targets}")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for sink in sinks:
+            sink.close()
+
+def parse_args(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="DriverAid")
+    ap.add_argument("--fleet", metavar="HOSTS", help="escanear los equipos listados en el archivo (uno por línea)")
+    ap.add_argument("--concurrency", type=int, default=8, help="equipos en paralelo en modo flota")
+    ap.add_argument("--timeout", type=float, default=900.0, help="segundos por equipo en modo flota")
+    ap.add_argument("--retries", type=int, default=1, help="reintentos por equipo en modo flota")
+    ap.add_argument("--watch", action="store_true", help="vigilar cambios de dispositivos y reescanear solo lo afectado")
+    ap.add_argument("--publish", action="append", metavar="DESTINO",
+                    help="carpeta o tcp://host:puerto donde publicar eventos y estado (repetible; por defecto reports/)")
+    ap.add_argument("--debounce", type=float, default=2.0, help="segundos sin eventos para cerrar una ráfaga")
+    ap.add_argument("--import-catalog", metavar="DATASET",
+                    help="importar un CSV/JSON de drivers (HWID, versión...) al catálogo local reports/catalog.bin")
+    ap.add_argument("--incremental", action="store_true", help="con --import-catalog: añadir como deltas sin recompilar")
+    ap.add_argument("--compact-catalog", action="store_true", help="fundir los deltas del catálogo local en el binario")
+    ap.add_argument("--prefetch", action="store_true",
+                    help="descargar a ./drivers los paquetes del catálogo local para los drivers desactualizados")
+    ap.add_argument("--downloads", type=int, default=4, help="descargas simultáneas con --prefetch")
+    ap.add_argument("--timing", action="store_true", help="mostrar el tiempo de arranque por fase")
+    ap.add_argument("--repair", action="store_true", help="repetir el preflight completo (ignora el sello)")
+    ap.add_argument("--refresh", action="store_true",
+                    help="ignorar la caché de updates y buscar online en el escaneo inicial (menú y --watch)")
+    ap.add_argument("--profile", action="store_true",
+                    help="medir cada acción por fase y guardar los spans en reports/spans.jsonl")
+    return ap.parse_args(argv)
 
 # ================== Main ==================
-def main():
+def preflight(force: bool = False):
+    """Preflight de Windows: solo repite los pasos que el sello no marca como hechos."""
+    from preflight import run_preflight
+    results = run_preflight(PREFLIGHT_STAMP, force=force)
+    if results:
+        logging.info("Preflight: %s", ", ".join(f"{k}={v}" for k, v in results.items()))
+    return results
+
+def print_startup_timing():
+    total = time.perf_counter() - _T0
+    phases = " | ".join(f"{name} {secs * 1000:.0f} ms" for name, secs in _STARTUP)
+    print(S.DIM + f"Arranque: {phases} | total hasta el menú {total * 1000:.0f} ms" + S.RESET)
+
+def prepare(force_preflight: bool = False):
+    """Arranque común de todo modo que use el backend: admin (UAC), registro y preflight sellado.
+
+    El sello hace que repetirlo en cada modo (menú, --watch, --fleet, --prefetch) sea barato.
+    """
+    t = time.perf_counter()
+    if _is_windows():
+        from preflight import ensure_admin_windows
+        ensure_admin_windows()  # relanza con UAC antes de abrir el log
     ensure_reports()
     setup_logging()
+    t = _mark("logging", t)
+    preflight(force=force_preflight)
+    _mark("preflight", t)
 
-    backend = Backend()
+def main(timing: bool = False, force_preflight: bool = False, profile: bool = False, refresh: bool = False):
+    _mark("imports", _T0)
+    prepare(force_preflight)
+    t = time.perf_counter()
+    # DRIVERAID_TRACE=1 activa lo mismo que --profile sin imprimir el desglose tras cada acción
+    if profile or os.environ.get("DRIVERAID_TRACE") == "1":
+        telemetry.enable(SPANS_PATH)
+
+    backend = load_backend()()
+    if hasattr(backend, "warm_start"):
+        backend.warm_start(refresh=refresh)  # muestra el último inventario y reescanea en segundo plano
+    _mark("backend", t)
     so = platform.system()
     is_windows = (so == "Windows")
+    tview.enable_ansi()
     clear()
     banner()
     print(S.DIM + f"Sistema operativo detectado: {so}" + S.RESET)
+    if timing:
+        print_startup_timing()
 
     while True:
+        stale_note(backend)
         print("\n" + S.BOLD + "Menú principal" + S.RESET)
         print("1) Escanear e inventariar drivers")
+        print("r) Escanear buscando updates online (ignora la caché)")
         print("2) Ver solo desactualizados")
-        print("3) Actualizar TODOS")
+        print("3) Actualizar TODOS" + (" (descargas en serie)" if is_windows else ""))
         print("4) Actualizar MANUAL (elige por ID)")
-        print("5) Generar reporte (HTML y CSV)")
+        print("5) Generar reporte (HTML, CSV y JSONL)")
         print("6) Mostrar links de descarga manual")
         if is_windows:
             print("7) Instalar drivers desde carpeta ./drivers (OFFLINE, requiere Admin)")
+        print("8) Ver tiempos de la última acción")
+        print("9) Historial de escaneos (cambios y búsquedas)")
         print("0) Salir")
-        choice = input("\nElige una opción: ").strip()
-
-        if choice == "1":
-            items = backend.scan()
-            print_header("Inventario de drivers")
-            print_table(items); pause()
-
-        elif choice == "2":
-            items = backend.outdated()
-            print_header("Drivers desactualizados")
-            if items: print_table(items)
-            else: print(S.GREEN + "\nTodo actualizado 🎉" + S.RESET)
-            pause()
-
-        elif choice == "3":
-            updated, skipped = backend.update_all()
-            print(S.CYAN + f"\nActualizados: {updated} | Omitidos: {skipped}" + S.RESET); pause()
-
-        elif choice == "4":
-            idx = input("Ingresa el ID del driver a actualizar: ").strip()
-            if not idx.isdigit():
-                print(S.RED + "ID inválido ❌" + S.RESET); pause(); continue
-            ok = backend.update_one(int(idx))
-            print(S.GREEN + "Actualizado ✅" + S.RESET if ok else S.RED + "ID no encontrado ❌" + S.RESET); pause()
-
-        elif choice == "5":
-            html, csv = backend.export_report(REPORTS_DIR)
-            print(S.GREEN + "\nReportes creados:" + S.RESET)
-            print("•", html); print("•", csv); pause()
-
-        elif choice == "6":
-            print_header("Links de descarga manual")
-            for id_, name, link in backend.manual_links():
-                print(f"{str(id_).rjust(2)} | {name} -> {link}")
-            pause()
-
-        elif choice == "7" and is_windows:
-            print_header("Instalación OFFLINE desde .\\drivers")
-            print(S.DIM + "Coloca paquetes con .INF dentro de ./drivers (recursivo)." + S.RESET)
-            default = DRIVERS_DIR
-            path = input(f"Ruta de carpeta (Enter para usar por defecto: {default}): ").strip() or default
-            try:
-                rc, out = backend.install_offline(path)  # type: ignore[attr-defined]
-                print("\nCódigo de retorno:", rc)
-                print(out if out else "(sin salida)")
-                if rc == 0:
-                    print(S.GREEN + "\nInstalación offline finalizada (puede requerir reinicio)." + S.RESET)
-                elif rc == -1:
-                    print(S.RED + "\nError: revise la ruta o permisos (ejecutar como Administrador)." + S.RESET)
-                else:
-                    print(S.YELLOW + "\npnputil devolvió un código distinto de 0. Revise el detalle arriba." + S.RESET)
-            except AttributeError:
-                print(S.RED + "El backend actual no soporta instalación offline." + S.RESET)
-            pause()
-
-        elif choice == "0":
-            print(S.DIM + "\nGracias por usar DriverAid. ¡Hasta pronto!" + S.RESET); break
+        choice = input("\nElige una opción: ").strip().lower()
+
+        if choice == "8":  # no se mide: sobrescribiría el desglose que se quiere ver
+            keep = run_choice(backend, choice, is_windows)
         else:
-            print(S.RED + "Opción inválida ❌" + S.RESET); pause()
+            with telemetry.action(f"menu:{choice}"):
+                keep = run_choice(backend, choice, is_windows)
+            if profile and keep:
+                print(S.DIM + "\n" + telemetry.format_breakdown(telemetry.last_action()) + S.RESET)
+        if not keep:
+            break
+        pause()
 
         clear(); banner()
         print(S.DIM + f"Sistema operativo detectado: {so}" + S.RESET)
 
+def stale_note(backend):
+    """Aviso cuando se muestran datos del snapshot anterior mientras corre el escaneo en segundo plano."""
+    if getattr(backend, "stale", False):
+        since = datetime.fromtimestamp(backend.stale_since).strftime("%Y-%m-%d %H:%M")
+        print(S.YELLOW + f"Mostrando el inventario del {since}; actualizando en segundo plano…" + S.RESET)
+
+def show_history():
+    """Opción 9: últimos snapshots de este equipo, delta entre dos y búsqueda por proveedor/versión/HWID."""
+    from report import export_delta
+    store = history_store()
+    host = platform.node() or "local"
+    snaps = store.snapshots(host=host, limit=10)
+    print_header(f"Historial de {host}")
+    if not snaps:
+        print(S.YELLOW + "Aún no hay snapshots: usa la opción 1 para escanear." + S.RESET)
+        return
+    for sn in snaps:
+        print(f"#{str(sn.id).rjust(4)} | {sn.taken_at} | {sn.total} drivers, {sn.outdated} desactualizados")
+    print(S.DIM + "\nEnter: comparar los dos últimos | 'A B': comparar snapshots | "
+          "'b': buscar por proveedor/versión/HWID" + S.RESET)
+    ans = input("> ").strip()
+    if ans.lower() == "b":
+        provider = input("Proveedor (Enter = cualquiera): ").strip() or None
+        hwid = input("Prefijo de HWID (Enter = cualquiera): ").strip() or None
+        below = input("Solo versiones anteriores a (Enter = todas): ").strip() or None
+        rows = store.find(provider=provider, hardware_id=hwid, below=below)
+        for h, when, dev, prov, hw, ver in rows:
+            print(f"{h} | {when} | {dev} | {prov} | {ver}")
+        print(S.CYAN + f"\n{len(rows)} coincidencias (último snapshot de cada equipo)." + S.RESET)
+        return
+    parts = ans.split()
+    if len(parts) == 2 and all(p.isdigit() for p in parts):
+        old_id, new_id = int(parts[0]), int(parts[1])
+    elif not parts and len(snaps) >= 2:
+        old_id, new_id = snaps[1].id, snaps[0].id
+    else:
+        print(S.RED + "Se necesitan dos snapshots válidos ❌" + S.RESET)
+        return
+    try:
+        delta = store.delta(old_id, new_id)
+    except KeyError as e:
+        print(S.RED + str(e) + S.RESET)
+        return
+    labels = {"added": ("+", S.GREEN), "removed": ("-", S.RED), "upgraded": ("↑", S.CYAN),
+              "regressed": ("↓", S.YELLOW), "changed": ("~", S.GRAY)}
+    for kind, r in delta.rows():
+        mark, color = labels[kind]
+        print(color + f"{mark} {r.device} ({r.provider}): {r.old or '—'} -> {r.new or '—'}" + S.RESET)
+    print(S.CYAN + f"\n{delta.summary()}" + S.RESET)
+    print("•", export_delta(delta, REPORTS_DIR))
+
+def run_choice(backend, choice: str, is_windows: bool) -> bool:
+    """Ejecuta una opción del menú (sin la pausa final, para no medir la espera). False = salir."""
+    if choice in ("1", "r"):
+        items = scan_live(backend, refresh=(choice == "r"))
+        print_header("Inventario de drivers")
+        print_table(items, "Inventario de drivers")
+        changes = getattr(backend, "last_changes", None)
+        if changes:
+            print(S.DIM + f"\nCambios desde el escaneo anterior: {changes.summary()}" + S.RESET)
+        sid = record_snapshot(items, mode="Windows" if is_windows else "simulado")
+        if sid:
+            print(S.DIM + f"Snapshot #{sid} guardado en el historial." + S.RESET)
+
+    elif choice == "2":
+        items = backend.outdated()
+        print_header("Drivers desactualizados")
+        stale_note(backend)
+        if items: print_table(items, "Drivers desactualizados")
+        else: print(S.GREEN + "\nTodo actualizado 🎉" + S.RESET)
+
+    elif choice == "3":
+        print_header("Actualizando drivers desactualizados")
+        results = backend.update_all(on_progress=print_progress)
+        print_install_summary(results)
+
+    elif choice == "4":
+        idx = input("Ingresa el ID del driver a actualizar: ").strip()
+        if not idx.isdigit():
+            print(S.RED + "ID inválido ❌" + S.RESET)
+            return True
+        ok = backend.update_one(int(idx))
+        print(S.GREEN + "Actualizado ✅" + S.RESET if ok else S.RED + "ID no encontrado ❌" + S.RESET)
+
+    elif choice == "5":
+        paths = backend.export_report(REPORTS_DIR)
+        print(S.GREEN + "\nReportes creados:" + S.RESET)
+        for p in paths:
+            print("•", p)
+
+    elif choice == "6":
+        print_header("Links de descarga manual")
+        stale_note(backend)
+        for id_, name, link in backend.manual_links():
+            print(f"{str(id_).rjust(2)} | {name} -> {link}")
+
+    elif choice == "7" and is_windows:
+        print_header("Instalación OFFLINE desde .\\drivers")
+        print(S.DIM + "Coloca paquetes con .INF dentro de ./drivers (recursivo)." + S.RESET)
+        default = DRIVERS_DIR
+        path = input(f"Ruta de carpeta (Enter para usar por defecto: {default}): ").strip() or default
+        if path == default:
+            prefetch_packages(backend)  # completa ./drivers desde el catálogo local, si lo hay
+        try:
+            rc, out = backend.install_offline(path)  # type: ignore[attr-defined]
+            print("\nCódigo de retorno:", rc)
+            print(out if out else "(sin salida)")
+            if rc == 0:
+                print(S.GREEN + "\nInstalación offline finalizada (puede requerir reinicio)." + S.RESET)
+            elif rc == -1:
+                print(S.RED + "\nError: revise la ruta o permisos (ejecutar como Administrador)." + S.RESET)
+            else:
+                print(S.YELLOW + "\npnputil devolvió un código distinto de 0. Revise el detalle arriba." + S.RESET)
+        except AttributeError:
+            print(S.RED + "El backend actual no soporta instalación offline." + S.RESET)
+
+    elif choice == "8":
+        print_header("Tiempos de la última acción")
+        if not telemetry.enabled():
+            telemetry.enable(SPANS_PATH)
+            print(S.YELLOW + "La medición estaba apagada; queda activada desde ahora "
+                  "(o arranca con --profile). Repite la acción y vuelve a esta opción." + S.RESET)
+        else:
+            print(telemetry.format_breakdown(telemetry.last_action()))
+
+    elif choice == "9":
+        show_history()
+
+    elif choice == "0":
+        print(S.DIM + "\nGracias por usar DriverAid. ¡Hasta pronto!" + S.RESET)
+        return False
+    else:
+        print(S.RED + "Opción inválida ❌" + S.RESET)
+    return True
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.fleet:
+        run_fleet(args.fleet, args.concurrency, args.timeout, args.retries, force_preflight=args.repair)
+    elif args.watch:
+        run_watch(args.publish, args.debounce, force_preflight=args.repair, refresh=args.refresh)
+    elif args.import_catalog or args.compact_catalog:
+        run_catalog(args.import_catalog, args.incremental, args.compact_catalog)
+    elif args.prefetch:
+        run_prefetch(args.downloads, force_preflight=args.repair)
+    else:
+        main(timing=args.timing, force_preflight=args.repair, profile=args.profile, refresh=args.refresh)
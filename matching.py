@@ -0,0 +1,175 @@
+# matching.py — Índice de títulos de Windows Update para asociarlos a drivers (Aho-Corasick + tokens)
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from hwid import split_hwids
+
+_WS = re.compile(r"\s+")
+_TOKEN = re.compile(r"[a-z0-9_&]+")
+# Palabras que no identifican a un dispositivo concreto
+_STOPWORDS = {
+    "the", "and", "for", "inc", "corp", "corporation", "ltd", "co", "driver", "drivers",
+    "device", "controller", "adapter", "adaptador", "controlador", "dispositivo", "de", "del",
+    "usb", "pci", "r", "tm",
+}
+
+
+def normalize(text: str) -> str:
+    return _WS.sub(" ", (text or "").lower()).strip()
+
+
+def tokens(text: str) -> List[str]:
+    return _TOKEN.findall(normalize(text))
+
+
+def _significant(text: str) -> Set[str]:
+    return {t for t in tokens(text) if len(t) >= 3 and t not in _STOPWORDS}
+
+
+def hwid_keys(hardware_id: str) -> List[str]:
+    """Claves de búsqueda de un HWID: 'PCI\\VEN_8086&DEV_15BE&...' -> ['ven_8086&dev_15be&...', 'ven_8086&dev_15be']."""
+    keys: List[str] = []
+    for hw in split_hwids(hardware_id):
+        body = hw.lower().split("\\", 1)[-1]
+        if not body:
+            continue
+        keys.append(body)
+        parts = body.split("&")
+        if len(parts) > 2:
+            keys.append("&".join(parts[:2]))
+    return keys
+
+
+class AhoCorasick:
+    """Autómata multi-patrón: encuentra todos los patrones contenidos en un texto en una pasada."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self.patterns: List[str] = []
+        for p in patterns:
+            self._add(p)
+        self._build()
+
+    def _add(self, pattern: str):
+        idx = len(self.patterns)
+        self.patterns.append(pattern)
+        if not pattern:
+            return
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({}); self._fail.append(0); self._out.append([])
+            node = nxt
+        self._out[node].append(idx)
+
+    def _build(self):
+        q = deque(self._goto[0].values())
+        while q:
+            node = q.popleft()
+            for ch, nxt in self._goto[node].items():
+                q.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def findall(self, text: str) -> Set[int]:
+        """Índices de los patrones que aparecen en 'text'."""
+        found: Set[int] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class UpdateIndex:
+    """Se construye una vez por lista de updates; asocia drivers a su update más probable."""
+
+    def __init__(self, updates: Sequence[dict]):
+        self.updates = list(updates)
+        self.titles = [normalize(u.get("Title", "")) for u in self.updates]
+        self._title_tokens: List[Set[str]] = [set(_TOKEN.findall(t)) for t in self.titles]
+        self._by_token: Dict[str, List[int]] = {}
+        for i, toks in enumerate(self._title_tokens):
+            for t in toks:
+                self._by_token.setdefault(t, []).append(i)
+
+    def __len__(self):
+        return len(self.updates)
+
+    def match_all(self, drivers: Sequence) -> List[Optional[dict]]:
+        """Update asociado a cada driver (o None), en el mismo orden que 'drivers'.
+
+        Prioridad: nombre del dispositivo en el título, luego HWID, y por último el proveedor,
+        que solo cuenta si el título comparte alguna palabra significativa con el dispositivo
+        (así un update de Intel no marca como desactualizados todos los drivers de Intel).
+        """
+        result: List[Optional[dict]] = [None] * len(drivers)
+        if not self.updates or not drivers:
+            return result
+
+        # Patrones únicos: dispositivo y proveedor normalizados
+        pat_ids: Dict[str, int] = {}
+        dev_pat: List[int] = []
+        prov_pat: List[int] = []
+        for d in drivers:
+            ids = []
+            for text in (d.device, d.provider):
+                p = normalize(text)
+                if p and p not in pat_ids:
+                    pat_ids[p] = len(pat_ids)
+                ids.append(pat_ids[p] if p else -1)
+            dev_pat.append(ids[0]); prov_pat.append(ids[1])
+
+        ac = AhoCorasick(pat_ids)
+        first_title: Dict[int, int] = {}
+        titles_by_pat: Dict[int, List[int]] = {}
+        for ti, title in enumerate(self.titles):
+            for pi in ac.findall(title):
+                first_title.setdefault(pi, ti)
+                titles_by_pat.setdefault(pi, []).append(ti)
+
+        for i, d in enumerate(drivers):
+            ti = first_title.get(dev_pat[i]) if dev_pat[i] >= 0 else None
+            if ti is None:
+                ti = self._match_hwid(getattr(d, "hardware_id", ""))
+            if ti is None and prov_pat[i] >= 0 and prov_pat[i] in titles_by_pat:
+                words = _significant(d.device) - _significant(d.provider)
+                if words:
+                    ti = next((t for t in titles_by_pat[prov_pat[i]] if words & self._title_tokens[t]), None)
+            if ti is not None:
+                result[i] = self.updates[ti]
+        return result
+
+    def match(self, driver) -> Optional[dict]:
+        """match_all() para un solo driver: con dos patrones basta buscar subcadenas, sin autómata."""
+        titles = self.titles
+        dev, prov = normalize(driver.device), normalize(driver.provider)
+        ti = next((t for t, title in enumerate(titles) if dev in title), None) if dev else None
+        if ti is None:
+            ti = self._match_hwid(getattr(driver, "hardware_id", ""))
+        if ti is None and prov:
+            words = _significant(driver.device) - _significant(driver.provider)
+            if words:
+                ti = next((t for t, title in enumerate(titles) if prov in title and words & self._title_tokens[t]), None)
+        return self.updates[ti] if ti is not None else None
+
+    def _match_hwid(self, hardware_id: str) -> Optional[int]:
+        for key in hwid_keys(hardware_id):
+            hits = self._by_token.get(key)
+            if hits:
+                return hits[0]
+        return None
@@ -0,0 +1,411 @@
+# package_cache.py — Caché de paquetes de drivers por hash de contenido: descarga reanudable, prefetch y desalojo LRU
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+import telemetry
+from update_cache import atomic_write_text
+from versions import NEWER, compare
+
+log = logging.getLogger("driveraid.packages")
+
+CACHE_DIR = ".cache"                     # dentro de drivers/ (DriverRepository ignora carpetas con punto)
+INDEX_VERSION = 1
+MANIFEST = ".driveraid-manifest.json"    # hash de cada archivo extraído, se comprueba antes de pnputil
+DEFAULT_MAX_BYTES = int(float(os.environ.get("DRIVERAID_CACHE_MAX_GB", "4")) * 2**30)
+_CHUNK = 1 << 16
+
+# Estados de FetchResult
+CACHED, DOWNLOADED, FAILED = "en caché", "descargado", "fallido"
+
+
+class IntegrityError(Exception):
+    pass
+
+
+@dataclass
+class PackageRef:
+    url: str
+    sha256: str = ""   # hash esperado; vacío = se direcciona por el hash de lo descargado
+    name: str = ""     # para mostrar (título del catálogo)
+
+    @property
+    def key(self) -> str:
+        return self.sha256.lower() or self.url
+
+
+@dataclass
+class FetchResult:
+    ref: PackageRef
+    status: str = ""
+    sha256: str = ""
+    path: str = ""       # objeto en la caché
+    folder: str = ""     # paquete extraído bajo drivers/ (lo indexa DriverRepository)
+    detail: str = ""
+    received: int = 0    # bytes transferidos en esta llamada
+    resumed: bool = False
+    seconds: float = 0.0
+
+
+def _hash_file(path: str, h=None):
+    h = h or hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h
+
+
+def plan_packages(drivers, catalog) -> List[PackageRef]:
+    """Paquetes del catálogo más nuevos que lo instalado (uno por paquete aunque lo compartan varios drivers)."""
+    drivers = list(drivers)
+    refs: Dict[str, PackageRef] = {}
+    for d, e in zip(drivers, catalog.resolve(d.hardware_id or "" for d in drivers)):
+        if e is None or not e.url or compare(e.version, d.version_installed) != NEWER:
+            continue
+        ref = PackageRef(e.url, e.sha256, e.title or d.device)
+        refs.setdefault(ref.key, ref)
+    return list(refs.values())
+
+
+# -------------------- Verificación de paquetes extraídos --------------------
+def _manifest_files(folder: str) -> Dict[str, str]:
+    out = {}
+    for dirpath, _dirs, files in os.walk(folder):
+        for name in files:
+            if name != MANIFEST:
+                path = os.path.join(dirpath, name)
+                out[os.path.relpath(path, folder).replace(os.sep, "/")] = path
+    return out
+
+
+def verify_folder(folder: str) -> List[str]:
+    """Problemas de un paquete extraído frente a su manifiesto (vacío = íntegro)."""
+    try:
+        with open(os.path.join(folder, MANIFEST), encoding="utf-8") as f:
+            expected = json.load(f)["files"]
+    except (OSError, ValueError, KeyError) as e:
+        return [f"manifiesto ilegible: {e}"]
+    problems = []
+    present = _manifest_files(folder)
+    for rel, digest in expected.items():
+        path = present.pop(rel, None)
+        if path is None:
+            problems.append(f"falta {rel}")
+        elif _hash_file(path).hexdigest() != digest:
+            problems.append(f"modificado {rel}")
+    problems.extend(f"añadido {rel}" for rel in sorted(present))
+    return problems
+
+
+def check_package(inf_path: str, root: str) -> Optional[List[str]]:
+    """Verifica el paquete de la caché que contiene 'inf_path'.
+
+    None si el INF no viene de la caché (paquete copiado a mano: no hay manifiesto con que comparar).
+    """
+    root = os.path.abspath(root)
+    folder = os.path.dirname(os.path.abspath(inf_path))
+    while folder.startswith(root + os.sep):
+        if os.path.exists(os.path.join(folder, MANIFEST)):
+            return verify_folder(folder)
+        folder = os.path.dirname(folder)
+    return None
+
+
+# -------------------- Caché --------------------
+class PackageCache:
+    """Paquetes descargados en <root>/.cache/objects/<sha256>, extraídos en <root>/pkg-<sha256[:16]>.
+
+    Un mismo paquete (mismo contenido) se guarda una sola vez aunque lo pidan varios drivers o
+    equipos. Las descargas a medias quedan en .cache/partial y se reanudan con 'Range'. Al
+    superar 'max_bytes' se desalojan los paquetes usados hace más tiempo.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES, timeout: float = 60.0, retries: int = 3):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.retries = max(1, retries)
+        base = os.path.join(self.root, CACHE_DIR)
+        self.objects = os.path.join(base, "objects")
+        self.partial = os.path.join(base, "partial")
+        self.index_path = os.path.join(base, "index.json")
+        os.makedirs(self.objects, exist_ok=True)
+        os.makedirs(self.partial, exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._index: Dict[str, dict] = self._load_index()
+
+    # -------------------- Índice --------------------
+    def _load_index(self) -> Dict[str, dict]:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+            index = data.get("objects", {}) if data.get("version") == INDEX_VERSION else {}
+        except (OSError, ValueError):
+            index = {}
+        # El disco manda: objetos borrados a mano salen del índice, los huérfanos entran
+        on_disk = {}
+        for name in os.listdir(self.objects):
+            path = os.path.join(self.objects, name)
+            if len(name) == 64 and os.path.isfile(path):
+                st = os.stat(path)
+                entry = index.get(name) or {"url": "", "name": "", "last_used": st.st_mtime}
+                entry["size"] = st.st_size
+                on_disk[name] = entry
+        return on_disk
+
+    def save(self):
+        with self._lock:
+            payload = json.dumps({"version": INDEX_VERSION, "objects": self._index}, ensure_ascii=False)
+        try:
+            atomic_write_text(self.index_path, payload)
+        except OSError as e:
+            log.warning("No se pudo guardar el índice de la caché de paquetes: %s", e)
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.objects, sha256)
+
+    def _lookup(self, ref: PackageRef) -> Optional[str]:
+        with self._lock:
+            if ref.sha256:
+                sha = ref.sha256.lower()
+                return sha if sha in self._index else None
+            for sha, entry in self._index.items():
+                if entry.get("url") == ref.url:
+                    return sha
+        return None
+
+    def _touch(self, sha256: str, ref: Optional[PackageRef] = None, size: Optional[int] = None):
+        with self._lock:
+            entry = self._index.setdefault(sha256, {"url": "", "name": "", "size": 0})
+            entry["last_used"] = time.time()
+            if ref is not None:
+                entry["url"], entry["name"] = ref.url, ref.name or entry["name"]
+            if size is not None:
+                entry["size"] = size
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return sum(e["size"] for e in self._index.values())
+
+    def __len__(self):
+        return len(self._index)
+
+    # -------------------- Descarga --------------------
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _transfer(self, ref: PackageRef, part: str, res: FetchResult):
+        """Un intento: continúa el .part existente si el servidor acepta 'Range'."""
+        have = os.path.getsize(part) if os.path.exists(part) else 0
+        req = urllib.request.Request(ref.url, headers={"Range": f"bytes={have}-"} if have else {})
+        try:
+            resp = urllib.request.urlopen(req, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and have:
+                return  # el .part ya está completo: lo decide el hash
+            raise
+        with resp:
+            if have and resp.status != 206:
+                have = 0  # el servidor ignoró 'Range': se empieza de cero
+            res.resumed = res.resumed or have > 0
+            expected = int(resp.headers.get("Content-Length") or -1)
+            got = 0
+            with open(part, "ab" if have else "wb") as f:
+                while True:
+                    chunk = resp.read(_CHUNK)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    got += len(chunk)
+            res.received += got
+        # Conexión cortada a mitad: lo recibido queda en el .part para el siguiente intento
+        if 0 <= got < expected:
+            raise ConnectionError(f"transferencia incompleta ({have + got} bytes)")
+
+    def fetch(self, ref: PackageRef, save: bool = True) -> FetchResult:
+        """Devuelve el paquete desde la caché o lo descarga (con reintentos que reanudan)."""
+        t0 = time.perf_counter()
+        res = FetchResult(ref)
+        with self._key_lock(ref.key):
+            sha = self._lookup(ref)
+            if sha is not None and os.path.exists(self.object_path(sha)):
+                self._touch(sha, ref)
+                res.status, res.sha256, res.path = CACHED, sha, self.object_path(sha)
+            else:
+                part = os.path.join(self.partial, hashlib.sha256(ref.key.encode("utf-8")).hexdigest()[:32] + ".part")
+                for attempt in range(self.retries):
+                    try:
+                        self._transfer(ref, part, res)
+                        break
+                    except (OSError, urllib.error.URLError) as e:  # incluye IncompleteRead y timeouts
+                        res.detail = str(e) or type(e).__name__
+                        log.info("Descarga de %s interrumpida (intento %d): %s", ref.url, attempt + 1, res.detail)
+                        if attempt + 1 < self.retries:
+                            time.sleep(0.2 * 2 ** attempt)
+                else:
+                    res.status, res.seconds = FAILED, time.perf_counter() - t0
+                    return res
+                digest = _hash_file(part).hexdigest()
+                if ref.sha256 and digest != ref.sha256.lower():
+                    os.remove(part)
+                    res.status, res.detail = FAILED, f"hash incorrecto: {digest[:12]}… (se esperaba {ref.sha256[:12]}…)"
+                    res.seconds = time.perf_counter() - t0
+                    return res
+                os.replace(part, self.object_path(digest))
+                self._touch(digest, ref, os.path.getsize(self.object_path(digest)))
+                res.status, res.sha256, res.path, res.detail = DOWNLOADED, digest, self.object_path(digest), ""
+        if save:
+            self.save()
+        res.seconds = time.perf_counter() - t0
+        return res
+
+    def prefetch(self, refs: Iterable[PackageRef], max_parallel: int = 4, extract: bool = True,
+                 on_progress: Optional[Callable[[FetchResult], None]] = None) -> List[FetchResult]:
+        """Descarga (y extrae) todos los paquetes de un plan, como mucho 'max_parallel' a la vez.
+
+        Los paquetes repetidos se piden una sola vez. Al terminar se aplica el límite de tamaño
+        sin desalojar nada de lo recién pedido.
+        """
+        unique: Dict[str, PackageRef] = {}
+        for ref in refs:
+            unique.setdefault(ref.key, ref)
+        todo = list(unique.values())
+        results: List[Optional[FetchResult]] = [None] * len(todo)
+        pending = iter(enumerate(todo))
+        lock = threading.Lock()
+        parent = None
+
+        def worker():
+            while True:
+                with lock:
+                    nxt = next(pending, None)
+                if nxt is None:
+                    return
+                i, ref = nxt
+                with telemetry.span("packages.fetch", parent=parent, url=ref.url) as sp:
+                    res = self.fetch(ref, save=False)
+                    if extract and res.status != FAILED:
+                        try:
+                            res.folder = self.extract(res.sha256)
+                        except (OSError, IntegrityError, zipfile.BadZipFile) as e:
+                            res.status, res.detail = FAILED, f"extracción: {e}"
+                    sp.set(status=res.status, bytes=res.received)
+                results[i] = res
+                if on_progress:
+                    with lock:
+                        on_progress(res)
+
+        with telemetry.span("packages.prefetch", packages=len(todo)):
+            parent = telemetry.current()  # los workers heredan el span (y la acción) del prefetch
+            workers = [threading.Thread(target=worker, name=f"prefetch-{n}", daemon=True)
+                       for n in range(min(max(1, max_parallel), len(todo)))]
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+        done = [r for r in results if r is not None]
+        self.evict(keep={r.sha256 for r in done if r.sha256})
+        self.save()
+        return done
+
+    # -------------------- Extracción --------------------
+    def folder_for(self, sha256: str) -> str:
+        return os.path.join(self.root, f"pkg-{sha256[:16]}")
+
+    def extract(self, sha256: str) -> str:
+        """Extrae el paquete a drivers/pkg-<hash> (una vez) y escribe el manifiesto de hashes.
+
+        Antes de extraer se vuelve a comprobar el hash del objeto: un objeto dañado se borra.
+        """
+        folder = self.folder_for(sha256)
+        try:
+            with open(os.path.join(folder, MANIFEST), encoding="utf-8") as f:
+                if json.load(f).get("sha256") == sha256:
+                    return folder
+        except (OSError, ValueError):
+            pass
+        obj = self.object_path(sha256)
+        if _hash_file(obj).hexdigest() != sha256:
+            self.remove(sha256)
+            raise IntegrityError(f"el objeto {sha256[:12]}… de la caché está dañado")
+        tmp = tempfile.mkdtemp(prefix="extract-", dir=os.path.join(self.root, CACHE_DIR))
+        try:
+            with open(obj, "rb") as f:
+                magic = f.read(4)
+            if magic == b"PK\x03\x04":
+                _extract_zip(obj, tmp)
+            elif magic == b"MSCF":
+                _extract_cab(obj, tmp)
+            else:
+                raise IntegrityError("formato de paquete no soportado (se esperaba .zip o .cab)")
+            files = {rel: _hash_file(path).hexdigest() for rel, path in _manifest_files(tmp).items()}
+            with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+                json.dump({"sha256": sha256, "files": files}, f, indent=1)
+            if os.path.exists(folder):
+                shutil.rmtree(folder)
+            os.replace(tmp, folder)
+        finally:
+            if os.path.exists(tmp):
+                shutil.rmtree(tmp, ignore_errors=True)
+        return folder
+
+    # -------------------- Desalojo --------------------
+    def remove(self, sha256: str):
+        with self._lock:
+            self._index.pop(sha256, None)
+        try:
+            os.remove(self.object_path(sha256))
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(self.folder_for(sha256), ignore_errors=True)
+
+    def evict(self, max_bytes: Optional[int] = None, keep: Iterable[str] = ()) -> List[str]:
+        """Borra los paquetes menos usados (objeto y carpeta extraída) hasta quedar bajo el límite."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        keep = set(keep)
+        with self._lock:
+            total = sum(e["size"] for e in self._index.values())
+            victims = []
+            for sha, entry in sorted(self._index.items(), key=lambda kv: kv[1].get("last_used", 0)):
+                if total <= limit:
+                    break
+                if sha in keep:
+                    continue
+                victims.append(sha)
+                total -= entry["size"]
+        for sha in victims:
+            self.remove(sha)
+            log.info("Caché de paquetes: desalojado %s", sha[:12])
+        return victims
+
+
+def _extract_zip(path: str, dest: str):
+    dest = os.path.abspath(dest)
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            target = os.path.abspath(os.path.join(dest, info.filename))
+            if not target.startswith(dest + os.sep):
+                raise IntegrityError(f"ruta no permitida en el paquete: {info.filename}")
+        zf.extractall(dest)
+
+
+def _extract_cab(path: str, dest: str):
+    if os.name != "nt":
+        raise IntegrityError("los .cab solo se pueden extraer en Windows (expand.exe)")
+    cp = subprocess.run(["expand.exe", "-F:*", path, dest], capture_output=True, text=True)
+    if cp.returncode != 0:
+        raise OSError((cp.stdout or cp.stderr or "").strip() or f"expand.exe devolvió {cp.returncode}")
@@ -0,0 +1,146 @@
+# preflight.py — Preparación del entorno Windows (admin, wmi, PSWindowsUpdate) con sello de pasos hechos
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+# Subir este número obliga a repetir todos los pasos en el próximo arranque
+PREFLIGHT_VERSION = 1
+
+Runner = Callable[..., "subprocess.CompletedProcess"]
+
+
+def _is_windows():
+    return platform.system() == "Windows"
+
+def _run(cmd, **kw):
+    return subprocess.run(cmd, check=False, text=True, capture_output=True, **kw)
+
+def ensure_admin_windows():
+    """Relanza el proceso con permisos de admin si no los tiene (dispara UAC)."""
+    if not _is_windows():
+        return
+    try:
+        import ctypes
+        if not ctypes.windll.shell32.IsUserAnAdmin():
+            params = " ".join([f'"{p}"' if " " in p else p for p in sys.argv])
+            ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, params, None, 1)
+            sys.exit(0)
+    except Exception:
+        # Si falla la detección, seguimos normal (algunas UIs especiales)
+        pass
+
+def _has_module(name: str) -> bool:
+    """El módulo se puede importar (sin importarlo: basta con localizarlo)."""
+    return importlib.util.find_spec(name) is not None
+
+def ensure_python_dep(pkg, import_name=None, runner: Runner = _run) -> bool:
+    """Instala un paquete pip si no está disponible."""
+    if _has_module(import_name or pkg):
+        return True
+    cp = runner([sys.executable, "-m", "pip", "install", pkg])
+    return cp.returncode == 0
+
+def _prefer_local_pswindowsupdate():
+    """
+    Si existe un módulo local en .\\modules\\PSWindowsUpdate, lo antepone al PSModulePath
+    (útil en entornos corporativos sin PSGallery).
+    """
+    local = os.path.join(os.path.dirname(__file__), "modules", "PSWindowsUpdate")
+    if os.path.isdir(local):
+        # Prepend al PSModulePath
+        cur = os.environ.get("PSModulePath", "")
+        if local not in cur:
+            os.environ["PSModulePath"] = f"{local};{cur}" if cur else local
+
+def ensure_pswindowsupdate(runner: Runner = _run) -> bool:
+    """Instala y activa PSWindowsUpdate + Microsoft Update (si no está). True si quedó disponible."""
+    ps = r"""
+$ErrorActionPreference='SilentlyContinue'
+# Instalar NuGet provider si falta
+if (-not (Get-PackageProvider -Name NuGet -ListAvailable)) {
+  Install-PackageProvider -Name NuGet -MinimumVersion 2.8.5.201 -Force | Out-Null
+}
+# Confiar en PSGallery
+try { Set-PSRepository -Name PSGallery -InstallationPolicy Trusted } catch {}
+# Instalar módulo si falta
+if (-not (Get-Module -ListAvailable -Name PSWindowsUpdate)) {
+  try { Install-Module PSWindowsUpdate -Force } catch {}
+}
+Import-Module PSWindowsUpdate -ErrorAction SilentlyContinue
+# Agregar Microsoft Update
+try { Add-WUServiceManager -MicrosoftUpdate -Confirm:$false | Out-Null } catch {}
+if (Get-Module -ListAvailable -Name PSWindowsUpdate) { 'PREFLIGHT-OK' }
+"""
+    cp = runner(["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps])
+    return "PREFLIGHT-OK" in (cp.stdout or "")
+
+def has_pswindowsupdate(runner: Runner = _run) -> bool:
+    """Comprobación barata (sin instalar nada) de que PSWindowsUpdate sigue disponible."""
+    ps = "if (Get-Module -ListAvailable -Name PSWindowsUpdate) { 'PREFLIGHT-OK' }"
+    cp = runner(["powershell", "-NoProfile", "-NonInteractive", "-Command", ps])
+    return "PREFLIGHT-OK" in (cp.stdout or "")
+
+
+# -------------------- Sello --------------------
+def load_stamp(path: str) -> Dict[str, dict]:
+    """Pasos completados según el sello; vacío si no existe o es de otra versión."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != PREFLIGHT_VERSION:
+        return {}
+    return data.get("steps", {})
+
+def save_stamp(path: str, steps: Dict[str, dict]):
+    from update_cache import atomic_write_text
+    try:
+        atomic_write_text(path, json.dumps({"version": PREFLIGHT_VERSION, "steps": steps}, indent=1))
+    except OSError:
+        pass  # sin sello solo se pierde el atajo del próximo arranque
+
+def run_preflight(stamp_path: str, runner: Runner = _run, force: bool = False,
+                  is_windows: Optional[bool] = None) -> Dict[str, str]:
+    """Ejecuta los pasos pendientes y devuelve {paso: 'hecho' | 'omitido' | 'fallido'}.
+
+    Un paso se omite si el sello lo registra como completado para este mismo intérprete y una
+    comprobación barata confirma que sigue en su sitio (un módulo desinstalado después se
+    vuelve a instalar). 'runner' recibe la lista de argumentos y devuelve algo con
+    returncode/stdout (como subprocess.run), así se puede sustituir por un stub fuera de Windows.
+    """
+    if is_windows is None:
+        is_windows = _is_windows()
+    if not is_windows:
+        return {}
+    _prefer_local_pswindowsupdate()
+
+    done = {} if force else load_stamp(stamp_path)
+    # paso -> (comprobación barata, instalación)
+    steps = {
+        "wmi": (lambda: _has_module("wmi"), lambda: ensure_python_dep("wmi", runner=runner)),
+        "pswindowsupdate": (lambda: has_pswindowsupdate(runner=runner),
+                            lambda: ensure_pswindowsupdate(runner=runner)),
+    }
+    results: Dict[str, str] = {}
+    changed = False
+    for name, (probe, step) in steps.items():
+        prev = done.get(name)
+        if prev and prev.get("python") == sys.executable and probe():
+            results[name] = "omitido"
+            continue
+        ok = step()
+        results[name] = "hecho" if ok else "fallido"
+        if ok:
+            done[name] = {"python": sys.executable, "at": time.strftime("%Y-%m-%d %H:%M:%S")}
+            changed = True
+        elif done.pop(name, None) is not None:
+            changed = True  # el sello ya no debe darlo por hecho
+    if changed:
+        save_stamp(stamp_path, done)
+    return results
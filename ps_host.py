@@ -0,0 +1,151 @@
+# ps_host.py — Hosts PowerShell persistentes (pool) con mensajes enmarcados por stdin/stdout
+import json
+import queue
+import subprocess
+import threading
+import time
+from typing import List, Optional, Tuple
+
+# Prefijo de las respuestas: cualquier otra línea en stdout se ignora (ruido del host).
+RESPONSE_MARK = "<<DRIVERAID>>"
+
+# Bucle del host: lee una petición JSON por línea ({"id", "script"}) y responde
+# con una línea RESPONSE_MARK + JSON ({"id", "rc", "out", "err"}).
+_HOST_LOOP = r"""
+$ErrorActionPreference='SilentlyContinue'
+[Console]::InputEncoding = [Text.UTF8Encoding]::new($false)
+[Console]::OutputEncoding = [Text.UTF8Encoding]::new($false)
+Import-Module PSWindowsUpdate -ErrorAction SilentlyContinue
+while ($true) {
+  $line = [Console]::In.ReadLine()
+  if ($line -eq $null) { break }
+  if (-not $line.Trim()) { continue }
+  $req = $line | ConvertFrom-Json
+  $out = ''; $err = ''; $rc = 0
+  try {
+    $global:LASTEXITCODE = 0
+    $res = & ([ScriptBlock]::Create($req.script)) 2>&1
+    $out = ($res | Where-Object { $_ -isnot [System.Management.Automation.ErrorRecord] } | Out-String)
+    $err = ($res | Where-Object { $_ -is [System.Management.Automation.ErrorRecord] } | Out-String)
+    if ($global:LASTEXITCODE) { $rc = $global:LASTEXITCODE }
+  } catch {
+    $err = ($_ | Out-String); $rc = 1
+  }
+  $resp = @{ id = $req.id; rc = $rc; out = $out; err = $err } | ConvertTo-Json -Compress
+  [Console]::Out.WriteLine('""" + RESPONSE_MARK + r"""' + $resp)
+  [Console]::Out.Flush()
+}
+"""
+
+DEFAULT_COMMAND = ["powershell", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass",
+                   "-Command", _HOST_LOOP]
+
+
+class PSHostError(RuntimeError):
+    pass
+
+
+class PSHost:
+    """Un proceso PowerShell de larga vida que ejecuta scripts enviados por stdin."""
+
+    def __init__(self, command: Optional[List[str]] = None):
+        self.command = list(command or DEFAULT_COMMAND)
+        self._proc: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._seq = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        if self.alive:
+            return
+        self._lines = queue.Queue()
+        self._proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", errors="replace", bufsize=1,
+        )
+        t = threading.Thread(target=self._reader, args=(self._proc, self._lines), daemon=True)
+        t.start()
+
+    @staticmethod
+    def _reader(proc: subprocess.Popen, lines: "queue.Queue[Optional[str]]"):
+        for line in proc.stdout:
+            if line.startswith(RESPONSE_MARK):
+                lines.put(line[len(RESPONSE_MARK):])
+        lines.put(None)  # EOF: el host murió
+
+    def stop(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.poll() is None:
+                proc.stdin.close()
+                try:
+                    proc.wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+        except Exception:
+            pass
+
+    def run(self, script: str, timeout: Optional[float] = None) -> Tuple[int, str, str]:
+        """Ejecuta un script y devuelve (rc, stdout, stderr). Reinicia el host si muere o expira."""
+        self.start()
+        self._seq += 1
+        req_id = self._seq
+        try:
+            self._proc.stdin.write(json.dumps({"id": req_id, "script": script}) + "\n")
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.stop()
+            return -1, "", f"Host PowerShell no disponible: {e}"
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                line = self._lines.get(timeout=wait)
+            except queue.Empty:
+                self.stop()
+                return -1, "", f"Tiempo de espera agotado ({timeout}s); host reiniciado."
+            if line is None:
+                self.stop()
+                return -1, "", "El host PowerShell terminó inesperadamente; se reiniciará."
+            try:
+                resp = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if resp.get("id") != req_id:
+                continue  # respuesta atrasada de una petición anterior
+            return int(resp.get("rc") or 0), resp.get("out") or "", resp.get("err") or ""
+
+
+class PSPool:
+    """Pool pequeño de PSHost; cada host atiende una petición a la vez."""
+
+    def __init__(self, size: int = 1, command: Optional[List[str]] = None):
+        self.size = max(1, size)
+        self.command = command
+        self._idle: "queue.LifoQueue[PSHost]" = queue.LifoQueue()
+        for _ in range(self.size):
+            self._idle.put(PSHost(command))
+        self._all: List[PSHost] = list(self._idle.queue)
+        self._closed = False
+
+    def run(self, script: str, timeout: Optional[float] = None) -> Tuple[int, str, str]:
+        if self._closed:
+            raise PSHostError("El pool PowerShell está cerrado.")
+        host = self._idle.get()
+        try:
+            return host.run(script, timeout=timeout)
+        finally:
+            self._idle.put(host)
+
+    def close(self):
+        self._closed = True
+        for h in self._all:
+            h.stop()
@@ -0,0 +1,80 @@
+# report.py — Exportación de reportes en streaming (HTML, CSV y JSON Lines en una sola pasada)
+import json
+import os
+from datetime import datetime
+from html import escape
+from typing import Iterable, Tuple
+
+import telemetry
+
+BUFFER_SIZE = 1 << 16
+
+HEADERS = ["ID", "Dispositivo", "Proveedor", "VersionInstalada", "VersionLatest", "Estado", "Link"]
+
+_HTML_HEAD = """<html><head><meta charset="utf-8"><title>DriverAid Report</title>
+<style>body{{font-family:Segoe UI, Arial}} table{{border-collapse:collapse;width:100%}}
+th,td{{border:1px solid #ddd;padding:8px}} th{{background:#f2f2f2}}</style></head>
+<body><h1>DriverAid - Reporte ({mode})</h1>
+<p>Fecha: {now}</p>
+<table><thead><tr>
+<th>ID</th><th>Dispositivo</th><th>Proveedor</th><th>Instalada</th><th>Última</th><th>Estado</th><th>Link</th>
+</tr></thead><tbody>"""
+_HTML_TAIL = "</tbody></table></body></html>"
+
+
+def _html_row(d) -> str:
+    return (
+        f"<tr><td>{d.id}</td><td>{escape(d.device)}</td><td>{escape(d.provider)}</td>"
+        f"<td>{escape(d.version_installed)}</td><td>{escape(d.version_latest)}</td>"
+        f"<td>{escape(d.status)}</td><td><a href='{escape(d.manual_link)}' target='_blank'>Catálogo</a></td></tr>\n"
+    )
+
+
+def export_report(drivers: Iterable, folder: str, mode: str) -> Tuple[str, str, str]:
+    """Escribe los tres formatos recorriendo 'drivers' una sola vez (memoria constante).
+
+    'drivers' puede ser cualquier iterable, incluido un generador; nunca se materializa.
+    Devuelve (html, csv, jsonl).
+    """
+    import csv  # solo se necesita al exportar
+
+    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+    base = os.path.join(folder, f"DriverAid-Report-{ts}")
+    html_path, csv_path, jsonl_path = base + ".html", base + ".csv", base + ".jsonl"
+
+    with telemetry.span("export_report") as sp, \
+         open(html_path, "w", encoding="utf-8", buffering=BUFFER_SIZE) as fh, \
+         open(csv_path, "w", newline="", encoding="utf-8", buffering=BUFFER_SIZE) as fc, \
+         open(jsonl_path, "w", encoding="utf-8", buffering=BUFFER_SIZE) as fj:
+        fh.write(_HTML_HEAD.format(mode=escape(mode), now=datetime.now()))
+        writer = csv.writer(fc)
+        writer.writerow(HEADERS)
+        dumps = json.JSONEncoder(ensure_ascii=False).encode
+        rows = 0
+        for d in drivers:
+            rows += 1
+            fh.write(_html_row(d))
+            writer.writerow([d.id, d.device, d.provider, d.version_installed, d.version_latest, d.status, d.manual_link])
+            fj.write(dumps({
+                "id": d.id, "device": d.device, "provider": d.provider,
+                "version_installed": d.version_installed, "version_latest": d.version_latest,
+                "status": d.status, "hardware_id": d.hardware_id, "link": d.manual_link,
+            }))
+            fj.write("\n")
+        fh.write(_HTML_TAIL)
+        sp.set(rows=rows)
+
+    return html_path, csv_path, jsonl_path
+
+
+def export_delta(delta, folder: str) -> str:
+    """CSV con las diferencias entre dos snapshots del historial (history.Delta)."""
+    import csv
+
+    path = os.path.join(folder, f"DriverAid-Delta-{delta.old.id}-{delta.new.id}.csv")
+    with open(path, "w", newline="", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+        writer = csv.writer(f)
+        writer.writerow(["Cambio", "Dispositivo", "Proveedor", "HardwareID", "VersionAnterior", "VersionNueva"])
+        for kind, r in delta.rows():
+            writer.writerow([kind, r.device, r.provider, r.hardware_id, r.old, r.new])
+    return path
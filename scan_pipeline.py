@@ -0,0 +1,83 @@
+# scan_pipeline.py — Escaneo en tubería: enumeración de drivers y búsqueda de updates a la vez
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import telemetry
+
+
+class PipelinedScan:
+    """Lanza la búsqueda de updates en un hilo y entrega los drivers a medida que se enumeran.
+
+    La enumeración se consume en el hilo que itera (WMI/COM ya está inicializado ahí); la
+    búsqueda de updates (PowerShell, minutos) va en paralelo, así que el escaneo completo
+    tarda lo que la más lenta de las dos y no su suma. 'fetch_updates' = None es modo offline.
+    """
+
+    def __init__(self, enumerate_drivers: Callable[[], Iterable], fetch_updates: Optional[Callable[[], list]]):
+        self._enumerate = enumerate_drivers
+        self._fetch = fetch_updates
+        self._thread: Optional[threading.Thread] = None
+        self._updates: Optional[list] = None
+        self._error: Optional[BaseException] = None
+        self.drivers: List = []
+        self.enum_s = 0.0
+        self.updates_s = 0.0
+
+    def _run_updates(self, parent):
+        t0 = time.perf_counter()
+        try:
+            with telemetry.span("scan.updates", parent=parent):
+                self._updates = self._fetch()
+        except BaseException as e:  # se relanza en wait_updates(), en el hilo que escanea
+            self._error = e
+        finally:
+            self.updates_s = time.perf_counter() - t0
+
+    def start(self) -> "PipelinedScan":
+        if self._fetch is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._run_updates, args=(telemetry.current(),),
+                                            name="scan-updates", daemon=True)
+            self._thread.start()
+        return self
+
+    def __iter__(self) -> Iterator:
+        self.start()
+        t0 = time.perf_counter()
+        for d in self._enumerate():
+            self.drivers.append(d)
+            yield d
+        self.enum_s = time.perf_counter() - t0
+
+    def wait_updates(self, timeout: Optional[float] = None) -> Optional[list]:
+        """Lista de updates (None en modo offline); relanza el error de la búsqueda si lo hubo."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                raise TimeoutError("la búsqueda de updates no terminó a tiempo")
+        if self._error is not None:
+            raise self._error
+        return self._updates
+
+    def run(self) -> Tuple[List, Optional[list]]:
+        """Escaneo completo sin consumir por el camino: (drivers, updates)."""
+        for _ in self:
+            pass
+        return self.drivers, self.wait_updates()
+
+
+# -------------------- Fuentes con latencia (pruebas y benchmarks sin Windows) --------------------
+def delayed(items: Iterable, latency: float) -> Iterator:
+    """Entrega cada elemento tras 'latency' segundos (una fila WMI por viaje COM)."""
+    for item in items:
+        if latency:
+            time.sleep(latency)
+        yield item
+
+
+def delayed_call(result, latency: float) -> Callable[[], object]:
+    """Función que devuelve 'result' tras 'latency' segundos (la búsqueda de Windows Update)."""
+    def call():
+        time.sleep(latency)
+        return result
+    return call
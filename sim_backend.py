@@ -1,8 +1,20 @@
 # sim_backend.py — Backend de simulación (macOS/Linux o modo demo)
-from dataclasses import dataclass, field
-from typing import List, Tuple
-from datetime import datetime
-import csv
+import logging
+import threading
+from collections import namedtuple
+from dataclasses import dataclass, field, replace
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import telemetry
+from driver_table import OUTDATED, DriverTable, DriverView
+from hwid import primary_hwid
+from installer import InstallResult, InstallScheduler, PlanItem, SimInstaller, build_plan, verify
+from inventory import ChangeSet, Inventory, driver_key
+from report import export_report
+from scan_pipeline import PipelinedScan, delayed, delayed_call
+from versions import is_up_to_date, up_to_date_many
+
+log = logging.getLogger("driveraid.sim")
 
 @dataclass
 class Driver:
@@ -14,11 +26,15 @@ class Driver:
     hardware_id: str
     status: str = field(default="Desconocido")
     manual_link: str = field(default="")
+    instance_id: str = field(default="")
 
-    def refresh_status(self):
-        self.status = "Actualizado" if self.version_installed == self.version_latest else "Desactualizado"
+    def refresh_status(self, up_to_date: Optional[bool] = None):
+        """'up_to_date' ya calculado por lotes (up_to_date_many); si falta se compara aquí."""
+        if up_to_date is None:
+            up_to_date = is_up_to_date(self.version_installed, self.version_latest)
+        self.status = "Actualizado" if up_to_date else "Desactualizado"
         if not self.manual_link:
-            q = self.hardware_id.replace(" ", "%20")
+            q = primary_hwid(self.hardware_id).replace(" ", "%20")
             self.manual_link = f"https://www.catalog.update.microsoft.com/Search.aspx?q={q}"
 
 def _sample_data() -> List["Driver"]:
@@ -31,76 +47,210 @@ def _sample_data() -> List["Driver"]:
     ]
     items = [Driver(*r) for r in raw]
     for d in items:
+        d.instance_id = f"{d.hardware_id}\\SIM&{d.id:04d}"
         d.refresh_status()
     return items
 
+# Fabricantes sintéticos: (proveedor, bus, VEN/VID, dispositivos típicos, versión base)
+_VENDORS = [
+    ("Intel", "PCI", "8086", ["Ethernet Connection I219-V", "UHD Graphics", "Wi-Fi 6 AX201", "SATA AHCI Controller",
+                              "Management Engine Interface", "Serial IO I2C Host Controller"], (30, 0, 101)),
+    ("Realtek", "HDAUDIO", "10EC", ["High Definition Audio", "Audio Console"], (6, 0, 9)),
+    ("Realtek", "PCI", "10EC", ["PCIe GbE Family Controller", "PCIE CardReader"], (10, 50, 5)),
+    ("NVIDIA", "PCI", "10DE", ["GeForce RTX 3060", "GeForce GTX 1650", "HD Audio Driver"], (31, 0, 15)),
+    ("Advanced Micro Devices, Inc.", "PCI", "1002", ["Radeon Graphics", "PSP 11.0 Device"], (31, 0, 21)),
+    ("Qualcomm", "PCI", "17CB", ["QCA61x4A Wireless Network Adapter"], (12, 0, 0)),
+    ("Synaptics", "HID", "06CB", ["SMBus TouchPad", "Fingerprint Reader"], (19, 5, 35)),
+    ("Logitech", "USB", "046D", ["USB Receiver", "HD Webcam C920", "G502 Mouse"], (1, 10, 0)),
+    ("Microsoft", "PCI", "1414", ["Standard NVM Express Controller", "Hyper-V Video"], (10, 0, 19041)),
+    ("Broadcom", "USB", "0A5C", ["Bluetooth USB Module"], (12, 0, 1)),
+]
+
+def _synthetic_hwid(bus: str, ven: str, dev_id: int, rnd) -> str:
+    if bus == "USB":
+        return f"USB\\VID_{ven}&PID_{dev_id:04X}&REV_{rnd.randint(0, 0x20):04X}"
+    if bus == "HDAUDIO":
+        return f"HDAUDIO\\FUNC_01&VEN_{ven}&DEV_{dev_id:04X}&SUBSYS_{rnd.getrandbits(32):08X}"
+    if bus == "HID":
+        return f"HID\\VID_{ven}&PID_{dev_id:04X}"
+    return f"PCI\\VEN_{ven}&DEV_{dev_id:04X}&SUBSYS_{rnd.getrandbits(32):08X}&REV_{rnd.randint(0, 0x10):02X}"
+
+def synthetic_data(count: int, seed: int = 0) -> List["Driver"]:
+    """Inventario sintético reproducible para pruebas de escala (fabricantes, HWIDs y versiones realistas).
+
+    Aproximadamente el 60 % está al día, el 35 % desactualizado y el 5 % por encima de la última versión.
+    """
+    import random
+    rnd = random.Random(seed)
+    items = []
+    for i in range(1, count + 1):
+        prov, bus, ven, names, base = rnd.choice(_VENDORS)
+        dev_id = rnd.randint(0, 0xFFFF)
+        latest = (*base, rnd.randint(1000, 9999))
+        roll = rnd.random()
+        if roll < 0.60:
+            inst = latest
+        elif roll < 0.95:
+            inst = (latest[0] - rnd.randint(0, 2), latest[1], latest[2], rnd.randint(0, latest[3] - 1))
+        else:
+            inst = (*latest[:3], latest[3] + rnd.randint(1, 50))
+        d = Driver(i, f"{rnd.choice(names)} #{i}", prov, ".".join(map(str, inst)), ".".join(map(str, latest)),
+                   _synthetic_hwid(bus, ven, dev_id, rnd))
+        d.instance_id = f"{d.hardware_id}\\SIM&{i:07d}"
+        d.refresh_status()
+        items.append(d)
+    return items
+
+# Lo que build_plan necesita de cada driver desactualizado, leído por columnas (sin vistas de fila)
+_Pending = namedtuple("_Pending", "id device provider version_latest status")
+
+
 class SimBackend:
-    def __init__(self):
-        self.drivers: List[Driver] = _sample_data()
+    def __init__(self, devices: Optional[List[Driver]] = None, catalog=None):
+        # "Hardware" simulado: estado real de los dispositivos; el inventario es lo último escaneado
+        self._devices: List[Driver] = devices if devices is not None else _sample_data()
+        self._device_by_key = {driver_key(d): d for d in self._devices}
+        # El feed de eventos de watch.py conecta y cambia dispositivos desde otro hilo: quien
+        # modifique o copie _devices/_device_by_key lo hace con este lock
+        self._hw_lock = threading.Lock()
+        self._inventory = Inventory()
+        self.drivers: DriverTable = self._inventory.table
+        self.last_changes = ChangeSet()
+        # Catálogo local opcional (LocalCatalog): completa version_latest como en WinBackend
+        self.catalog = catalog
+        # Instalador sustituible: permite inyectar latencia y fallos en pruebas
+        self.installer = SimInstaller(self)
+        # Latencias de scan_iter(): segundos por fila enumerada y de la búsqueda de updates
+        self.enum_latency = 0.0
+        self.updates_latency = 0.0
+        self.scan()
+
+    def _query(self, keys: Optional[set] = None) -> List[Driver]:
+        with telemetry.span("sim.query") as sp:
+            with self._hw_lock:
+                if keys is None:
+                    devices = self._devices
+                else:
+                    devices = [d for d in map(self._device_by_key.get, keys) if d is not None]
+                out = [replace(dev, id=0, status="Desconocido", manual_link="") for dev in devices]
+            self._classify(out)
+            sp.set(rows=len(out))
+        return out
+
+    def _classify(self, items: List[Driver]):
+        if self.catalog is not None:
+            self.catalog.fill(items)
+        for d, ok in zip(items, up_to_date_many(items)):
+            d.refresh_status(ok)
 
     # 1) Escaneo
-    def scan(self) -> List[Driver]:
-        for d in self.drivers:
-            d.refresh_status()
+    def scan(self, refresh: bool = False) -> DriverTable:
+        # 'refresh' por paridad con WinBackend: el simulador no tiene caché de updates
+        self.last_changes = self._inventory.reconcile(self._query())
+        log.info("Escaneo simulado: %d drivers (%s)", len(self.drivers), self.last_changes.summary())
         return self.drivers
 
+    # 1a) Escaneo en tubería (como WinBackend.scan_iter): drivers según se enumeran, updates en paralelo
+    def scan_iter(self, refresh: bool = False) -> Iterator[Driver]:
+        with self._hw_lock:
+            devices = [replace(dev, id=0, status="Desconocido", manual_link="") for dev in self._devices]
+        pipe = PipelinedScan(lambda: delayed(devices, self.enum_latency), delayed_call([], self.updates_latency))
+        yield from pipe
+        with telemetry.span("sim.pipeline", rows=len(pipe.drivers)) as sp:
+            pipe.wait_updates()
+            sp.set(enum_s=round(pipe.enum_s, 3), updates_s=round(pipe.updates_s, 3))
+            self._classify(pipe.drivers)
+            self.last_changes = self._inventory.reconcile(pipe.drivers)
+        log.info("Escaneo simulado en tubería: %d drivers (%s)", len(self.drivers), self.last_changes.summary())
+
+    # 1b) Reescaneo incremental: solo los IDs indicados (o todo si no se indican)
+    def rescan(self, driver_ids: Optional[List[int]] = None) -> ChangeSet:
+        if driver_ids is None:
+            self.scan()
+            return self.last_changes
+        keys = {k for k in (self._inventory.key_of(i) for i in driver_ids) if k}
+        self.last_changes = self._inventory.reconcile(self._query(keys), keys=keys)
+        log.debug("Reescaneo simulado de %d drivers: %s", len(keys), self.last_changes.summary())
+        return self.last_changes
+
+    # 1c) Reescaneo por DeviceID (eventos de conexión/desconexión; el dispositivo puede ser nuevo)
+    def rescan_devices(self, instance_ids: List[str]) -> ChangeSet:
+        keys = {i.lower() for i in instance_ids if i}
+        self.last_changes = self._inventory.reconcile(self._query(keys), keys=keys)
+        log.debug("Reescaneo simulado de %d dispositivos: %s", len(keys), self.last_changes.summary())
+        return self.last_changes
+
+    # Hardware simulado: conectar/desconectar dispositivos (lo usa el feed de eventos de watch.py)
+    def connected(self) -> List[Driver]:
+        """Copia de la lista de dispositivos conectados."""
+        with self._hw_lock:
+            return list(self._devices)
+
+    def plug(self, device: Driver):
+        with self._hw_lock:
+            self._devices.append(device)
+            self._device_by_key[driver_key(device)] = device
+
+    def unplug(self, instance_id: str) -> Optional[Driver]:
+        with self._hw_lock:
+            dev = self._device_by_key.pop(instance_id.lower(), None)
+            if dev is not None:
+                self._devices.remove(dev)
+        return dev
+
+    def set_installed(self, instance_id: str, version: str) -> bool:
+        """Cambia la versión instalada de un dispositivo conectado (instalación fuera de DriverAid)."""
+        with self._hw_lock:
+            dev = self._device_by_key.get(instance_id.lower())
+            if dev is None:
+                return False
+            dev.version_installed = version
+        return True
+
     # 2) Filtrar desactualizados
-    def outdated(self) -> List[Driver]:
-        return [d for d in self.drivers if d.status == "Desactualizado"]
-
-    # 3) Actualizar todos (simulado)
-    def update_all(self) -> Tuple[int, int]:
-        updated = 0; skipped = 0
-        for d in self.drivers:
-            d.refresh_status()
-            if d.status == "Desactualizado":
-                d.version_installed = d.version_latest
-                d.refresh_status()
-                updated += 1
-            else:
-                skipped += 1
-        return updated, skipped
+    def outdated(self) -> DriverView:
+        return self.drivers.outdated()
+
+    def _install(self, driver) -> bool:
+        key = driver_key(driver)
+        with self._hw_lock:
+            dev = self._device_by_key.get(key)
+            if dev is None:
+                return False
+            dev.version_installed = dev.version_latest
+        return True
+
+    # 3) Actualizar todos (simulado): descargas concurrentes, instalación en lotes
+    def plan_updates(self) -> Tuple[List[PlanItem], List[InstallResult]]:
+        """Plan de instalación de los desactualizados (en la simulación cada driver tiene su propio update)."""
+        # Tuplas simples hasta build_plan: el GC deja de seguirlas, las namedtuple no
+        rows = [r for r in self.drivers.columns("device", "provider", "version_latest", "status") if r[4] == OUTDATED]
+        updates = ({"UpdateID": f"SIM-{i}", "Title": f"{provider} - {device} - {latest}"}
+                   for i, device, provider, latest, _status in rows)
+        return build_plan(map(_Pending._make, rows), updates)
+
+    def update_all(self, on_progress: Optional[Callable] = None,
+                   max_downloads: int = 4, batch_size: int = 4) -> List[InstallResult]:
+        plan, skipped = self.plan_updates()
+        log.info("Actualización simulada: %d updates en el plan, %d sin update", len(plan), len(skipped))
+        results = InstallScheduler(self.installer, max_downloads, batch_size, on_progress).run(plan)
+        if results:
+            self.rescan([r.driver_id for r in results])
+        return verify(results + skipped, self.drivers)
 
     # 4) Actualizar uno por ID (simulado)
     def update_one(self, driver_id: int) -> bool:
-        for d in self.drivers:
-            if d.id == driver_id:
-                d.version_installed = d.version_latest
-                d.refresh_status()
-                return True
-        return False
+        target = self._inventory.get(driver_id)
+        if target is None:
+            return False
+        self._install(target)
+        log.info("Actualización simulada de %s a %s", target.device, target.version_latest)
+        self.rescan([driver_id])
+        return True
 
     # 5) Generar reporte (HTML y CSV)
-    def export_report(self, folder: str) -> Tuple[str, str]:
-        ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-        html_path = f"{folder}/DriverAid-Report-{ts}.html"
-        csv_path  = f"{folder}/DriverAid-Report-{ts}.csv"
-
-        rows = []
-        for d in self.drivers:
-            rows.append(
-                f"<tr><td>{d.id}</td><td>{d.device}</td><td>{d.provider}</td>"
-                f"<td>{d.version_installed}</td><td>{d.version_latest}</td>"
-                f"<td>{d.status}</td><td><a href='{d.manual_link}' target='_blank'>Catálogo</a></td></tr>"
-            )
-        html = f"""<html><head><meta charset="utf-8"><title>DriverAid Report</title>
-<style>body{{font-family:Segoe UI, Arial}} table{{border-collapse:collapse;width:100%}}
-th,td{{border:1px solid #ddd;padding:8px}} th{{background:#f2f2f2}}</style></head>
-<body><h1>DriverAid - Reporte (simulado)</h1>
-<p>Fecha: {datetime.now()}</p>
-<table><thead><tr>
-<th>ID</th><th>Dispositivo</th><th>Proveedor</th><th>Instalada</th><th>Última</th><th>Estado</th><th>Link</th>
-</tr></thead><tbody>{''.join(rows)}</tbody></table></body></html>"""
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(html)
-
-        with open(csv_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["ID","Dispositivo","Proveedor","VersionInstalada","VersionLatest","Estado","Link"])
-            for d in self.drivers:
-                writer.writerow([d.id,d.device,d.provider,d.version_installed,d.version_latest,d.status,d.manual_link])
-
-        return html_path, csv_path
+    def export_report(self, folder: str) -> Tuple[str, str, str]:
+        return export_report(self.drivers, folder, "simulado")
 
     # 6) Obtener links
     def manual_links(self):
@@ -0,0 +1,197 @@
+# snapshot.py — Último inventario en binario (registros fijos + tabla de strings) para arranque en caliente
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from collections import namedtuple
+from typing import Iterable, Iterator, List, Optional
+
+from driver_table import FIELDS
+from update_cache import atomic_write_bytes
+
+MAGIC = b"DAIDSNAP"
+FORMAT_VERSION = 1
+
+# magic, versión, reservado, nº de registros, fecha (epoch), bytes de strings, bytes de updates, crc32
+_HEADER = struct.Struct("<8sHHIdQQI")
+# id + (offset, longitud) en la tabla de strings por cada campo de FIELDS
+_RECORD = struct.Struct("<I" + "II" * len(FIELDS))
+
+
+# Fila decodificada completa (lectura en bloque para restaurar el inventario)
+SnapshotRecord = namedtuple("SnapshotRecord", ("id",) + FIELDS)
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _checksum(header_wo_crc: bytes, body) -> int:
+    return zlib.crc32(body, zlib.crc32(header_wo_crc)) & 0xFFFFFFFF
+
+
+def encode(drivers: Iterable, updates: List[dict], taken_at: Optional[float] = None) -> bytes:
+    """Serializa el inventario; cada string distinto se guarda una sola vez."""
+    strings = bytearray()
+    offsets = {}
+
+    def ref(value: str):
+        pos = offsets.get(value)
+        if pos is None:
+            raw = (value or "").encode("utf-8")
+            pos = offsets[value] = (len(strings), len(raw))
+            strings.extend(raw)
+        return pos
+
+    records = bytearray()
+    count = 0
+    for d in drivers:
+        refs = []
+        for f in FIELDS:
+            refs.extend(ref(getattr(d, f, "") or ""))
+        records.extend(_RECORD.pack(d.id, *refs))
+        count += 1
+    upd = json.dumps(updates, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    body = bytes(records) + bytes(strings) + upd
+    head = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, count, taken_at or time.time(), len(strings), len(upd), 0)
+    crc = _checksum(head[:-4], body)
+    return head[:-4] + struct.pack("<I", crc) + body
+
+
+def write_snapshot(path: str, drivers: Iterable, updates: List[dict], taken_at: Optional[float] = None):
+    """Escritura atómica: un lector (o escritor) concurrente ve el archivo anterior o el nuevo, nunca uno mezclado."""
+    atomic_write_bytes(path, encode(drivers, updates, taken_at))
+
+
+class SnapshotRow:
+    """Registro leído bajo demanda: cada campo se decodifica al accederlo."""
+    __slots__ = ("_s", "_i", "id")
+
+    def __init__(self, snap: "InventorySnapshot", index: int):
+        self._s = snap
+        self._i = index
+        self.id = snap._record(index)[0]
+
+    def __getattr__(self, name: str) -> str:
+        try:
+            pos = FIELDS.index(name)
+        except ValueError:
+            raise AttributeError(name) from None
+        rec = self._s._record(self._i)
+        return self._s._string(rec[1 + 2 * pos], rec[2 + 2 * pos])
+
+    def __repr__(self):
+        return f"SnapshotRow(id={self.id}, device={self.device!r}, status={self.status!r})"
+
+
+class InventorySnapshot:
+    """Snapshot mapeado en memoria. Al abrirlo solo se valida cabecera y checksum; nada se decodifica."""
+
+    def __init__(self, mm: mmap.mmap, path: str):
+        self._mm = mm
+        self.path = path
+        magic, version, _flags, count, taken_at, str_len, upd_len, crc = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise SnapshotError("no es un snapshot de DriverAid")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"versión de formato {version} no soportada")
+        self.count = count
+        self.taken_at = taken_at
+        self._records = _HEADER.size
+        self._strings = self._records + count * _RECORD.size
+        self._updates = self._strings + str_len
+        if self._updates + upd_len != len(mm):
+            raise SnapshotError("tamaño inconsistente (archivo truncado)")
+        body = memoryview(mm)[_HEADER.size:]
+        try:
+            ok = _checksum(bytes(mm[:_HEADER.size - 4]), body) == crc
+        finally:
+            body.release()
+        if not ok:
+            raise SnapshotError("checksum incorrecto")
+        self._upd_len = upd_len
+
+    @classmethod
+    def open(cls, path: str) -> "InventorySnapshot":
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise SnapshotError("archivo demasiado corto")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(mm, path)
+        except Exception:
+            mm.close()
+            raise
+
+    def close(self):
+        # Liberar el mapeo pronto: en Windows impide reemplazar el archivo
+        if not self._mm.closed:
+            self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _record(self, index: int) -> tuple:
+        return _RECORD.unpack_from(self._mm, self._records + index * _RECORD.size)
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings + offset
+        return self._mm[start:start + length].decode("utf-8")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index: int) -> SnapshotRow:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return SnapshotRow(self, index)
+
+    def __iter__(self) -> Iterator[SnapshotRow]:
+        for i in range(self.count):
+            yield SnapshotRow(self, i)
+
+    def records(self) -> Iterator[SnapshotRecord]:
+        """Todas las filas decodificadas; cada string de la tabla se decodifica una sola vez."""
+        mm, base = self._mm, self._strings
+        cache = {}
+        view = memoryview(mm)[self._records:self._strings]
+        try:
+            for rec in _RECORD.iter_unpack(view):
+                values = [rec[0]]
+                for j in range(1, len(rec), 2):
+                    length = rec[j + 1]
+                    if not length:
+                        # El string vacío comparte offset con el que le sigue: no va a la caché
+                        values.append("")
+                        continue
+                    off = rec[j]
+                    s = cache.get(off)
+                    if s is None:
+                        s = cache[off] = mm[base + off:base + off + length].decode("utf-8")
+                    values.append(s)
+                yield SnapshotRecord._make(values)
+        finally:
+            view.release()
+
+    @property
+    def updates(self) -> List[dict]:
+        return json.loads(self._mm[self._updates:self._updates + self._upd_len].decode("utf-8"))
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.taken_at)
+
+
+def load_snapshot(path: str) -> Optional[InventorySnapshot]:
+    """El snapshot si existe y es válido; None si falta, está corrupto o es de otra versión."""
+    try:
+        return InventorySnapshot.open(path)
+    except (OSError, ValueError, struct.error, SnapshotError):
+        return None
@@ -0,0 +1,229 @@
+# telemetry.py — Spans de tiempo anidados (PowerShell, WMI, updates, matching, instalación, reportes)
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class _State:
+    enabled = False
+    path: Optional[str] = None
+    out = None             # archivo JSONL abierto
+    open_actions: Dict[int, List[dict]] = {}  # id del span raíz -> registros de esa acción en curso
+    last: List[dict] = []
+    next_id = 1
+
+
+_state = _State()
+
+
+class _Noop:
+    """Lo que devuelve span() con la instrumentación apagada: no mide ni asigna nada."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP = _Noop()
+
+
+def _stack() -> List["Span"]:
+    st = getattr(_local, "stack", None)
+    if st is None:
+        st = _local.stack = []
+    return st
+
+
+class Span:
+    """Bloque medido. Hereda la acción de su padre: un hilo que recibe 'parent' al crearse
+    sigue contando para la acción que lo lanzó, aunque entretanto empiece otra."""
+    __slots__ = ("name", "attrs", "parent", "action", "id", "depth", "start", "t0", "ms")
+
+    def __init__(self, name: str, attrs: dict, parent: Optional["Span"] = None):
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.action: Optional["Span"] = None
+        self.id = 0
+        self.depth = 0
+        self.start = 0.0
+        self.t0 = 0.0
+        self.ms = 0.0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = _stack()
+        if self.parent is None and stack:
+            self.parent = stack[-1]
+        self.depth = self.parent.depth + 1 if self.parent is not None else 0
+        if self.action is None and self.parent is not None:
+            self.action = self.parent.action
+        with _lock:
+            self.id = _state.next_id
+            _state.next_id += 1
+        stack.append(self)
+        self.start = time.time()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.ms = (time.perf_counter() - self.t0) * 1000
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _finish(self)
+        return False
+
+
+def _finish(sp: Span):
+    action = sp.action
+    rec = {
+        "ts": round(sp.start, 6),
+        "action": action.name if action is not None else None,
+        "span": sp.name,
+        "id": sp.id,
+        "parent": sp.parent.id if sp.parent is not None else None,
+        "depth": sp.depth,
+        "ms": round(sp.ms, 3),
+        "thread": threading.current_thread().name,
+    }
+    rec.update(sp.attrs)
+    with _lock:
+        records = _state.open_actions.get(action.id) if action is not None else None
+        if records is not None:  # un hilo rezagado de una acción ya cerrada no se cuela en otra
+            records.append(rec)
+        if _state.out is not None:
+            _state.out.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+
+
+# -------------------- API --------------------
+def enabled() -> bool:
+    return _state.enabled
+
+
+def enable(path: Optional[str] = None):
+    """Activa la instrumentación; si hay 'path', cada span se añade como una línea JSON."""
+    with _lock:
+        _state.enabled = True
+        if path and _state.out is None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            _state.out = open(path, "a", encoding="utf-8", buffering=1 << 16)
+            _state.path = path
+
+
+def disable():
+    with _lock:
+        _state.enabled = False
+        if _state.out is not None:
+            _state.out.close()
+            _state.out = None
+
+
+def span(name: str, parent: Optional[Span] = None, **attrs):
+    """Context manager que mide un bloque. 'parent' enlaza spans creados en otros hilos."""
+    if not _state.enabled:
+        return NOOP
+    return Span(name, attrs, parent)
+
+
+def record(name: str, ms: float, parent: Optional[Span] = None, **attrs):
+    """Registra un span ya medido (p. ej. un generador que no puede tener un span abierto
+    mientras cede el control); 'ms' es su duración y termina ahora."""
+    if not _state.enabled:
+        return
+    sp = Span(name, attrs, parent)
+    sp.depth = parent.depth + 1 if parent is not None else 0
+    sp.action = parent.action if parent is not None else None
+    with _lock:
+        sp.id = _state.next_id
+        _state.next_id += 1
+    sp.ms = ms
+    sp.start = time.time() - ms / 1000
+    _finish(sp)
+
+
+def current() -> Optional[Span]:
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+class action:
+    """Span raíz de una acción del usuario (p. ej. una opción del menú); guarda su desglose."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._span = None
+
+    def __enter__(self):
+        if not _state.enabled:
+            return NOOP
+        self._span = Span(self.name, {"kind": "action"})
+        self._span.action = self._span
+        self._span.__enter__()
+        with _lock:
+            _state.open_actions[self._span.id] = []
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is None:
+            return False
+        self._span.__exit__(exc_type, exc, tb)
+        with _lock:
+            _state.last = _state.open_actions.pop(self._span.id, [])
+            if _state.out is not None:
+                _state.out.flush()
+        return False
+
+
+def last_action() -> List[dict]:
+    return list(_state.last)
+
+
+def breakdown(records: List[dict]) -> List[Dict]:
+    """Tiempo por fase (nombre de span) de una acción: llamadas, total y % sobre la acción.
+
+    Las fases que corren en paralelo (p. ej. descargas) pueden sumar más del 100 %.
+    """
+    root = next((r for r in records if r.get("kind") == "action"), None)
+    total = root["ms"] if root else sum(r["ms"] for r in records if r["depth"] == 0)
+    phases: Dict[str, Dict] = {}
+    for r in records:
+        if r is root:
+            continue
+        p = phases.setdefault(r["span"], {"phase": r["span"], "calls": 0, "ms": 0.0, "depth": r["depth"]})
+        p["calls"] += 1
+        p["ms"] += r["ms"]
+        p["depth"] = min(p["depth"], r["depth"])
+    rows = sorted(phases.values(), key=lambda p: (-p["ms"]))
+    for p in rows:
+        p["pct"] = 100.0 * p["ms"] / total if total else 0.0
+    return rows
+
+
+def format_breakdown(records: List[dict]) -> str:
+    if not records:
+        return "Sin datos: ninguna acción instrumentada todavía."
+    root = next((r for r in records if r.get("kind") == "action"), None)
+    lines = []
+    if root:
+        lines.append(f"{root['span']}: {root['ms']:.1f} ms")
+    lines.append(f"{'Fase':<28} {'Llamadas':>8} {'Total ms':>10} {'%':>6}")
+    for p in breakdown(records):
+        name = "  " * max(p["depth"] - 1, 0) + p["phase"]
+        lines.append(f"{name:<28} {p['calls']:>8} {p['ms']:>10.1f} {p['pct']:>5.1f}%")
+    return "\n".join(lines)
@@ -0,0 +1,76 @@
+# package_server.py — Servidor HTTP local de paquetes para las pruebas de la caché (Range y cortes simulados)
+import http.server
+import os
+import threading
+import time
+import urllib.parse
+from typing import List, Optional
+
+
+class LocalPackageServer:
+    """Servidor HTTP local que sirve los archivos de 'folder' (con soporte de 'Range').
+
+    Sustituye al servidor de paquetes en pruebas: 'latency' retrasa cada respuesta y
+    'drop_after' corta la primera transferencia de cada archivo tras ese número de bytes
+    (para ejercitar la reanudación).
+    """
+
+    def __init__(self, folder: str, port: int = 0, latency: float = 0.0, drop_after: Optional[int] = None):
+        self.folder = os.path.abspath(folder)
+        self.latency = latency
+        self.drop_after = drop_after
+        self.requests: List[tuple] = []   # (ruta, cabecera Range)
+        self._dropped = set()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._serve(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, name="package-server", daemon=True).start()
+
+    def url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self.port}/{urllib.parse.quote(name)}"
+
+    def _serve(self, h: http.server.BaseHTTPRequestHandler):
+        name = urllib.parse.unquote(h.path.lstrip("/"))
+        rng = h.headers.get("Range", "")
+        with self._lock:
+            self.requests.append((name, rng))
+        if self.latency:
+            time.sleep(self.latency)
+        path = os.path.abspath(os.path.join(self.folder, name))
+        if not path.startswith(self.folder + os.sep) or not os.path.isfile(path):
+            h.send_error(404)
+            return
+        size = os.path.getsize(path)
+        start = int(rng[len("bytes="):].split("-")[0] or 0) if rng.startswith("bytes=") else 0
+        if start >= size and rng:
+            h.send_response(416)
+            h.send_header("Content-Range", f"bytes */{size}")
+            h.end_headers()
+            return
+        h.send_response(206 if rng else 200)
+        if rng:
+            h.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        h.send_header("Content-Length", str(size - start))
+        h.end_headers()
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+        with self._lock:
+            drop = self.drop_after is not None and name not in self._dropped
+            if drop:
+                self._dropped.add(name)
+        h.wfile.write(data[:self.drop_after] if drop else data)
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
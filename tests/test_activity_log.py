@@ -0,0 +1,112 @@
+# test_activity_log.py — RotatingWriter (tamaño, tiempo, poda, gzip) y cierre ordenado de ActivityLog
+import glob
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+
+from activity_log import ActivityLog, RotatingWriter, parse_levels
+
+
+def _rotated(path):
+    base, ext = os.path.splitext(path)
+    return sorted(glob.glob(f"{base}.*{ext}") + glob.glob(f"{base}.*{ext}.gz"), key=os.path.getmtime)
+
+
+def _lines(n, width=40):
+    return [json.dumps({"ts": "2026-10-17T12:00:00.000", "n": i, "pad": "x" * width}) for i in range(n)]
+
+
+def test_rotates_by_size_without_splitting_a_line(tmp_path):
+    path = str(tmp_path / "activity.jsonl")
+    lines = _lines(10)
+    w = RotatingWriter(path, max_bytes=3 * (len(lines[0]) + 1), interval=0, backups=10)
+    w.write(lines)
+    w.close()
+    assert w.rotations == 3
+    kept = [open(p, encoding="utf-8").read().splitlines() for p in _rotated(path)] + \
+           [open(path, encoding="utf-8").read().splitlines()]
+    assert [len(k) for k in kept] == [3, 3, 3, 1]
+    assert sum(kept, []) == lines
+
+
+def test_prunes_to_the_newest_backups(tmp_path):
+    path = str(tmp_path / "activity.jsonl")
+    w = RotatingWriter(path, max_bytes=1, interval=0, backups=2)
+    for line in _lines(5):
+        w.write([line])
+        time.sleep(0.01)  # mtimes distintos: la poda conserva los más recientes
+    w.close()
+    assert w.rotations == 4
+    rotated = _rotated(path)
+    assert len(rotated) == 2
+    kept = [json.loads(open(p, encoding="utf-8").read())["n"] for p in rotated]
+    assert sorted(kept) == [2, 3]
+
+
+def test_compressed_backups(tmp_path):
+    path = str(tmp_path / "activity.jsonl")
+    w = RotatingWriter(path, max_bytes=1, interval=0, backups=5, compress=True)
+    w.write(_lines(2))
+    w.close()
+    [gz] = _rotated(path)
+    assert gz.endswith(".jsonl.gz")
+    assert json.loads(gzip.open(gz, "rt", encoding="utf-8").read())["n"] == 0
+
+
+def test_rotates_by_time_from_the_first_record(tmp_path):
+    path = str(tmp_path / "activity.jsonl")
+    old = json.dumps({"ts": "2020-01-01T00:00:00.000", "msg": "de ayer"})
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(old + "\n")
+    w = RotatingWriter(path, interval=3600, backups=5)
+    w.write(_lines(1))
+    w.close()
+    assert w.rotations == 1
+    assert open(_rotated(path)[0], encoding="utf-8").read() == old + "\n"
+
+
+def test_activity_log_writes_batches_and_stops_cleanly(tmp_path):
+    path = str(tmp_path / "activity.jsonl")
+    act = ActivityLog(path, linger=0.01, max_delay=0.1)
+    logger = logging.getLogger("driveraid.test")
+    logger.propagate = False
+    logger.addHandler(act.handler)
+    logger.setLevel(logging.INFO)
+    try:
+        for i in range(20):
+            logger.info("evento %d", i, extra={"driver": i})
+        assert act.flush(5)
+    finally:
+        logger.removeHandler(act.handler)
+        act.stop()
+    recs = [json.loads(l) for l in open(path, encoding="utf-8")]
+    assert [r["driver"] for r in recs] == list(range(20))
+    assert recs[0]["msg"] == "evento 0" and recs[0]["logger"] == "driveraid.test"
+    assert act.writer._f.closed
+
+
+def test_stop_leaves_the_writer_open_while_the_thread_runs(tmp_path):
+    act = ActivityLog(str(tmp_path / "activity.jsonl"))
+    busy, release = threading.Event(), threading.Event()
+    write = act.writer.write
+
+    def slow_write(lines):
+        busy.set()
+        release.wait(5)
+        write(lines)
+    act.writer.write = slow_write
+    act.handler.handle(logging.LogRecord("driveraid.test", logging.INFO, "", 0, "lento", None, None))
+    assert busy.wait(5)
+    act.stop(timeout=0.05)
+    assert not act.writer._f.closed  # el hilo sigue escribiendo: no se le cierra el archivo
+    release.set()
+    act._thread.join(5)
+    assert not act._thread.is_alive()
+
+
+def test_parse_levels():
+    assert parse_levels("scan=DEBUG, install=warning,root=ERROR,malo=NADA,x") == {
+        "driveraid.scan": logging.DEBUG, "driveraid.install": logging.WARNING, "": logging.ERROR}
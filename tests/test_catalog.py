@@ -0,0 +1,111 @@
+# test_catalog.py — Importación de datasets, binario compilado, deltas y fill()
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from catalog import (CatalogEntry, CatalogError, LocalCatalog, compile_catalog, encode, import_dataset,
+                     load_catalog, read_dataset)
+
+NIC = "PCI\\VEN_8086&DEV_15BE"
+
+
+def _entries(n=50):
+    return [CatalogEntry(f"PCI\\VEN_{i:04X}&DEV_{i * 7 % 65536:04X}", f"1.0.{i}", "Prov", "2024-01-01", f"Dev {i}")
+            for i in range(n)]
+
+
+def test_read_dataset_keeps_highest_version(tmp_path):
+    path = tmp_path / "drivers.csv"
+    path.write_text("HardwareID,DriverVersion,Manufacturer\n"
+                    f"{NIC},12.19.1.39,Intel\n"
+                    f"{NIC.lower()},12.19.2.1,Intel\n"
+                    f"{NIC},12.9.9.9,Intel\n"
+                    "PCI\\VEN_10EC&DEV_8168,,Realtek\n", encoding="utf-8")
+    entries = read_dataset(str(path))
+    assert [(e.hardware_id, e.version) for e in entries] == [(NIC, "12.19.2.1")]
+
+
+def test_read_dataset_json_splits_hwid_lists(tmp_path):
+    path = tmp_path / "drivers.json"
+    path.write_text(json.dumps({"entries": [
+        {"hwid": f"{NIC}&REV_21, USB\\VID_1234&PID_5678", "version": "2.0", "url": "http://x/p.cab",
+         "sha256": "ABC"},
+        "fila inválida",
+    ]}), encoding="utf-8")
+    entries = sorted(read_dataset(str(path)))
+    assert [e.hardware_id for e in entries] == [f"{NIC}&REV_21", "USB\\VID_1234&PID_5678"]
+    assert entries[0].sha256 == "abc" and entries[0].url == "http://x/p.cab"
+
+
+def test_encode_round_trip(tmp_path):
+    entries = _entries()
+    path = tmp_path / "catalog.bin"
+    path.write_bytes(encode(entries, built_at=1000.0))
+    with LocalCatalog(str(path)) as cat:
+        assert len(cat) == len(entries) and cat.built_at == 1000.0
+        assert sorted(cat) == sorted(entries)
+        for e in entries:
+            assert cat.get(e.hardware_id) == e
+        assert cat.get("PCI\\VEN_FFFF&DEV_FFFF") is None
+
+
+def test_lookup_falls_back_to_generic_ids(tmp_path):
+    path = tmp_path / "catalog.bin"
+    compile_catalog([CatalogEntry(NIC, "12.19.2.1", "Intel", "", "")], str(path))
+    with LocalCatalog(str(path)) as cat:
+        assert cat.lookup(f"{NIC}&SUBSYS_00008086&REV_21").version == "12.19.2.1"
+        assert cat.lookup("PCI\\VEN_8086&DEV_0000") is None
+
+
+def test_fill_never_downgrades(tmp_path):
+    path = tmp_path / "catalog.bin"
+    compile_catalog([CatalogEntry(NIC, "12.19.2.1", "Intel", "", "")], str(path))
+    drivers = [SimpleNamespace(hardware_id=NIC, version_latest=""),
+               SimpleNamespace(hardware_id=NIC, version_latest="12.19.1.39"),
+               SimpleNamespace(hardware_id=NIC, version_latest="13.0.0.0"),
+               SimpleNamespace(hardware_id="", version_latest="")]
+    with LocalCatalog(str(path)) as cat:
+        assert cat.fill(drivers) == 2
+    assert [d.version_latest for d in drivers] == ["12.19.2.1", "12.19.2.1", "13.0.0.0", ""]
+
+
+def test_deltas_and_compact(tmp_path):
+    path = tmp_path / "catalog.bin"
+    base = _entries(10)
+    compile_catalog(base, str(path))
+    newer = base[3]._replace(version="9.9.9")
+    extra = CatalogEntry(NIC, "1.0", "Intel", "", "")
+    cat = LocalCatalog(str(path))
+    assert cat.add([base[0], newer, extra]) == 2  # base[0] no cambia
+    assert cat.pending == 2 and len(cat) == 11
+    cat.close()
+    cat = LocalCatalog(str(path))  # los deltas sobreviven a reabrir
+    assert cat.get(newer.hardware_id) == newer
+    cat.compact()
+    assert cat.pending == 0 and len(cat) == 11
+    assert cat.get(newer.hardware_id) == newer and cat.get(NIC) == extra
+    cat.close()
+
+
+def test_import_dataset_replaces_deltas(tmp_path):
+    data = tmp_path / "drivers.csv"
+    data.write_text(f"hwid,version\n{NIC},1.0\n", encoding="utf-8")
+    path = str(tmp_path / "catalog.bin")
+    import_dataset(str(data), path, incremental=True).close()
+    with import_dataset(str(data), path) as cat:
+        assert cat.pending == 0 and cat.get(NIC).version == "1.0"
+
+
+def test_corrupt_catalog_is_rejected(tmp_path, caplog):
+    path = tmp_path / "catalog.bin"
+    raw = bytearray(encode(_entries(5)))
+    raw[-1] ^= 0xFF
+    path.write_bytes(bytes(raw))
+    with pytest.raises(CatalogError):
+        LocalCatalog(str(path))
+    assert load_catalog(str(path)) is None
+    assert "--import-catalog" in caplog.text
+    path.write_bytes(bytes(raw[:-3]))
+    with pytest.raises(CatalogError):
+        LocalCatalog(str(path))
@@ -0,0 +1,100 @@
+# test_driver_repo.py — Parseo de INF de muestra (tests/data/inf) e índice persistente del repositorio
+import os
+import shutil
+
+from driver_repo import DriverRepository, parse_inf, parse_sections
+from sim_backend import Driver
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "inf")
+
+
+def _nic(installed, hwid="PCI\\VEN_8086&DEV_15BE&SUBSYS_06DC1028&REV_21"):
+    return Driver(0, "Intel(R) Ethernet Connection", "Intel", installed, installed, hwid,
+                  instance_id="PCI\\VEN_8086&DEV_15BE\\3&11583659&0&FE")
+
+
+def _repo(tmp_path, *names):
+    root = tmp_path / "drivers"
+    root.mkdir()
+    for name in names:
+        shutil.copy(os.path.join(DATA, name), root / name)
+    return root, DriverRepository(str(root), str(tmp_path / "index.json"))
+
+
+def test_parse_utf8_with_decorations_comments_and_continuations():
+    pkg = parse_inf(os.path.join(DATA, "e1d.inf"))
+    assert (pkg.provider, pkg.driver_class) == ("Intel", "Net")
+    assert (pkg.date, pkg.version) == ("06/21/2023", "12.19.2.45")  # sin el comentario final
+    assert pkg.hwids == ["PCI\\VEN_8086&DEV_15BE", "PCI\\VEN_8086&DEV_15BE&SUBSYS_00008086",
+                         "PCI\\VEN_8086&DEV_0D4F&REV_10"]
+
+
+def test_parse_utf16_with_bom_and_strings():
+    pkg = parse_inf(os.path.join(DATA, "rtkaudio.inf"))
+    assert pkg.provider == "Realtek Semiconductor Corp."
+    assert pkg.version == "6.0.9600.1"
+    assert pkg.hwids == ["HDAUDIO\\FUNC_01&VEN_10EC&DEV_0295",
+                         "HDAUDIO\\FUNC_01&VEN_10EC&DEV_0295&SUBSYS_10280A20"]
+
+
+def test_parse_utf16_without_bom(tmp_path):
+    raw = open(os.path.join(DATA, "rtkaudio.inf"), "rb").read()
+    path = tmp_path / "nobom.inf"
+    path.write_bytes(raw[2:])
+    assert parse_inf(str(path)).provider == "Realtek Semiconductor Corp."
+
+
+def test_semicolons_inside_quotes_are_not_comments():
+    sections = parse_sections('[Strings]\nDesc = "a; b" ; comentario\n')
+    assert sections["strings"] == [("Desc", ["a; b"])]
+
+
+def test_refresh_reuses_the_index(tmp_path):
+    root, repo = _repo(tmp_path, "e1d.inf", "rtkaudio.inf")
+    assert len(repo.refresh()) == 2 and repo.parsed == 2
+
+    again = DriverRepository(str(root), repo.index_path)
+    assert sorted(p.version for p in again.refresh()) == ["12.19.2.45", "6.0.9600.1"]
+    assert again.parsed == 0
+
+    # mtime distinto pero mismo contenido: el hash evita re-parsear
+    os.utime(root / "e1d.inf", (1, 1))
+    again.refresh()
+    assert again.parsed == 0
+
+    with open(root / "e1d.inf", "a", encoding="utf-8") as f:
+        f.write("%E15BENC.DeviceDesc% = E15BE.10.0.1, PCI\\VEN_8086&DEV_15BC\n")
+    again.refresh()
+    assert again.parsed == 1
+
+
+def test_refresh_skips_hidden_directories_and_drops_deleted_files(tmp_path):
+    root, repo = _repo(tmp_path, "e1d.inf", "rtkaudio.inf")
+    (root / ".cache").mkdir()
+    shutil.copy(os.path.join(DATA, "e1d.inf"), root / ".cache" / "partial.inf")
+    assert {os.path.basename(p.path) for p in repo.refresh()} == {"e1d.inf", "rtkaudio.inf"}
+
+    os.remove(root / "rtkaudio.inf")
+    assert [os.path.basename(p.path) for p in repo.refresh()] == ["e1d.inf"]
+    assert [os.path.basename(p.path) for p in
+            DriverRepository(str(root), repo.index_path).refresh()] == ["e1d.inf"]
+
+
+def test_match_uses_generic_ids_and_picks_the_highest_newer_version(tmp_path):
+    root, repo = _repo(tmp_path, "e1d.inf")
+    older = (root / "e1d.inf").read_text(encoding="utf-8").replace("12.19.2.45", "12.18.9.10")
+    (root / "old").mkdir()
+    (root / "old" / "e1d.inf").write_text(older, encoding="utf-8")
+    repo.refresh()
+
+    [m] = repo.match([_nic("12.15.0.1")])  # SUBSYS/REV propios: lo cubre el ID genérico
+    assert m.package.version == "12.19.2.45"
+    assert repo.match([_nic("12.19.2.45")]) == []  # ya está al día
+    assert repo.match([_nic("12.15.0.1", "PCI\\VEN_8086&DEV_1570")]) == []
+
+
+def test_match_reports_each_package_once(tmp_path):
+    _, repo = _repo(tmp_path, "e1d.inf")
+    repo.refresh()
+    nics = [_nic("12.15.0.1"), _nic("12.17.0.1")]
+    assert len(repo.match(nics)) == 1
@@ -0,0 +1,102 @@
+# test_fleet.py — Planificador de flota con transportes simulados: timeouts, reintentos y concurrencia
+import asyncio
+import threading
+import time
+
+from fleet import BackendTransport, FleetScanner, read_hosts
+from sim_backend import SimBackend
+
+
+class StubTransport:
+    """Transporte falso: latencia por equipo, fallos los primeros N intentos y pico de concurrencia."""
+
+    def __init__(self, delay=0.0, fail_first=None, hang=()):
+        self.delay = delay
+        self.fail_first = dict(fail_first or {})
+        self.hang = set(hang)
+        self.active = self.peak = 0
+        self.calls = []
+
+    async def scan(self, host):
+        self.calls.append(host)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(60 if host in self.hang else self.delay)
+            if self.fail_first.get(host, 0) > 0:
+                self.fail_first[host] -= 1
+                raise ConnectionError(f"WinRM rechazó {host}")
+            return [], 0
+        finally:
+            self.active -= 1
+
+
+def test_concurrency_is_bounded():
+    transport = StubTransport(delay=0.02)
+    inv = FleetScanner(transport, concurrency=3).scan([f"PC-{i}" for i in range(12)])
+    assert transport.peak == 3
+    assert all(h.status == "ok" for h in inv.hosts) and len(inv.hosts) == 12
+
+
+def test_retries_with_backoff_then_error():
+    transport = StubTransport(fail_first={"PC-1": 1, "PC-2": 5})
+    inv = FleetScanner(transport, retries=2, backoff=0.01).scan(["PC-1", "PC-2", "PC-3", "PC-1"])
+    by_host = {h.host: h for h in inv.hosts}
+    assert (by_host["PC-1"].status, by_host["PC-1"].attempts) == ("ok", 2)
+    assert (by_host["PC-2"].status, by_host["PC-2"].attempts) == ("error", 3)
+    assert "WinRM" in by_host["PC-2"].error
+    assert (by_host["PC-3"].status, by_host["PC-3"].attempts) == ("ok", 1)
+    assert len(inv.hosts) == 3  # equipos repetidos se escanean una vez
+
+
+def test_timeout_per_host():
+    transport = StubTransport(hang={"PC-LENTO"})
+    t0 = time.perf_counter()
+    inv = FleetScanner(transport, timeout=0.1, retries=1, backoff=0).scan(["PC-LENTO", "PC-OK"])
+    assert time.perf_counter() - t0 < 1.0
+    by_host = {h.host: h for h in inv.hosts}
+    assert (by_host["PC-LENTO"].status, by_host["PC-LENTO"].attempts) == ("timeout", 2)
+    assert by_host["PC-OK"].status == "ok"
+
+
+def test_backend_transport_hung_host_does_not_block_the_run():
+    release = threading.Event()
+
+    def factory(host):
+        if host == "colgado":
+            release.wait(30)
+        return SimBackend()
+
+    t0 = time.perf_counter()
+    inv = FleetScanner(BackendTransport(factory), timeout=0.2, retries=0).scan(["colgado", "sano"])
+    elapsed = time.perf_counter() - t0
+    release.set()
+    by_host = {h.host: h for h in inv.hosts}
+    assert by_host["colgado"].status == "timeout"
+    assert by_host["sano"].status == "ok" and len(by_host["sano"].drivers) == 5
+    assert elapsed < 2.0
+
+
+def test_backend_transport_is_not_capped_by_the_default_executor():
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def factory(host):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.2)
+        with lock:
+            state["active"] -= 1
+        return SimBackend()
+
+    inv = FleetScanner(BackendTransport(factory), concurrency=40).scan([f"PC-{i}" for i in range(40)])
+    assert all(h.status == "ok" for h in inv.hosts)
+    assert state["peak"] == 40  # el executor por defecto tiene como mucho 32 hilos
+    assert len(inv.entries) == 5 and all(len(e.hosts) == 40 for e in inv.entries)
+
+
+def test_read_hosts(tmp_path):
+    path = tmp_path / "hosts.txt"
+    path.write_text("PC-1\n# comentario\n\nPC-2  # sala 3\n", encoding="utf-8")
+    assert read_hosts(str(path)) == ["PC-1", "PC-2"]
@@ -0,0 +1,101 @@
+# test_history.py — Historial SQLite: grabación por lotes, consultas, deltas y poda
+import pytest
+
+from history import SCHEMA_VERSION, HistoryStore
+from sim_backend import Driver
+
+NIC = "PCI\\VEN_8086&DEV_15BE"
+AUDIO = "HDAUDIO\\FUNC_01&VEN_10EC&DEV_0295"
+
+
+def _inv(nic="12.19.1.37", audio="6.0.1.8703", extra=False, audio_name="Audio HD"):
+    items = [Driver(1, "Intel I219-V", "Intel", nic, "12.19.1.39", NIC, "Desactualizado", "", "PCI\\1"),
+             Driver(2, audio_name, "Realtek", audio, "6.0.1.9107", AUDIO, "Desactualizado", "", "HDAUDIO\\2")]
+    if extra:
+        items.append(Driver(3, "Webcam", "Microsoft", "10.0.1", "10.0.1", "USB\\VID_0C45&PID_6A10",
+                            "Actualizado", "", "USB\\3"))
+    return items
+
+
+@pytest.fixture
+def store(tmp_path):
+    with HistoryStore(str(tmp_path / "history.sqlite")) as s:
+        yield s
+
+
+def test_record_and_list_snapshots(store):
+    a = store.record(_inv(), host="PC-1", taken_at="2024-05-01T10:00:00")
+    b = store.record(_inv(extra=True), host="pc-1", taken_at="2024-05-02T10:00:00")
+    c = store.record(_inv(), host="PC-2", taken_at="2024-05-03T10:00:00")
+    assert [s.id for s in store.snapshots()] == [c, b, a]
+    assert [s.id for s in store.snapshots(host="PC-1")] == [b, a]  # nombre de equipo sin mayúsculas
+    snap = store.get(b)
+    assert (snap.host, snap.total, snap.outdated) == ("PC-1", 3, 2)
+    assert store.latest("PC-1").id == b and store.previous(snap).id == a
+    assert store.at("2024-05-02T23:00:00").id == b
+    assert store.snapshots(since="2024-05-02", limit=1)[0].id == c
+
+
+def test_record_many_is_one_transaction(store):
+    ids = store.record_many([("PC-1", _inv(), "2024-05-01T00:00:00"), ("PC-2", _inv(), "2024-05-01T00:00:00")])
+    assert len(ids) == 2 and store.get(ids[1]).host == "PC-2"
+    with pytest.raises(AttributeError):  # el segundo inventario falla: se deshace todo el lote
+        store.record_many([("PC-3", _inv(), None), ("PC-4", [object()], None)])
+    assert store.latest("PC-3") is None
+    assert store.record(_inv(), host="PC-3")  # las cachés de IDs siguen siendo válidas
+
+
+def test_delta_between_snapshots(store):
+    a = store.record(_inv(extra=True), host="PC-1", taken_at="2024-05-01T00:00:00")
+    b = store.record(_inv(nic="12.19.1.39", audio="6.0.1.8000"), host="PC-1", taken_at="2024-05-02T00:00:00")
+    delta = store.delta(a, b)
+    assert [r.device for r in delta.removed] == ["Webcam"] and not delta.added
+    assert [(r.device, r.old, r.new) for r in delta.upgraded] == [("Intel I219-V", "12.19.1.37", "12.19.1.39")]
+    assert [(r.device, r.old, r.new) for r in delta.regressed] == [("Audio HD", "6.0.1.8703", "6.0.1.8000")]
+    assert delta.summary() == f"#{a} -> #{b}: +0 -1 ↑1 ↓1 ~0"
+    with pytest.raises(KeyError):
+        store.delta(a, 999)
+
+
+def test_renamed_device_keeps_old_snapshot_attributes(store):
+    a = store.record(_inv(), host="PC-1", taken_at="2024-05-01T00:00:00")
+    b = store.record(_inv(audio_name="Realtek Audio"), host="PC-1", taken_at="2024-05-02T00:00:00")
+    assert not store.delta(a, b).added  # misma identidad (DeviceID): no es un alta
+    names = {dev for _h, when, dev, _v in store.timeline(AUDIO.lower())}
+    assert names == {"Audio HD", "Realtek Audio"}
+
+
+def test_find_by_provider_hwid_and_version(store):
+    store.record(_inv(), host="PC-1", taken_at="2024-05-01T00:00:00")
+    store.record(_inv(audio="6.0.1.9107"), host="PC-1", taken_at="2024-05-02T00:00:00")
+    store.record(_inv(), host="PC-2", taken_at="2024-05-02T00:00:00")
+    rows = store.find(provider="realtek", below="6.0.1.9107")
+    assert [(h, ver) for h, _when, _dev, _prov, _hw, ver in rows] == [("PC-2", "6.0.1.8703")]
+    rows = store.find(provider="Realtek", below="6.0.1.9107", latest_only=False)
+    assert sorted(h for h, *_ in rows) == ["PC-1", "PC-2"]
+    assert {h for h, *_ in store.find(hardware_id="pci\\ven_8086")} == {"PC-1", "PC-2"}
+    assert store.find(version="6.0.1.9107")[0][0] == "PC-1"
+    assert [v for *_, v in store.timeline(AUDIO, host="PC-1")] == ["6.0.1.9107", "6.0.1.8703"]
+
+
+def test_prune_keeps_newest_per_host(store):
+    ids = [store.record(_inv(audio=f"6.0.1.{n}"), host="PC-1", taken_at=f"2024-05-0{n}T00:00:00")
+           for n in range(1, 6)]
+    other = store.record(_inv(), host="PC-2", taken_at="2024-01-01T00:00:00")
+    assert store.prune(keep=2) == 3
+    assert [s.id for s in store.snapshots(host="PC-1")] == ids[:-3:-1]
+    assert store.latest("PC-2").id == other
+    versions = {v for *_, v in store.timeline(AUDIO, host="PC-1")}
+    assert versions == {"6.0.1.4", "6.0.1.5"}
+    (n,) = store._conn.execute("SELECT COUNT(*) FROM versions WHERE version LIKE '6.0.1._'").fetchone()
+    assert n == 2  # las versiones huérfanas también se borran
+    assert store.record(_inv(audio="6.0.1.1"), host="PC-1")  # tras podar se puede seguir grabando
+    assert store.prune(keep=0) == 4 and store.snapshots() == []
+
+
+def test_schema_version_is_recorded(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    HistoryStore(path).close()
+    with HistoryStore(path) as store:
+        (value,) = store._conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    assert value == str(SCHEMA_VERSION)
@@ -0,0 +1,79 @@
+# test_hwid.py — Parseo de Hardware IDs, cadena de candidatos e índice trie
+from hwid import HwidTrie, candidate_keys, parse_hwid
+
+PCI = "PCI\\VEN_8086&DEV_15BE&SUBSYS_00008086&REV_21"
+USB = "USB\\VID_046D&PID_C52B&REV_1201&MI_02"
+HDA = "HDAUDIO\\FUNC_01&VEN_10EC&DEV_0295&SUBSYS_10280A20&REV_1000"
+
+
+def test_parse_pci():
+    hw = parse_hwid(PCI.lower())
+    assert (hw.bus, hw.vendor, hw.device, hw.subsys, hw.rev) == ("PCI", "8086", "15BE", "00008086", "21")
+    assert hw.path() == ("PCI", "8086", "15BE", "00008086", "21")
+    assert hw.canonical() == PCI
+
+
+def test_parse_usb_uses_interface_level_and_keeps_windows_order():
+    hw = parse_hwid("usb\\vid_046d&pid_c52b&mi_02&rev_1201")
+    assert (hw.vendor, hw.device, hw.mi, hw.rev) == ("046D", "C52B", "02", "1201")
+    assert hw.path() == ("USB", "046D", "C52B", "02", "1201")
+    assert hw.canonical() == USB  # REV antes que MI, como lo escribe Windows
+
+
+def test_parse_hdaudio_function_is_part_of_the_root():
+    hw = parse_hwid(HDA)
+    assert hw.path() == ("HDAUDIO\\FUNC_01", "10EC", "0295", "10280A20", "1000")
+    assert hw.canonical() == HDA
+
+
+def test_parse_opaque_and_empty():
+    assert parse_hwid("ACPI\\PNP0A08").path() == ("ACPI\\PNP0A08",)
+    assert parse_hwid("ROOT\\LEGACY_BEEP").other == "LEGACY_BEEP"
+    assert parse_hwid("  ") is None
+
+
+def test_missing_levels_are_wildcards_and_trailing_ones_trimmed():
+    assert parse_hwid("PCI\\VEN_8086&DEV_15BE&REV_21").path() == ("PCI", "8086", "15BE", "*", "21")
+    assert parse_hwid("PCI\\VEN_8086&DEV_A102").path() == ("PCI", "8086", "A102")
+
+
+def test_candidate_keys_pci():
+    assert candidate_keys(PCI) == (
+        PCI,
+        "PCI\\VEN_8086&DEV_15BE&SUBSYS_00008086",
+        "PCI\\VEN_8086&DEV_15BE&REV_21",
+        "PCI\\VEN_8086&DEV_15BE",
+    )
+
+
+def test_candidate_keys_usb():
+    assert candidate_keys(USB) == (
+        USB,
+        "USB\\VID_046D&PID_C52B&MI_02",
+        "USB\\VID_046D&PID_C52B&REV_1201",
+        "USB\\VID_046D&PID_C52B",
+    )
+
+
+def test_candidate_keys_hdaudio():
+    assert candidate_keys(HDA)[-1] == "HDAUDIO\\FUNC_01&VEN_10EC&DEV_0295"
+    assert len(candidate_keys(HDA)) == 4
+
+
+def test_candidate_keys_follow_field_order_without_repeats():
+    field = f"{PCI}, PCI\\VEN_8086&DEV_15BE&REV_21, ,ACPI\\PNP0A08"
+    keys = candidate_keys(field)
+    assert keys[:4] == candidate_keys(PCI)
+    assert keys[4:] == ("ACPI\\PNP0A08",)
+
+
+def test_trie_lookup_most_specific_first():
+    trie = HwidTrie()
+    trie.insert("PCI\\VEN_8086&DEV_15BE", "generic")
+    trie.insert("PCI\\VEN_8086&DEV_15BE&SUBSYS_00008086", "subsys")
+    trie.insert("PCI\\VEN_8086&DEV_15BE&REV_21", "rev")
+    trie.insert("PCI\\VEN_10EC&DEV_8168", "other")
+    assert [v for _level, v in trie.lookup(PCI)] == ["subsys", "rev", "generic"]
+    assert trie.lookup_many([PCI, "PCI\\VEN_1234&DEV_0001"]) == [["subsys", "rev", "generic"], []]
+    assert sorted(trie.under("PCI\\VEN_8086")) == ["generic", "rev", "subsys"]
+    assert len(trie) == 4
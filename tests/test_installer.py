@@ -0,0 +1,106 @@
+# test_installer.py — InstallScheduler con SimInstaller: orden, lotes, fallos y verificación tras reescanear
+import threading
+import time
+
+import pytest
+
+from installer import FAILED, INSTALLED, SKIPPED, InstallScheduler, PlanItem, SimInstaller, build_plan, verify
+from sim_backend import Driver, SimBackend
+
+
+def _events(log):
+    def on_progress(event, item, detail):
+        log.append((event, item.key))
+    return on_progress
+
+
+@pytest.mark.parametrize("download_delay", [0.0, 0.02])  # descarga en el hilo / con hilos
+def test_update_all_installs_everything(download_delay):
+    backend = SimBackend()
+    backend.installer.download_delay = download_delay
+    events = []
+    results = backend.update_all(on_progress=_events(events), batch_size=2)
+    assert [(r.driver_id, r.status) for r in results] == [(1, INSTALLED), (2, INSTALLED), (4, INSTALLED),
+                                                          (5, INSTALLED)]
+    assert len(backend.outdated()) == 0
+    installing = [key for event, key in events if event == "instalando"]
+    assert installing == ["SIM-1", "SIM-2", "SIM-4", "SIM-5"]  # en el orden del plan
+
+
+@pytest.mark.parametrize("download_delay", [0.0, 0.02])
+def test_download_and_install_failures(download_delay):
+    backend = SimBackend()
+    backend.installer = SimInstaller(backend, download_delay, fail_downloads={"SIM-2"}, fail_installs={"SIM-4"})
+    results = {r.driver_id: r for r in backend.update_all()}
+    assert {i: r.status for i, r in results.items()} == {1: INSTALLED, 2: FAILED, 4: FAILED, 5: INSTALLED}
+    assert results[2].detail.startswith("descarga:")
+    assert "0x80070103" in results[4].detail
+    assert backend.outdated().ids == [2, 4]
+
+
+def test_build_plan_groups_shared_updates_and_skips_missing():
+    drivers = [Driver(i, f"dev{i}", "p", "1", "2", "") for i in range(1, 5)]
+    shared = {"UpdateID": "U1", "Title": "Paquete común"}
+    plan, skipped = build_plan(drivers, [shared, None, shared, {"Title": "Solo título"}])
+    assert [(p.key, p.driver_ids) for p in plan] == [("U1", [1, 3]), ("Solo título", [4])]
+    assert [(s.driver_id, s.status) for s in skipped] == [(2, SKIPPED)]
+
+
+class _SlowInstaller:
+    """Descargas con latencia; registra cuántas hay a la vez y qué lotes se instalan."""
+
+    def __init__(self, delay, ok=True):
+        self.delay = delay
+        self.ok = ok
+        self.active = self.peak = 0
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def download(self, item):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+
+    def install(self, items):
+        if not self.ok:
+            raise RuntimeError("sesión ocupada")
+        self.batches.append([i.key for i in items])
+        return {i.key: (True, "") for i in items}
+
+
+def test_scheduler_downloads_concurrently_and_batches_in_order():
+    plan = [PlanItem(f"U{i}", f"Update {i}", driver_ids=[i], devices=[f"dev{i}"]) for i in range(6)]
+    installer = _SlowInstaller(0.05)
+    results = InstallScheduler(installer, max_downloads=3, batch_size=4).run(plan)
+    assert installer.peak == 3
+    assert installer.batches == [["U0", "U1", "U2", "U3"], ["U4", "U5"]]
+    assert [r.driver_id for r in results] == list(range(6))
+    assert all(r.status == INSTALLED and r.download_s > 0 for r in results)
+
+
+def test_install_exception_fails_the_whole_batch():
+    plan = [PlanItem("U1", "Update", driver_ids=[1, 2], devices=["a", "b"])]
+    results = InstallScheduler(_SlowInstaller(0, ok=False)).run(plan)
+    assert [(r.driver_id, r.status) for r in results] == [(1, FAILED), (2, FAILED)]
+    assert "sesión ocupada" in results[0].detail
+
+
+def test_verify_marks_still_outdated_as_failed():
+    backend = SimBackend()
+    plan, skipped = backend.plan_updates()
+    results = InstallScheduler(backend.installer).run(plan)  # sin reescanear: siguen desactualizados
+    final = verify(results + skipped, backend.drivers)
+    assert all(r.status == FAILED and "sigue desactualizado" in r.detail for r in final)
+
+
+def test_windows_update_all_warns_that_downloads_are_serial(caplog):
+    import win_backend
+    backend = object.__new__(win_backend.WinBackend)  # sin WMI: solo se ejercita la entrada de update_all
+    backend.wait_background = lambda: None
+    backend.outdated = lambda: []
+    assert backend.update_all() == [] and not caplog.records
+    assert backend.update_all(max_downloads=4) == []
+    assert "max_downloads=4" in caplog.text
@@ -0,0 +1,71 @@
+# test_inventory.py — Reescaneos incrementales de SimBackend: IDs estables y conjuntos de cambios
+from dataclasses import replace
+
+from inventory import Inventory
+from sim_backend import Driver, SimBackend
+
+
+def _webcam(n=1):
+    return Driver(0, f"Webcam {n}", "Microsoft", "10.0.1", "10.0.2", "USB\\VID_0C45&PID_6A10",
+                  instance_id=f"USB\\VID_0C45&PID_6A10\\CAM{n}")
+
+
+def test_full_rescan_without_changes_keeps_ids():
+    backend = SimBackend()
+    ids = backend.drivers.ids()
+    changes = backend.rescan()
+    assert not changes and changes.summary() == "+0 -0 ~0"
+    assert backend.drivers.ids() == ids
+
+
+def test_partial_rescan_only_touches_the_requested_drivers():
+    backend = SimBackend()
+    outdated = backend.outdated()
+    backend.set_installed(backend.drivers.get(1).instance_id, "12.19.1.39")
+    backend.set_installed(backend.drivers.get(2).instance_id, "6.0.1.9107")
+    changes = backend.rescan([1])
+    assert [d.id for d in changes.changed] == [1] and not changes.added and not changes.removed
+    assert backend.drivers.get(1).status == "Actualizado"
+    assert backend.drivers.get(2).status == "Desactualizado"  # no se reescaneó
+    assert outdated[0].status == "Actualizado"  # una vista ya abierta ve la fila actualizada en sitio
+    assert backend.rescan().changed[0].id == 2
+
+
+def test_device_events_add_and_remove_by_instance_id():
+    backend = SimBackend()
+    cam = _webcam()
+    backend.plug(cam)
+    changes = backend.rescan_devices([cam.instance_id])
+    assert [(d.id, d.device) for d in changes.added] == [(6, "Webcam 1")]
+    removed = backend.unplug(cam.instance_id.upper())
+    assert removed is cam
+    changes = backend.rescan_devices([cam.instance_id])
+    assert [d.device for d in changes.removed] == ["Webcam 1"] and 6 not in backend.drivers.ids()
+    backend.plug(_webcam(2))
+    assert [d.id for d in backend.rescan().added] == [7]  # los IDs no se reutilizan
+
+
+def test_driver_update_keeps_identity():
+    backend = SimBackend()
+    row = backend.drivers.get(4)
+    assert backend.update_one(4)
+    assert backend.last_changes.summary() == "+0 -0 ~1"
+    assert backend.drivers.get(4).version_installed == row.version_latest
+    assert backend.drivers.get(4).status == "Actualizado"
+
+
+def test_indistinguishable_instances_get_separate_ids():
+    twin = Driver(0, "Puerto COM", "Microsoft", "1.0", "1.0", "ACPI\\PNP0501")
+    inv = Inventory()
+    changes = inv.reconcile([twin, replace(twin)])
+    assert [d.id for d in changes.added] == [1, 2]
+    assert not inv.reconcile([twin, replace(twin)])
+    assert [d.id for d in inv.reconcile([twin]).removed] == [2]
+
+
+def test_copy_on_write_publishes_a_new_table():
+    inv = Inventory(copy_on_write=True)
+    inv.reconcile([_webcam(1)])
+    before = inv.table
+    inv.reconcile([_webcam(1), _webcam(2)])
+    assert len(before) == 1 and len(inv.table) == 2 and inv.table is not before
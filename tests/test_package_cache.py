@@ -0,0 +1,93 @@
+# test_package_cache.py — Caché de paquetes contra el servidor local: reanudación, hashes, manifiesto y LRU
+import hashlib
+import os
+import time
+import zipfile
+
+import pytest
+
+from package_cache import CACHED, DOWNLOADED, FAILED, PackageCache, PackageRef, check_package
+from package_server import LocalPackageServer
+
+
+def _zip(path, files):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.fixture
+def served(tmp_path):
+    """Carpeta servida con un paquete .zip (~200 KB para que el corte caiga a mitad)."""
+    folder = tmp_path / "srv"
+    folder.mkdir()
+    sha = _zip(folder / "nic.zip", {"nic/e1d.inf": "[Version]\n", "nic/e1d.sys": os.urandom(200_000)})
+    return folder, sha
+
+
+def test_dropped_transfer_resumes_with_range(tmp_path, served):
+    folder, sha = served
+    server = LocalPackageServer(str(folder), drop_after=50_000)
+    try:
+        cache = PackageCache(str(tmp_path / "drivers"), retries=3)
+        res = cache.fetch(PackageRef(server.url("nic.zip"), sha))
+        assert res.status == DOWNLOADED and res.sha256 == sha and res.resumed
+        assert [r for _name, r in server.requests] == ["", "bytes=50000-"]
+        assert cache.fetch(PackageRef(server.url("nic.zip"), sha)).status == CACHED
+        assert len(server.requests) == 2
+    finally:
+        server.close()
+
+
+def test_sha256_mismatch_is_rejected(tmp_path, served):
+    folder, _sha = served
+    server = LocalPackageServer(str(folder))
+    try:
+        cache = PackageCache(str(tmp_path / "drivers"))
+        res = cache.fetch(PackageRef(server.url("nic.zip"), "0" * 64))
+        assert res.status == FAILED and "hash incorrecto" in res.detail
+        assert len(cache) == 0 and os.listdir(cache.partial) == []
+    finally:
+        server.close()
+
+
+def test_tampered_extracted_file_fails_check(tmp_path, served):
+    folder, sha = served
+    server = LocalPackageServer(str(folder))
+    try:
+        cache = PackageCache(str(tmp_path / "drivers"))
+        [res] = cache.prefetch([PackageRef(server.url("nic.zip"), sha)] * 2)
+    finally:
+        server.close()
+    inf = os.path.join(res.folder, "nic", "e1d.inf")
+    assert check_package(inf, cache.root) == []
+    with open(os.path.join(res.folder, "nic", "e1d.sys"), "ab") as f:
+        f.write(b"\0")
+    assert check_package(inf, cache.root) == ["modificado nic/e1d.sys"]
+    with open(os.path.join(res.folder, "nic", "extra.dll"), "wb") as f:
+        f.write(b"MZ")
+    assert "añadido nic/extra.dll" in check_package(inf, cache.root)
+    assert check_package(str(tmp_path / "drivers" / "manual" / "x.inf"), cache.root) is None
+
+
+def test_evict_least_recently_used_except_kept(tmp_path):
+    folder = tmp_path / "srv"
+    folder.mkdir()
+    shas = [_zip(folder / f"p{i}.zip", {f"p{i}.inf": os.urandom(1000)}) for i in range(3)]
+    server = LocalPackageServer(str(folder))
+    try:
+        cache = PackageCache(str(tmp_path / "drivers"))
+        for i, sha in enumerate(shas):
+            assert cache.fetch(PackageRef(server.url(f"p{i}.zip"), sha)).status == DOWNLOADED
+            time.sleep(0.01)  # last_used distinto para cada paquete
+    finally:
+        server.close()
+    one = cache.size // 3
+    # El más antiguo (p0) se conserva por 'keep'; sale el siguiente menos usado
+    assert cache.evict(max_bytes=2 * one + 1, keep={shas[0]}) == [shas[1]]
+    assert not os.path.exists(cache.object_path(shas[1]))
+    assert cache.evict(max_bytes=0) == [shas[0], shas[2]]
+    cache.save()
+    assert len(PackageCache(cache.root)) == 0
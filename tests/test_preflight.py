@@ -0,0 +1,104 @@
+# test_preflight.py — Pasos del preflight y su sello, con un ejecutor de comandos simulado
+import json
+import subprocess
+import sys
+
+import pytest
+
+import preflight
+from preflight import run_preflight
+
+
+class FakeWindows:
+    """Estado simulado del equipo: qué está instalado y si las instalaciones funcionan."""
+
+    def __init__(self, wmi=False, psupdate=False, broken=()):
+        self.installed = {"wmi": wmi, "psupdate": psupdate}
+        self.broken = set(broken)
+        self.calls = []
+
+    def has_module(self, name):
+        return self.installed[name]
+
+    def run(self, cmd, **kw):
+        script = cmd[-1]
+        if cmd[1:4] == ["-m", "pip", "install"]:
+            kind, ok = "pip", "wmi" not in self.broken
+            self.installed["wmi"] |= ok
+            out = ""
+        elif "Install-Module" in script:
+            kind, ok = "install-module", "psupdate" not in self.broken
+            self.installed["psupdate"] |= ok
+            out = "PREFLIGHT-OK" if ok else ""
+        else:
+            kind = "probe"
+            out = "PREFLIGHT-OK" if self.installed["psupdate"] else ""
+            ok = True
+        self.calls.append(kind)
+        return subprocess.CompletedProcess(cmd, 0 if ok else 1, out, "")
+
+
+@pytest.fixture
+def machine(monkeypatch):
+    m = FakeWindows()
+    monkeypatch.setattr(preflight, "_has_module", m.has_module)
+    return m
+
+
+def _run(machine, stamp, **kw):
+    machine.calls.clear()
+    return run_preflight(str(stamp), runner=machine.run, is_windows=True, **kw)
+
+
+def test_fresh_run_installs_and_stamps(tmp_path, machine):
+    stamp = tmp_path / "preflight.json"
+    assert _run(machine, stamp) == {"wmi": "hecho", "pswindowsupdate": "hecho"}
+    assert machine.calls == ["pip", "install-module"]
+    data = json.loads(stamp.read_text(encoding="utf-8"))
+    assert data["version"] == preflight.PREFLIGHT_VERSION
+    assert data["steps"]["wmi"]["python"] == sys.executable
+
+
+def test_stamp_hit_only_probes(tmp_path, machine):
+    stamp = tmp_path / "preflight.json"
+    _run(machine, stamp)
+    assert _run(machine, stamp) == {"wmi": "omitido", "pswindowsupdate": "omitido"}
+    assert machine.calls == ["probe"]
+
+
+def test_stamped_module_removed_later_is_reinstalled(tmp_path, machine):
+    stamp = tmp_path / "preflight.json"
+    _run(machine, stamp)
+    machine.installed["psupdate"] = False  # alguien desinstaló PSWindowsUpdate
+    assert _run(machine, stamp) == {"wmi": "omitido", "pswindowsupdate": "hecho"}
+    assert machine.calls == ["probe", "install-module"]
+
+
+def test_version_bump_repeats_everything(tmp_path, machine, monkeypatch):
+    stamp = tmp_path / "preflight.json"
+    _run(machine, stamp)
+    monkeypatch.setattr(preflight, "PREFLIGHT_VERSION", preflight.PREFLIGHT_VERSION + 1)
+    assert _run(machine, stamp) == {"wmi": "hecho", "pswindowsupdate": "hecho"}
+    assert machine.calls == ["install-module"]  # wmi ya estaba: ensure_python_dep no llama a pip
+    assert json.loads(stamp.read_text(encoding="utf-8"))["version"] == preflight.PREFLIGHT_VERSION
+
+
+def test_force_ignores_the_stamp(tmp_path, machine):
+    stamp = tmp_path / "preflight.json"
+    _run(machine, stamp)
+    assert _run(machine, stamp, force=True) == {"wmi": "hecho", "pswindowsupdate": "hecho"}
+    assert "probe" not in machine.calls
+
+
+def test_failed_step_is_not_stamped(tmp_path, machine):
+    stamp = tmp_path / "preflight.json"
+    machine.broken.add("psupdate")
+    assert _run(machine, stamp) == {"wmi": "hecho", "pswindowsupdate": "fallido"}
+    assert set(json.loads(stamp.read_text(encoding="utf-8"))["steps"]) == {"wmi"}
+    machine.broken.clear()
+    assert _run(machine, stamp) == {"wmi": "omitido", "pswindowsupdate": "hecho"}
+
+
+def test_not_windows_does_nothing(tmp_path, machine):
+    assert run_preflight(str(tmp_path / "p.json"), runner=machine.run, is_windows=False) == {}
+    assert machine.calls == [] and not (tmp_path / "p.json").exists()
@@ -0,0 +1,90 @@
+# test_ps_host.py — PSHost/PSPool contra un host falso en Python que habla el mismo protocolo
+import sys
+import threading
+import time
+
+import pytest
+
+from ps_host import RESPONSE_MARK, PSHost, PSHostError, PSPool
+
+# Mini-lenguaje en lugar de PowerShell: "echo X", "fail N", "sleep S", "pid", "noise X", "stale X", "exit"
+FAKE_HOST = r"""
+import json, os, sys, time
+MARK = %r
+def reply(req_id, rc=0, out="", err=""):
+    print(MARK + json.dumps({"id": req_id, "rc": rc, "out": out, "err": err}), flush=True)
+for line in sys.stdin:
+    if not line.strip():
+        continue
+    req = json.loads(line)
+    cmd, _, arg = req["script"].partition(" ")
+    if cmd == "exit":
+        sys.exit(3)
+    if cmd == "sleep":
+        time.sleep(float(arg))
+    if cmd == "noise":
+        print("WARNING: ruido del host", flush=True)
+        print(MARK + "{no es json", flush=True)
+    if cmd == "stale":
+        reply(req["id"] - 1, out="vieja")
+    if cmd == "fail":
+        reply(req["id"], int(arg), err="fallo")
+    else:
+        reply(req["id"], out=str(os.getpid()) if cmd == "pid" else arg)
+""" % RESPONSE_MARK
+
+COMMAND = [sys.executable, "-c", FAKE_HOST]
+
+
+@pytest.fixture
+def host():
+    h = PSHost(COMMAND)
+    yield h
+    h.stop()
+
+
+def test_run_reuses_one_process(host):
+    assert host.run("echo hola") == (0, "hola", "")
+    assert host.run("fail 5") == (5, "", "fallo")
+    pid = host.run("pid")[1]
+    assert host.run("pid")[1] == pid
+
+
+def test_noise_and_stale_responses_are_skipped(host):
+    assert host.run("noise uno") == (0, "uno", "")
+    assert host.run("stale dos") == (0, "dos", "")
+
+
+def test_dead_host_is_restarted(host):
+    pid = host.run("pid")[1]
+    rc, _out, err = host.run("exit")
+    assert rc == -1 and "terminó" in err and not host.alive
+    assert host.run("pid")[1] not in ("", pid)
+
+
+def test_timeout_restarts_the_host(host):
+    pid = host.run("pid")[1]
+    rc, _out, err = host.run("sleep 5", timeout=0.2)
+    assert rc == -1 and "Tiempo de espera" in err
+    assert host.run("pid")[1] != pid
+
+
+def test_pool_runs_in_parallel_and_closes():
+    pool = PSPool(size=3, command=COMMAND)
+    try:
+        pool.run("echo warm")  # arranque del primer host fuera de la medida
+        results = []
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=lambda: results.append(pool.run("sleep 0.8")[0])) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == [0, 0, 0]
+        assert time.perf_counter() - t0 < 2.0  # en serie serían 2.4 s
+        assert len({pool.run("pid")[1] for _ in range(3)}) == 1  # LIFO: el host caliente primero
+    finally:
+        pool.close()
+    assert not any(h.alive for h in pool._all)
+    with pytest.raises(PSHostError):
+        pool.run("echo tarde")
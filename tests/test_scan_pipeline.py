@@ -0,0 +1,53 @@
+# test_scan_pipeline.py — PipelinedScan con fuentes simuladas: solapamiento, errores y modo offline
+import threading
+import time
+
+import pytest
+
+from scan_pipeline import PipelinedScan, delayed, delayed_call
+
+
+def test_enumeration_and_updates_overlap():
+    scan = PipelinedScan(lambda: delayed(range(10), 0.03), delayed_call(["u1", "u2"], 0.3))
+    t0 = time.perf_counter()
+    drivers, updates = scan.run()
+    elapsed = time.perf_counter() - t0
+    assert drivers == list(range(10)) and updates == ["u1", "u2"]
+    assert elapsed < 0.5  # en serie: 0.3 + 0.3
+    assert scan.enum_s >= 0.3 and scan.updates_s >= 0.3
+
+
+def test_drivers_are_yielded_while_updates_are_pending():
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        return []
+
+    scan = PipelinedScan(lambda: iter("abc"), fetch)
+    seen = list(scan)  # no espera a la búsqueda de updates
+    assert seen == ["a", "b", "c"] and scan.drivers == seen
+    release.set()
+    assert scan.wait_updates(5) == []
+
+
+def test_update_error_is_reraised_in_the_caller():
+    def fetch():
+        raise RuntimeError("WU no disponible")
+
+    scan = PipelinedScan(lambda: iter([1, 2]), fetch)
+    with pytest.raises(RuntimeError, match="WU no disponible"):
+        scan.run()
+    assert scan.drivers == [1, 2]
+
+
+def test_wait_updates_timeout():
+    scan = PipelinedScan(lambda: iter(()), delayed_call([], 1.0)).start()
+    with pytest.raises(TimeoutError):
+        scan.wait_updates(0.05)
+
+
+def test_offline_mode_returns_none():
+    scan = PipelinedScan(lambda: iter([1]), None)
+    assert scan.run() == ([1], None)
+    assert scan.updates_s == 0.0
@@ -0,0 +1,66 @@
+# test_snapshot.py — Snapshot binario del inventario: ida y vuelta, campos vacíos y archivos dañados
+from dataclasses import replace
+
+import pytest
+
+from driver_table import FIELDS
+from inventory import Inventory
+from sim_backend import Driver
+from snapshot import InventorySnapshot, SnapshotError, encode, load_snapshot, write_snapshot
+
+
+def _drivers():
+    return [
+        # Sin catálogo WinBackend deja version_latest vacío: comparte offset con el HWID siguiente
+        Driver(1, "Adaptador Intel", "Intel", "12.19.1.37", "", "PCI\\VEN_8086&DEV_1", "Desconocido"),
+        Driver(2, "Audio", "Realtek", "6.0.1.8703", "6.0.1.9107", "HDAUDIO\\FUNC_01&VEN_10EC&DEV_0295",
+               "Desactualizado", "", "HDAUDIO\\X\\1"),
+        Driver(3, "Adaptador Intel", "Intel", "12.19.1.37", "", "PCI\\VEN_8086&DEV_1", "Desconocido", "",
+               "PCI\\X\\2"),
+        Driver(7, "", "", "", "", "", "", "", ""),
+    ]
+
+
+def _fields(d):
+    return tuple(getattr(d, f) or "" for f in FIELDS)
+
+
+def test_round_trip_with_empty_fields(tmp_path):
+    drivers = _drivers()
+    updates = [{"UpdateID": "U1", "Title": "Intel - Adaptador"}]
+    path = str(tmp_path / "inventory.snap")
+    write_snapshot(path, drivers, updates, taken_at=1000.0)
+    with load_snapshot(path) as snap:
+        assert len(snap) == 4 and snap.taken_at == 1000.0 and snap.updates == updates
+        records = list(snap.records())
+        assert [r.id for r in records] == [1, 2, 3, 7]
+        for d, rec, row in zip(drivers, records, snap):
+            assert _fields(rec) == _fields(d)
+            assert tuple(getattr(row, f) for f in FIELDS) == _fields(d)
+        assert snap[0].hardware_id == records[0].hardware_id == "PCI\\VEN_8086&DEV_1"
+
+
+def test_restored_inventory_reconciles_without_changes(tmp_path):
+    drivers = _drivers()[:3]
+    path = str(tmp_path / "inventory.snap")
+    write_snapshot(path, drivers, [])
+    inv = Inventory()
+    with load_snapshot(path) as snap:
+        inv.restore(snap.records())
+    changes = inv.reconcile([replace(d, id=0) for d in drivers])
+    assert not changes, changes.summary()
+    assert sorted(r.id for r in inv.table) == [1, 2, 3]
+
+
+def test_damaged_snapshots_are_rejected(tmp_path):
+    raw = bytearray(encode(_drivers(), []))
+    path = tmp_path / "inventory.snap"
+    raw[-1] ^= 0xFF
+    path.write_bytes(bytes(raw))
+    with pytest.raises(SnapshotError):
+        InventorySnapshot.open(str(path))
+    path.write_bytes(bytes(raw[:-5]))
+    assert load_snapshot(str(path)) is None
+    path.write_bytes(b"DAIDSNAP")
+    assert load_snapshot(str(path)) is None
+    assert load_snapshot(str(tmp_path / "no-existe.snap")) is None
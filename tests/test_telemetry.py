@@ -0,0 +1,74 @@
+# test_telemetry.py — Atribución de spans a la acción que los lanzó, también desde otros hilos
+import threading
+
+import pytest
+
+import telemetry
+
+
+@pytest.fixture
+def tele():
+    telemetry.enable()
+    yield telemetry
+    telemetry.disable()
+
+
+def _spans(records):
+    return [r["span"] for r in records]
+
+
+def test_nested_spans_belong_to_the_action(tele):
+    with tele.action("escanear"):
+        with tele.span("wmi.enum"):
+            with tele.span("ps"):
+                pass
+    records = tele.last_action()
+    assert _spans(records) == ["ps", "wmi.enum", "escanear"]
+    assert {r["action"] for r in records} == {"escanear"}
+    assert [r["depth"] for r in records] == [2, 1, 0]
+
+
+def test_thread_spans_use_the_parent_passed_at_creation(tele):
+    release, done = threading.Event(), threading.Event()
+
+    def background(parent):
+        release.wait(5)
+        with tele.span("scan.background", parent=parent):
+            pass
+        done.set()
+
+    with tele.action("arranque"):
+        t = threading.Thread(target=background, args=(tele.current(),))
+        t.start()
+    assert _spans(tele.last_action()) == ["arranque"]
+
+    with tele.action("reporte"):
+        release.set()  # el hilo rezagado termina durante otra acción
+        assert done.wait(5)
+        with tele.span("report.html"):
+            pass
+    t.join()
+    assert _spans(tele.last_action()) == ["report.html", "reporte"]
+
+
+def test_threads_without_parent_are_not_attributed(tele):
+    with tele.action("opción"):
+        t = threading.Thread(target=lambda: tele.span("huérfano").__enter__().__exit__(None, None, None))
+        t.start()
+        t.join()
+    assert _spans(tele.last_action()) == ["opción"]
+
+
+def test_record_adds_a_measured_span(tele):
+    with tele.action("escanear"):
+        tele.record("wmi.enum", 12.5, parent=tele.current(), rows=3)
+    rec = tele.last_action()[0]
+    assert (rec["span"], rec["ms"], rec["rows"], rec["depth"]) == ("wmi.enum", 12.5, 3, 1)
+    assert [p["phase"] for p in tele.breakdown(tele.last_action())] == ["wmi.enum"]
+
+
+def test_disabled_is_a_noop():
+    assert telemetry.span("x") is telemetry.NOOP
+    telemetry.record("x", 1.0)
+    with telemetry.action("y") as sp:
+        assert sp is telemetry.NOOP
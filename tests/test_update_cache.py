@@ -0,0 +1,43 @@
+# test_update_cache.py — Caché TTL del catálogo de updates y su refresco forzado (--refresh / opción 'r')
+import json
+
+import win_backend
+from update_cache import UpdateCatalogCache
+
+
+def test_ttl_hit_miss_and_invalidate(tmp_path):
+    cache = UpdateCatalogCache(str(tmp_path / "update_catalog.json"), ttl=60)
+    assert cache.load() is None
+    cache.store([{"Title": "Intel - Net - 12.19.1.39"}])
+    assert cache.load() == [{"Title": "Intel - Net - 12.19.1.39"}]
+    data = json.loads(open(cache.path, encoding="utf-8").read())
+    data["fetched_at"] -= 61
+    open(cache.path, "w", encoding="utf-8").write(json.dumps(data))
+    assert cache.load() is None  # caducada
+    cache.invalidate()
+    assert cache.load() is None and (cache.hits, cache.misses) == (1, 3)
+
+
+def _backend(tmp_path, online):
+    backend = object.__new__(win_backend.WinBackend)  # sin WMI ni PowerShell
+    backend._catalog = UpdateCatalogCache(str(tmp_path / "update_catalog.json"))
+    backend._catalog.store([{"Title": "en caché"}])
+    backend._fetch_driver_updates = lambda: online.append(1) or [{"Title": "online"}]
+    return backend
+
+
+def test_forced_refresh_skips_the_cache(tmp_path):
+    online = []
+    backend = _backend(tmp_path, online)
+    assert backend._get_driver_updates() == [{"Title": "en caché"}] and not online
+    assert backend._get_driver_updates(force=True) == [{"Title": "online"}] and online == [1]
+
+
+def test_warm_start_passes_refresh_to_the_background_scan(tmp_path):
+    backend = _backend(tmp_path, [])
+    seen = []
+    backend._bg = None
+    backend._scan = lambda refresh=False: seen.append(refresh)
+    assert backend.warm_start(str(tmp_path / "sin-snapshot.bin"), refresh=True) is False
+    backend._bg.join(5)
+    assert seen == [True]
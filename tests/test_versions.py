@@ -0,0 +1,59 @@
+# test_versions.py — Orden numérico de versiones de drivers y clasificación por lotes
+from types import SimpleNamespace
+
+import pytest
+
+from versions import EQUAL, NEWER, OLDER, compare, compare_many, is_up_to_date, up_to_date_many, version_key
+
+
+@pytest.mark.parametrize("a, b", [
+    ("6.0.1.8703", "06.0.1.8703"),
+    ("1.2", "1.2.0.0"),
+    ("v31.0.101.4502", "31.0.101.4502"),
+    ("06/21/2023,31.0.101.4502", "31.0.101.4502"),
+    ("1_2_3_4", "1.2.3.4"),
+    ("10.0.19041.1 (WinBuild.160101.0800)", "10.0.19041.1"),
+    ("1.0.0.0.0", "1.0"),
+])
+def test_equivalent_spellings(a, b):
+    assert version_key(a) == version_key(b)
+
+
+def test_only_the_first_numeric_block_counts():
+    assert version_key("10.0.19041.1 (WinBuild.160101.0800)") == ((10, 0, 19041, 1), 1)
+    assert compare("10.0.19041.1 (WinBuild.160101.0800)", "10.0.19041.2") == OLDER
+    assert version_key("Build 5 rev 7") == ((5, 0, 0, 0), 1)
+
+
+def test_numeric_not_lexicographic_order():
+    assert compare("10.0.0.1", "9.9.9.9") == NEWER
+    assert compare("1.0.10", "1.0.9") == NEWER
+    assert compare("2.0 beta", "2.0") == OLDER
+    assert compare("1.2.3.4", "1.2.3.4") == EQUAL
+
+
+def test_unparseable_versions():
+    assert version_key("") is None and version_key("desconocida") is None
+    assert compare("abc", "1.0") is None
+    assert is_up_to_date("abc", "abc") and not is_up_to_date("abc", "def")
+
+
+def test_batch_matches_one_by_one():
+    pairs = [("1.0", "1.1"), ("2.0", "2.0.0.0"), ("3.1", "3.0"), ("x", "x"), ("x", "1.0"), ("", "")]
+    assert compare_many(pairs) == [compare(a, b) for a, b in pairs]
+    drivers = [SimpleNamespace(version_installed=a, version_latest=b) for a, b in pairs]
+    assert up_to_date_many(drivers) == [is_up_to_date(a, b) for a, b in pairs]
+    assert up_to_date_many(iter(drivers)) == up_to_date_many(drivers)
+
+
+def test_backends_classify_through_the_batch():
+    import win_backend
+    from sim_backend import Driver, SimBackend
+
+    items = [win_backend.Driver(0, "a", "p", "10.0.19041.1 (WinBuild.160101.0800)", "10.0.19041.1", "PCI\\VEN_1&DEV_2"),
+             win_backend.Driver(0, "b", "p", "1.0", "1.1", "PCI\\VEN_1&DEV_3")]
+    win_backend.classify(items, [])
+    assert [d.status for d in items] == ["Actualizado", "Desactualizado"]
+    backend = SimBackend([Driver(1, "a", "p", "2.0.0.0", "2.0", "PCI\\VEN_1&DEV_2"),
+                          Driver(2, "b", "p", "1.9", "1.10", "PCI\\VEN_1&DEV_3")])
+    assert backend.outdated().ids == [2]
@@ -0,0 +1,122 @@
+# test_watch.py — Feed simulado: SimEventSource → Watcher (debounce/max_wait) → FileSink
+import json
+import threading
+import time
+
+from sim_backend import Driver, SimBackend
+from watch import (ADDED, CHANGED, REMOVED, DeviceEvent, EventSource, FileSink, SimEventSource, SocketSink,
+                   Watcher, make_sink)
+
+
+def _webcam(n=1):
+    return Driver(0, f"Webcam {n}", "Microsoft", "10.0.1", "10.0.2", "USB\\VID_0C45&PID_6A10",
+                  instance_id=f"USB\\VID_0C45&PID_6A10\\CAM{n}")
+
+
+def _feed(source, count, every):
+    """Emite 'count' eventos CHANGED, uno cada 'every' segundos, desde otro hilo."""
+    def run():
+        for i in range(count):
+            source.emit(DeviceEvent(CHANGED, f"DEV{i % 3}"))
+            time.sleep(every)
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return t
+
+
+def test_debounce_groups_a_burst_into_one_batch():
+    source = EventSource()
+    watcher = Watcher(SimBackend(), source, [], debounce=0.3, max_wait=10.0)
+    feeder = _feed(source, 5, 0.02)
+    batch = watcher.collect(threading.Event(), poll=0.05)
+    feeder.join()
+    assert batch.events == 5 and batch.instance_ids == {"DEV0", "DEV1", "DEV2"}
+    assert source.get(0.01) is None
+
+
+def test_max_wait_closes_a_batch_that_keeps_growing():
+    source = EventSource()
+    watcher = Watcher(SimBackend(), source, [], debounce=0.2, max_wait=0.3)
+    stop_feed = threading.Event()
+
+    def run():
+        while not stop_feed.is_set():
+            source.emit(DeviceEvent(CHANGED, "DEV"))
+            time.sleep(0.02)
+    threading.Thread(target=run, daemon=True).start()
+    try:
+        start = time.monotonic()
+        batch = watcher.collect(threading.Event(), poll=0.05)
+        assert time.monotonic() - start < 2.0  # sin max_wait no se cerraría nunca
+        assert batch.last - batch.first <= 0.3 + 0.1
+    finally:
+        stop_feed.set()
+
+
+def test_collect_returns_none_when_stopped():
+    stop = threading.Event()
+    stop.set()
+    assert Watcher(SimBackend(), EventSource(), []).collect(stop, poll=0.01) is None
+
+
+def test_sim_feed_is_rescanned_and_published_to_files(tmp_path):
+    backend = SimBackend()
+    source = SimEventSource(backend, interval=None)
+    sink = FileSink(str(tmp_path))
+    batches = []
+    watcher = Watcher(backend, source, [sink], debounce=0.05, max_wait=1.0,
+                      on_batch=lambda batch, out: batches.append(out))
+
+    gone = backend.connected()[0]
+    source.plug(_webcam())
+    source.unplug(gone.instance_id)
+    source.bump(backend.drivers.get(2).instance_id, backend.drivers.get(2).version_latest)
+    source.bump("PCI\\NO\\EXISTE", "1.0")  # dispositivo desconocido: no emite nada
+    watcher.run(max_batches=1)
+    sink.close()
+
+    [out] = batches
+    assert sorted(e["event"] for e in out) == sorted([ADDED, REMOVED, CHANGED])
+    assert watcher.batches == 1 and watcher.events == 3
+    lines = [json.loads(l) for l in open(sink.events_path, encoding="utf-8")]
+    assert lines == out
+    status = json.load(open(sink.status_path, encoding="utf-8"))
+    assert status["batches"] == 1 and status["events"] == 3
+    assert status["drivers"] == len(backend.drivers) and status["last_change"] == "+1 -1 ~1"
+    assert status["outdated"] == len(backend.outdated())
+
+
+def test_failed_rescan_does_not_stop_the_watcher(tmp_path):
+    class Flaky(SimBackend):
+        calls = 0
+
+        def rescan_devices(self, ids):
+            self.calls += 1
+            if self.calls == 1:
+                raise OSError("WMI ocupado")
+            return super().rescan_devices(ids)
+
+    backend = Flaky()
+    source = EventSource()
+    watcher = Watcher(backend, source, [], debounce=0.05, max_wait=1.0)
+    source.emit(DeviceEvent(CHANGED, "X"))
+    stop = threading.Event()
+    t = threading.Thread(target=watcher.run, args=(stop,), daemon=True)
+    t.start()
+    time.sleep(0.3)
+    source.emit(DeviceEvent(CHANGED, backend.drivers.get(1).instance_id))
+    deadline = time.monotonic() + 5
+    while watcher.batches < 1 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    stop.set()
+    t.join(5)
+    assert backend.calls == 2 and watcher.batches == 1
+
+
+def test_make_sink(tmp_path):
+    sink = make_sink(str(tmp_path / "estado"))
+    assert isinstance(sink, FileSink)
+    sink.close()
+    sock = make_sink("tcp://127.0.0.1:0")
+    assert isinstance(sock, SocketSink) and sock.address[1] > 0
+    sock.close()
@@ -0,0 +1,293 @@
+# tview.py — Tabla de drivers para terminal: página visible, anchos por muestra, filtros indexados y limpieza ANSI
+import os
+import shutil
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CLEAR = "\033[H\033[2J\033[3J"
+RESET, BOLD, DIM = "\033[0m", "\033[1m", "\033[2m"
+GREEN, YELLOW, RED, GRAY = "\033[32m", "\033[33m", "\033[31m", "\033[90m"
+
+HEADERS = ("ID", "Dispositivo", "Proveedor", "Instalada", "Última", "Estado")
+FIELDS = ("device", "provider", "version_installed", "version_latest", "status")
+_PROVIDER, _STATUS = 2, 5  # posiciones en cada fila
+
+Row = Tuple[str, ...]
+
+
+def enable_ansi():
+    """Activa las secuencias ANSI en la consola de Windows (en otros sistemas ya funcionan)."""
+    if os.name != "nt":
+        return
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            kernel32.SetConsoleMode(handle, mode.value | 0x0004)  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+    except (AttributeError, OSError):
+        pass
+
+
+def clear_screen(out=None):
+    """Limpia la pantalla con ANSI: sin lanzar 'cls'/'clear' en un proceso aparte."""
+    out = out or sys.stdout
+    out.write(CLEAR)
+    out.flush()
+
+
+def color_status(status: str) -> str:
+    s = (status or "").lower()
+    if s.startswith("act"):
+        return GREEN + status + RESET
+    elif s.startswith(("des", "out")):
+        return YELLOW + status + RESET
+    return RED + (status or "Desconocido") + RESET
+
+
+def rows_of(items) -> List[Row]:
+    """Filas de texto de un DriverTable/DriverView o de cualquier iterable de drivers (una sola pasada)."""
+    if hasattr(items, "columns"):  # DriverTable: recorrido por columnas, sin vistas de fila
+        return [(str(r[0]),) + r[1:] for r in items.columns(*FIELDS)]
+    return [(str(d.id), d.device, d.provider, d.version_installed, d.version_latest, d.status) for d in items]
+
+
+class SearchIndex:
+    """Filtrado por proveedor, estado y texto sin recorrer todo el inventario en cada tecla.
+
+    Proveedor y estado: posiciones por valor distinto (pocos valores, se comparan ellos y no las
+    filas). Texto: columna de texto en minúsculas construida al primer uso; si la búsqueda
+    amplía la anterior (se ha tecleado un carácter más) solo se revisan los resultados previos,
+    y si hay filtro de proveedor/estado solo sus filas.
+    """
+
+    def __init__(self, rows: Sequence[Row]):
+        self.rows = rows
+        self._by_provider: Dict[str, List[int]] = {}
+        self._by_status: Dict[str, List[int]] = {}
+        for pos, r in enumerate(rows):
+            self._by_provider.setdefault(r[_PROVIDER], []).append(pos)
+            self._by_status.setdefault(r[_STATUS], []).append(pos)
+        self._text: Optional[List[str]] = None
+        self._last: Tuple[tuple, str, List[int]] = ((), "", [])
+        self.scanned = 0  # filas revisadas en la última búsqueda de texto (para medir)
+
+    @property
+    def providers(self) -> List[str]:
+        return sorted(self._by_provider)
+
+    @property
+    def statuses(self) -> List[str]:
+        return sorted(self._by_status)
+
+    @staticmethod
+    def _values(index: Dict[str, List[int]], needle: Optional[str]) -> Optional[set]:
+        if not needle:
+            return None
+        needle = needle.lower()
+        out = set()
+        for value, positions in index.items():
+            if needle in value.lower():
+                out.update(positions)
+        return out
+
+    def select(self, provider: Optional[str] = None, status: Optional[str] = None, text: str = "") -> List[int]:
+        """Posiciones (en orden) que cumplen todos los filtros; proveedor/estado por subcadena sin mayúsculas."""
+        base = None
+        for part in (self._values(self._by_provider, provider), self._values(self._by_status, status)):
+            if part is not None:
+                base = part if base is None else base & part
+        text = (text or "").lower()
+        key = (provider or "", status or "")
+        if not text:
+            self.scanned = 0
+            result = sorted(base) if base is not None else list(range(len(self.rows)))
+        else:
+            if self._text is None:
+                self._text = ["\t".join(r[1:]).lower() for r in self.rows]
+            last_key, last_text, last_result = self._last
+            if last_key == key and last_text and last_text in text:
+                candidates: Iterable[int] = last_result
+            else:
+                candidates = sorted(base) if base is not None else range(len(self.rows))
+            texts = self._text
+            result = [p for p in candidates if text in texts[p]]
+            self.scanned = len(candidates)
+        self._last = (key, text, result)
+        return result
+
+
+class TableView:
+    """Tabla paginada: solo se formatea la página visible.
+
+    Los anchos salen de una muestra (primeras filas y un muestreo repartido) y solo crecen
+    al mostrar páginas con celdas más anchas; las celdas largas se recortan a 'max_width'.
+    """
+
+    def __init__(self, items, page_size: Optional[int] = None, sample: int = 200, max_width: int = 48,
+                 out=None, title: str = ""):
+        self.rows: List[Row] = rows_of(items)
+        self.title = title
+        self.index = SearchIndex(self.rows)
+        self.out = out or sys.stdout
+        self.page_size = page_size or max(5, shutil.get_terminal_size((100, 30)).lines - 9)
+        self.max_width = max_width
+        self.provider: Optional[str] = None
+        self.status: Optional[str] = None
+        self.text = ""
+        self.visible: List[int] = list(range(len(self.rows)))
+        self.page = 0
+        self.widths = [len(h) for h in HEADERS]
+        step = max(1, len(self.rows) // sample)
+        self._grow(self.rows[:sample])
+        self._grow(self.rows[::step][:sample])
+
+    def _grow(self, rows: Iterable[Row]):
+        w = self.widths
+        for r in rows:
+            for i, cell in enumerate(r):
+                if len(cell) > w[i]:
+                    w[i] = min(len(cell), self.max_width)
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-len(self.visible) // self.page_size))
+
+    def filter(self, provider: Optional[str] = None, status: Optional[str] = None, text: Optional[str] = None) -> int:
+        """Aplica filtros (None deja el actual, "" lo quita) y vuelve a la primera página."""
+        if provider is not None:
+            self.provider = provider or None
+        if status is not None:
+            self.status = status or None
+        if text is not None:
+            self.text = text
+        self.visible = self.index.select(self.provider, self.status, self.text)
+        self.page = 0
+        return len(self.visible)
+
+    def goto(self, page: int):
+        self.page = min(max(0, page), self.pages - 1)
+
+    def _cell(self, value: str, width: int) -> str:
+        if len(value) > width:
+            return value[:width - 1] + "…"
+        return value.ljust(width)
+
+    def render(self) -> List[str]:
+        start = self.page * self.page_size
+        page_rows = [self.rows[p] for p in self.visible[start:start + self.page_size]]
+        self._grow(page_rows)
+        w = self.widths
+        header = " | ".join(h.ljust(w[i]) for i, h in enumerate(HEADERS))
+        lines = [BOLD + header + RESET, "-" * len(header)]
+        for r in page_rows:
+            cells = [self._cell(v, w[i]) for i, v in enumerate(r)]
+            cells[_STATUS] = color_status(r[_STATUS])
+            lines.append(" | ".join(cells))
+        filters = ", ".join(f"{k}: {v}" for k, v in (("proveedor", self.provider), ("estado", self.status),
+                                                        ("texto", self.text)) if v)
+        lines.append(GRAY + f"Página {self.page + 1}/{self.pages} · {len(self.visible)} de {len(self.rows)} drivers"
+                     + (f" · {filters}" if filters else "") + RESET)
+        return lines
+
+    def show(self):
+        self.out.write("\n".join(self.render()) + "\n")
+        self.out.flush()
+
+    def print_all(self):
+        """Todas las páginas seguidas (salida redirigida a archivo o tabla pequeña), sin paginar."""
+        # Anchos finales antes de escribir nada: si crecieran en mitad, las columnas no cuadrarían
+        self._grow(self.rows[p] for p in self.visible)
+        for page in range(self.pages):
+            self.page = page
+            lines = self.render()
+            self.out.write("\n".join(lines[2:-1] if page else lines[:-1]) + "\n")
+        self.out.flush()
+
+    # -------------------- Interacción --------------------
+    _HELP = ("Enter/n: siguiente · p: anterior · número: ir a página · /texto: buscar · "
+             "?: búsqueda en vivo · prov X · estado X · x: quitar filtros · q: salir")
+
+    def command(self, cmd: str) -> bool:
+        """Aplica un comando de la línea de órdenes del visor; False para salir."""
+        cmd = cmd.strip()
+        low = cmd.lower()
+        if low in ("q", "0", "salir"):
+            return False
+        if low in ("", "n"):
+            self.goto(self.page + 1)
+        elif low == "p":
+            self.goto(self.page - 1)
+        elif low.isdigit():
+            self.goto(int(low) - 1)
+        elif cmd.startswith("/"):
+            self.filter(text=cmd[1:])
+        elif low.startswith("prov"):
+            self.filter(provider=cmd.partition(" ")[2])
+        elif low.startswith("estado"):
+            self.filter(status=cmd.partition(" ")[2])
+        elif low == "x":
+            self.filter("", "", "")
+        return True
+
+    def live_search(self, read_key: Callable[[], str]):
+        """Búsqueda que se refina con cada tecla (Enter confirma, Esc cancela)."""
+        before = self.text
+        query = before
+        while True:
+            self.filter(text=query)
+            clear_screen(self.out)
+            self.show()
+            self.out.write(f"Buscar: {query}")
+            self.out.flush()
+            key = read_key()
+            if key in ("\r", "\n"):
+                return
+            if key == "\x1b":
+                self.filter(text=before)
+                return
+            if key in ("\x08", "\x7f"):
+                query = query[:-1]
+            elif key.isprintable():
+                query += key
+
+    def interactive(self, read_line: Callable[[str], str] = input, read_key: Optional[Callable[[], str]] = None):
+        read_key = read_key or _key_reader()
+        while True:
+            clear_screen(self.out)
+            if self.title:
+                self.out.write(BOLD + self.title + RESET + "\n")
+            self.show()
+            try:
+                cmd = read_line(GRAY + self._HELP + RESET + "\n> ")
+            except EOFError:
+                return
+            if cmd.strip() == "?" and read_key is not None:
+                self.live_search(read_key)
+            elif not self.command(cmd):
+                return
+
+
+def _key_reader() -> Optional[Callable[[], str]]:
+    """Lector de teclas sin esperar Enter, o None si la entrada no es una consola."""
+    if not sys.stdin.isatty():
+        return None
+    if os.name == "nt":
+        import msvcrt
+        return msvcrt.getwch
+    try:
+        import termios
+        import tty
+    except ImportError:
+        return None
+
+    def read() -> str:
+        fd = sys.stdin.fileno()
+        old = termios.tcgetattr(fd)
+        try:
+            tty.setcbreak(fd)
+            return sys.stdin.read(1)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old)
+    return read
@@ -0,0 +1,88 @@
+# update_cache.py — Caché en disco (con TTL) del catálogo de updates de drivers
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import List, Optional
+
+log = logging.getLogger("driveraid.updates")
+
+CACHE_VERSION = 1
+DEFAULT_TTL = float(os.environ.get("DRIVERAID_UPDATE_TTL", str(6 * 3600)))
+
+
+def atomic_write_text(path: str, text: str):
+    """Escribe en un temporal del mismo directorio y lo renombra: otro proceso nunca ve un archivo a medias."""
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        for attempt in range(5):
+            try:
+                os.replace(tmp, path)
+                return
+            except PermissionError:
+                # En Windows falla si otro proceso tiene el destino abierto justo ahora
+                if attempt == 4:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class UpdateCatalogCache:
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def load(self) -> Optional[List[dict]]:
+        """Updates en caché si existen y no han caducado; None en caso contrario."""
+        reason = None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CACHE_VERSION or not isinstance(data.get("updates"), list):
+                reason = "formato"
+            elif time.time() - float(data.get("fetched_at", 0)) > self.ttl:
+                reason = "caducada"
+        except FileNotFoundError:
+            reason = "sin caché"
+        except (OSError, ValueError):
+            reason = "ilegible"
+
+        if reason:
+            self.misses += 1
+            log.info("Catálogo de updates: miss (%s) [hits=%d misses=%d]", reason, self.hits, self.misses)
+            return None
+        self.hits += 1
+        log.info("Catálogo de updates: hit (%d updates) [hits=%d misses=%d]",
+                 len(data["updates"]), self.hits, self.misses)
+        return data["updates"]
+
+    def store(self, updates: List[dict]):
+        payload = {"version": CACHE_VERSION, "fetched_at": time.time(), "updates": updates}
+        try:
+            atomic_write_text(self.path, json.dumps(payload, ensure_ascii=False))
+        except OSError as e:
+            log.warning("No se pudo guardar el catálogo de updates: %s", e)
+
+    def invalidate(self):
+        try:
+            os.remove(self.path)
+            log.info("Catálogo de updates invalidado")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning("No se pudo invalidar el catálogo de updates: %s", e)
@@ -0,0 +1,80 @@
+# versions.py — Versiones de drivers: parseo a claves comparables, caché y comparación por lotes
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+OLDER, EQUAL, NEWER = -1, 0, 1
+
+# Primer bloque numérico ('10.0.19041.1'); lo que sigue (p. ej. '(WinBuild.160101.0800)') no cuenta
+_NUMBERS = re.compile(r"\d+(?:[.,_-]\d+)*")
+_NUM = re.compile(r"\d+")
+_PRERELEASE = re.compile(r"(alpha|beta|preview|pre|rc|test)", re.I)
+
+VersionKey = Tuple[Tuple[int, ...], int]
+
+
+@lru_cache(maxsize=1 << 16)
+def version_key(raw: str) -> Optional[VersionKey]:
+    """Clave comparable de una versión de driver, o None si no contiene números.
+
+    '6.0.1.8703' y '06.0.1.8703' dan la misma clave; '1.2' equivale a '1.2.0.0'.
+    Acepta rarezas de fabricantes: prefijo 'v', separadores ',' '-' '_', sufijos como
+    '(beta)' (ordenan antes que la versión final) y el formato 'fecha,versión' de DriverVer.
+    Solo cuenta el primer bloque de números separados: '10.0.19041.1 (WinBuild.160101.0800)'
+    es 10.0.19041.1.
+    """
+    s = (raw or "").strip()
+    parts = s.split(".")
+    if all(p.isdecimal() for p in parts):
+        nums = [int(p) for p in parts]  # caso común ('31.0.101.4502'): sin expresiones regulares
+        prerelease = False
+    else:
+        if "," in s and "/" in s.split(",", 1)[0]:
+            s = s.split(",", 1)[1]  # DriverVer = mm/dd/yyyy,versión
+        m = _NUMBERS.search(s)
+        if m is None:
+            return None
+        nums = [int(n) for n in _NUM.findall(m.group())]
+        prerelease = _PRERELEASE.search(s) is not None
+    if len(nums) < 4:
+        nums += [0] * (4 - len(nums))
+    while len(nums) > 4 and nums[-1] == 0:
+        nums.pop()
+    return tuple(nums), (0 if prerelease else 1)
+
+
+def compare(installed: str, latest: str) -> Optional[int]:
+    """OLDER/EQUAL/NEWER de 'installed' respecto de 'latest'; None si alguna no se puede parsear."""
+    a, b = version_key(installed), version_key(latest)
+    if a is None or b is None:
+        return None
+    return (a > b) - (a < b)
+
+
+def compare_many(pairs: Iterable[Tuple[str, str]]) -> List[Optional[int]]:
+    """compare() para un inventario entero; cada string distinto se parsea una sola vez."""
+    key = version_key
+    out: List[Optional[int]] = []
+    append = out.append
+    for installed, latest in pairs:
+        a, b = key(installed), key(latest)
+        append(None if a is None or b is None else (a > b) - (a < b))
+    return out
+
+
+def is_up_to_date(installed: str, latest: str) -> bool:
+    """Instalada >= última. Si no se pueden comparar, se recurre a la igualdad de strings."""
+    c = compare(installed, latest)
+    return installed == latest if c is None else c >= EQUAL
+
+
+def up_to_date_many(drivers) -> List[bool]:
+    """is_up_to_date() de cada driver (instalada frente a última) en una sola pasada."""
+    key = version_key
+    out: List[bool] = []
+    append = out.append
+    for d in drivers:
+        installed, latest = d.version_installed, d.version_latest
+        a, b = key(installed), key(latest)
+        append(installed == latest if a is None or b is None else a >= b)
+    return out
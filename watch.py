@@ -0,0 +1,320 @@
+# watch.py — Modo vigilancia: eventos de dispositivos, debounce, reescaneo parcial y publicación de estado
+import json
+import logging
+import os
+import queue
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+
+from update_cache import atomic_write_text
+
+log = logging.getLogger("driveraid.watch")
+
+ADDED, REMOVED, CHANGED = "added", "removed", "changed"
+
+
+@dataclass
+class DeviceEvent:
+    kind: str             # ADDED | REMOVED | CHANGED
+    instance_id: str      # DeviceID PnP
+    ts: float = field(default_factory=time.time)
+
+
+@dataclass
+class Batch:
+    """Ráfaga de eventos ya agrupada: un reescaneo por batch."""
+    instance_ids: Set[str] = field(default_factory=set)
+    events: int = 0
+    first: float = 0.0
+    last: float = 0.0
+
+
+# -------------------- Fuentes de eventos --------------------
+class EventSource:
+    """Interfaz de una fuente: get(timeout) devuelve un DeviceEvent o None; close() la detiene."""
+
+    def __init__(self):
+        self._q: "queue.Queue[DeviceEvent]" = queue.Queue()
+        self._closed = threading.Event()
+
+    def emit(self, event: DeviceEvent):
+        self._q.put(event)
+
+    def get(self, timeout: float) -> Optional[DeviceEvent]:
+        try:
+            return self._q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def start(self):
+        pass
+
+    def close(self):
+        self._closed.set()
+
+
+class SimEventSource(EventSource):
+    """Feed simulado para SimBackend: conecta, desconecta y actualiza dispositivos al azar.
+
+    Con 'interval' = None no genera nada por sí sola; las pruebas usan plug()/unplug()/bump().
+    Cada cierto tiempo emite ráfagas (como un hub USB al conectarse) para ejercitar el debounce.
+    """
+
+    def __init__(self, backend, interval: Optional[float] = 3.0, burst: int = 4, seed: int = 0):
+        super().__init__()
+        self.backend = backend
+        self.interval = interval
+        self.burst = burst
+        self._rnd = random.Random(seed)
+        self._unplugged: List = []
+        self._thread: Optional[threading.Thread] = None
+
+    def plug(self, device):
+        self.backend.plug(device)
+        self.emit(DeviceEvent(ADDED, device.instance_id))
+
+    def unplug(self, instance_id: str):
+        dev = self.backend.unplug(instance_id)
+        if dev is not None:
+            self._unplugged.append(dev)
+            self.emit(DeviceEvent(REMOVED, instance_id))
+
+    def bump(self, instance_id: str, version: str):
+        """Cambia la versión instalada de un dispositivo (instalación fuera de DriverAid)."""
+        if self.backend.set_installed(instance_id, version):
+            self.emit(DeviceEvent(CHANGED, instance_id))
+
+    def _step(self):
+        for _ in range(self._rnd.randint(1, self.burst)):
+            devices = self.backend.connected()
+            roll = self._rnd.random()
+            if self._unplugged and roll < 0.4:
+                self.plug(self._unplugged.pop(self._rnd.randrange(len(self._unplugged))))
+            elif devices and roll < 0.8:
+                self.unplug(self._rnd.choice(devices).instance_id)
+            elif devices:
+                dev = self._rnd.choice(devices)
+                self.bump(dev.instance_id, dev.version_latest)
+
+    def _run(self):
+        while not self._closed.wait(self._rnd.uniform(0.5, 1.5) * self.interval):
+            self._step()
+
+    def start(self):
+        if self.interval and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sim-events", daemon=True)
+            self._thread.start()
+
+
+class WmiEventSource(EventSource):
+    """Altas y bajas de Win32_PnPEntity vía eventos WMI (__InstanceCreation/DeletionEvent).
+
+    Cada suscripción corre en su propio hilo con COM inicializado; 'delay' es el WITHIN
+    de la consulta WMI (segundos entre sondeos del proveedor).
+    """
+
+    def __init__(self, delay: float = 2.0):
+        super().__init__()
+        self.delay = delay
+        self._threads: List[threading.Thread] = []
+
+    def _watch(self, notification: str, kind: str):
+        import pythoncom
+        from win_backend import _wmi
+        pythoncom.CoInitialize()
+        try:
+            wmi = _wmi()
+            watcher = wmi.WMI().watch_for(notification_type=notification, wmi_class="Win32_PnPEntity",
+                                          delay_secs=self.delay)
+            while not self._closed.is_set():
+                try:
+                    dev = watcher(timeout_ms=500)
+                except wmi.x_wmi_timed_out:
+                    continue
+                inst = getattr(dev, "DeviceID", "") or ""
+                if inst:
+                    self.emit(DeviceEvent(kind, inst))
+        except Exception as e:
+            log.error("Suscripción WMI %s terminada: %s", notification, e)
+        finally:
+            pythoncom.CoUninitialize()
+
+    def start(self):
+        for notification, kind in (("Creation", ADDED), ("Deletion", REMOVED)):
+            t = threading.Thread(target=self._watch, args=(notification, kind), name=f"wmi-{kind}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+
+# -------------------- Publicación --------------------
+class FileSink:
+    """Eventos en <carpeta>/watch-events.jsonl (append) y estado actual en watch-status.json (atómico)."""
+
+    def __init__(self, folder: str):
+        os.makedirs(folder, exist_ok=True)
+        self.events_path = os.path.join(folder, "watch-events.jsonl")
+        self.status_path = os.path.join(folder, "watch-status.json")
+        self._f = open(self.events_path, "a", encoding="utf-8")
+
+    def publish(self, events: List[dict], status: dict):
+        for e in events:
+            self._f.write(json.dumps(e, ensure_ascii=False) + "\n")
+        self._f.flush()
+        atomic_write_text(self.status_path, json.dumps(status, ensure_ascii=False, indent=1))
+
+    def close(self):
+        self._f.close()
+
+
+class SocketSink:
+    """Servidor TCP local: cada cliente recibe el estado al conectarse y luego una línea JSON por evento."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765):
+        self._srv = socket.create_server((host, port))
+        self.address = self._srv.getsockname()
+        self._clients: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self._status: dict = {}
+        self._closed = False
+        threading.Thread(target=self._accept, name="watch-socket", daemon=True).start()
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn, _addr = self._srv.accept()
+            except OSError:
+                return
+            conn.settimeout(2.0)  # un cliente que no lee no puede bloquear la publicación
+            with self._lock:
+                if not self._status or self._send(conn, [{"type": "status", **self._status}]):
+                    self._clients.append(conn)
+
+    def _send(self, conn, records: List[dict]) -> bool:
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        try:
+            conn.sendall(data)
+            return True
+        except OSError:
+            conn.close()
+            return False
+
+    def publish(self, events: List[dict], status: dict):
+        records = [{"type": "event", **e} for e in events] + [{"type": "status", **status}]
+        with self._lock:
+            self._status = status
+            self._clients = [c for c in self._clients if self._send(c, records)]
+
+    def close(self):
+        self._closed = True
+        self._srv.close()
+        with self._lock:
+            for c in self._clients:
+                c.close()
+            self._clients = []
+
+
+def make_sink(target: str):
+    """'tcp://host:puerto' publica por socket; cualquier otra cosa es una carpeta."""
+    if target.startswith("tcp://"):
+        host, _, port = target[len("tcp://"):].rpartition(":")
+        return SocketSink(host or "127.0.0.1", int(port))
+    return FileSink(target)
+
+
+# -------------------- Bucle --------------------
+class Watcher:
+    """Agrupa eventos (debounce) y reescanea solo los dispositivos afectados.
+
+    Una ráfaga se cierra cuando pasan 'debounce' segundos sin eventos nuevos, o a los
+    'max_wait' segundos del primero aunque siga llegando (para no aplazar indefinidamente).
+    """
+
+    def __init__(self, backend, source: EventSource, sinks: List, debounce: float = 1.0,
+                 max_wait: float = 10.0, on_batch=None):
+        self.backend = backend
+        self.source = source
+        self.sinks = sinks
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.on_batch = on_batch
+        self.batches = 0
+        self.events = 0
+        self.last_summary = ""
+
+    def collect(self, stop: threading.Event, poll: float = 0.5) -> Optional[Batch]:
+        """Bloquea hasta tener una ráfaga completa (o hasta 'stop')."""
+        first = None
+        while first is None:
+            if stop.is_set():
+                return None
+            first = self.source.get(poll)
+        batch = Batch({first.instance_id}, 1, time.monotonic(), time.monotonic())
+        while True:
+            now = time.monotonic()
+            remaining = min(batch.last + self.debounce, batch.first + self.max_wait) - now
+            if remaining <= 0:
+                return batch
+            ev = self.source.get(remaining)
+            if ev is not None:
+                batch.instance_ids.add(ev.instance_id)
+                batch.events += 1
+                batch.last = time.monotonic()
+
+    def status(self) -> dict:
+        return {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "host": socket.gethostname(),
+            "drivers": len(self.backend.drivers),
+            "outdated": len(self.backend.outdated()),
+            "batches": self.batches,
+            "events": self.events,
+            "last_change": self.last_summary,
+        }
+
+    def _publish(self, events: List[dict]):
+        status = self.status()
+        for sink in self.sinks:
+            try:
+                sink.publish(events, status)
+            except OSError as e:
+                log.warning("No se pudo publicar en %s: %s", type(sink).__name__, e)
+
+    def apply(self, batch: Batch) -> List[dict]:
+        changes = self.backend.rescan_devices(sorted(batch.instance_ids))
+        self.batches += 1
+        self.events += batch.events
+        self.last_summary = changes.summary()
+        ts = time.strftime("%Y-%m-%dT%H:%M:%S")
+        out: List[dict] = []
+        for kind, rows in ((ADDED, changes.added), (REMOVED, changes.removed), (CHANGED, changes.changed)):
+            for d in rows:
+                out.append({"ts": ts, "event": kind, "id": d.id, "device": d.device,
+                            "instance_id": d.instance_id, "version_installed": d.version_installed,
+                            "status": d.status})
+        log.info("Ráfaga de %d eventos (%d dispositivos): %s", batch.events, len(batch.instance_ids),
+                 self.last_summary)
+        self._publish(out)
+        if self.on_batch:
+            self.on_batch(batch, out)
+        return out
+
+    def run(self, stop: Optional[threading.Event] = None, max_batches: Optional[int] = None):
+        stop = stop or threading.Event()
+        self.source.start()
+        self._publish([])  # estado inicial para los lectores que ya esperan
+        try:
+            while not stop.is_set() and (max_batches is None or self.batches < max_batches):
+                batch = self.collect(stop)
+                if batch is None:
+                    break
+                try:
+                    self.apply(batch)
+                except Exception as e:
+                    # Un fallo puntual (WMI ocupado, etc.) no debe tumbar la vigilancia
+                    log.error("Reescaneo fallido para %d dispositivos: %s", len(batch.instance_ids), e)
+        finally:
+            self.source.close()
@@ -1,16 +1,63 @@
 # win_backend.py — Backend REAL para Windows (inventario, updates online y OFFLINE con pnputil)
 from dataclasses import dataclass, field
-from typing import List, Tuple
-from datetime import datetime
-import csv
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import atexit
+import importlib.util
 import json
+import logging
 import os
 import subprocess
+import threading
+import time
 
-try:
-    import wmi  # pip install wmi
-except ImportError:
-    wmi = None
+import telemetry
+from driver_repo import DriverRepository
+from driver_table import DriverTable, DriverView
+from hwid import primary_hwid
+from installer import InstallResult, InstallScheduler, PlanItem, build_plan, verify
+from inventory import ChangeSet, Inventory
+from matching import UpdateIndex
+from catalog import LocalCatalog, load_catalog
+from package_cache import check_package
+from ps_host import PSPool
+from report import export_report
+from scan_pipeline import PipelinedScan
+from snapshot import load_snapshot, write_snapshot
+from update_cache import UpdateCatalogCache
+from versions import is_up_to_date, up_to_date_many
+
+_wmi_module = None
+
+def _wmi():
+    """Importa 'wmi' (y pywin32/COM) al primer uso: es lo más lento del arranque."""
+    global _wmi_module
+    if _wmi_module is None:
+        try:
+            import wmi  # pip install wmi
+        except ImportError:
+            raise RuntimeError("Falta el módulo 'wmi'. Instala con: pip install wmi")
+        _wmi_module = wmi
+    return _wmi_module
+
+REPORTS_DIR = os.path.join(os.path.dirname(__file__), "reports")
+SNAPSHOT_PATH = os.path.join(REPORTS_DIR, "inventory.snap")
+# Catálogo local (HWID -> última versión), importado con: main.py --import-catalog
+CATALOG_PATH = os.path.join(REPORTS_DIR, "catalog.bin")
+
+log = logging.getLogger("driveraid.scan")
+
+# Solo las propiedades que usa driver_from_wmi; forward-only + return-immediately (0x10 | 0x20):
+# las filas llegan según las produce el proveedor y no se guardan para recorrerlas otra vez
+_WQL_DRIVERS = ("SELECT DeviceName, FriendlyName, DriverVersion, DriverProviderName, HardWareID, DeviceID "
+                "FROM Win32_PnPSignedDriver")
+_WQL_FLAGS = 0x10 | 0x20
+_WQL_CHUNK = 32  # DeviceIDs por consulta en un reescaneo parcial
+
+def _wql_string(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+# Límite por script en el host persistente (Get-WindowsUpdate puede tardar minutos)
+PS_TIMEOUT = float(os.environ.get("DRIVERAID_PS_TIMEOUT", "1800"))
 
 @dataclass
 class Driver:
@@ -22,205 +69,533 @@ class Driver:
     hardware_id: str
     status: str = field(default="Desconocido")  # "Actualizado" | "Desactualizado" | "Desconocido"
     manual_link: str = field(default="")        # Microsoft Update Catalog por HWID
+    instance_id: str = field(default="")        # DeviceID PnP (identidad estable)
 
-    def refresh_status(self):
+    def refresh_status(self, up_to_date: Optional[bool] = None):
+        """'up_to_date' ya calculado por lotes (up_to_date_many); si falta se compara aquí."""
         if self.version_latest and self.version_installed:
-            self.status = "Actualizado" if self.version_installed == self.version_latest else "Desactualizado"
+            if up_to_date is None:
+                up_to_date = is_up_to_date(self.version_installed, self.version_latest)
+            self.status = "Actualizado" if up_to_date else "Desactualizado"
         else:
             if self.status not in ("Actualizado", "Desactualizado"):
                 self.status = "Desconocido"
         if not self.manual_link and self.hardware_id:
-            first = self.hardware_id.split(",")[0].strip()
+            first = primary_hwid(self.hardware_id)
             q = first.replace(" ", "%20")
             self.manual_link = f"https://www.catalog.update.microsoft.com/Search.aspx?q={q}"
 
+def driver_from_wmi(d) -> Driver:
+    """Driver a partir de una fila de Win32_PnPSignedDriver (objeto WMI o equivalente con atributos)."""
+    dev = getattr(d, "DeviceName", None) or getattr(d, "FriendlyName", "") or ""
+    inst_ver = getattr(d, "DriverVersion", "") or ""
+    prov = getattr(d, "DriverProviderName", "") or ""
+    hwid = ""
+    try:
+        hw = getattr(d, "HardwareID", None)
+        if hw:
+            # Win32_PnPSignedDriver.HardWareID es un string; otras clases devuelven una lista
+            hwid = hw if isinstance(hw, str) else ", ".join(hw)
+    except Exception:
+        pass
+    return Driver(
+        id=0,  # lo asigna el inventario (estable entre escaneos)
+        device=str(dev),
+        provider=str(prov),
+        version_installed=str(inst_ver),
+        version_latest="",
+        hardware_id=hwid,
+        instance_id=str(getattr(d, "DeviceID", "") or ""),
+    )
+
+def classify(items: List[Driver], updates: Optional[List[dict]], index: Optional[UpdateIndex] = None,
+             catalog: Optional[LocalCatalog] = None):
+    """Marca el estado de cada driver según la lista de updates pendientes.
+
+    Con un catálogo local, version_latest se completa antes desde él. updates=None significa
+    que no se consultó Windows Update (modo offline): sin update no se asume 'Actualizado'.
+    """
+    if catalog is not None:
+        catalog.fill(items)
+    index = index if index is not None else UpdateIndex(updates or [])
+    with telemetry.span("match", drivers=len(items), updates=len(updates or ())):
+        matches = index.match_all(items)
+    for drv, upd, ok in zip(items, matches, up_to_date_many(items)):
+        drv.refresh_status(ok)
+        if upd is not None:
+            drv.status = "Desactualizado"
+        else:
+            if updates is not None and not updates:
+                drv.status = "Actualizado"
+        drv.refresh_status(ok)
+
+# Resultado por update tras -Download/-Install (Result: Installed, Downloaded, Failed...)
+_RESULT_SELECT = ("Select-Object @{n='UpdateID';e={$_.Identity.UpdateID}},Title,Result | "
+                  "ConvertTo-Json -Compress")
+
+def _parse_results(out: str) -> List[dict]:
+    try:
+        data = json.loads(out) if out and out.strip() else []
+    except json.JSONDecodeError:
+        return []
+    if isinstance(data, dict):
+        data = [data]
+    return [r for r in data if isinstance(r, dict)] if isinstance(data, list) else []
+
+class WUInstaller:
+    """Instalador de Windows Update para InstallScheduler.
+
+    Todo el plan se descarga en una sola sesión de búsqueda: la primera download() la lanza
+    y las demás solo leen su resultado. La instalación va por lotes; ambas usan el pool
+    PowerShell del backend (PSWindowsUpdate ya importado).
+    """
+    # Una única sesión para todo el plan: hilos de descarga solo esperarían a la misma llamada
+    parallel_downloads = False
+
+    def __init__(self, backend: "WinBackend", plan: List[PlanItem]):
+        self.backend = backend
+        self._plan = plan
+        self._downloaded: Optional[Dict[str, dict]] = None
+        self._download_error = ""
+
+    def _download_all(self):
+        self._downloaded = {}
+        ids = [i.update.get("UpdateID") for i in self._plan if i.update.get("UpdateID")]
+        if not ids:
+            return
+        rc, out, err = self.backend._ps(self.backend._download_script(ids), label="download")
+        if rc != 0:
+            self._download_error = (err or "").strip() or f"PowerShell devolvió {rc}"
+        self._downloaded = {str(r.get("UpdateID")): r for r in _parse_results(out) if r.get("UpdateID")}
+
+    def download(self, item: PlanItem):
+        uid = item.update.get("UpdateID")
+        if not uid:
+            return  # sin identidad no se puede descargar aparte: se descargará al instalar
+        if self._downloaded is None:
+            self._download_all()
+        if self._download_error:
+            raise RuntimeError(self._download_error)
+        if self._downloaded.get(str(uid), {}).get("Result") == "Failed":
+            raise RuntimeError("Windows Update no pudo descargar el paquete")
+
+    def install(self, items: List[PlanItem]) -> Dict[str, Tuple[bool, str]]:
+        rc, out, err = self.backend._ps(self.backend._install_script([i.update for i in items]), label="install")
+        rows = _parse_results(out)
+        by_id = {str(r.get("UpdateID")): r for r in rows if r.get("UpdateID")}
+        by_title = {r.get("Title"): r for r in rows if r.get("Title")}
+        outcome = {}
+        for item in items:
+            row = by_id.get(str(item.update.get("UpdateID"))) or by_title.get(item.title)
+            if row is None:
+                # Sin detalle por update: lo confirma el reescaneo posterior
+                outcome[item.key] = (rc == 0, "" if rc == 0 else (err or "").strip() or f"PowerShell devolvió {rc}")
+            elif row.get("Result") == "Failed":
+                outcome[item.key] = (False, "Windows Update informó Failed")
+            else:
+                outcome[item.key] = (True, str(row.get("Result") or ""))
+        return outcome
+
 class WinBackend:
     def __init__(self):
         if os.name != "nt":
             raise RuntimeError("WinBackend solo puede ejecutarse en Windows.")
-        if wmi is None:
+        if importlib.util.find_spec("wmi") is None:
             raise RuntimeError("Falta el módulo 'wmi'. Instala con: pip install wmi")
-        self._drivers: List[Driver] = []
+        # Snapshot anterior: IDs estables y detección de cambios. Copy-on-write porque el escaneo
+        # en segundo plano (warm_start) fusiona mientras el menú recorre la tabla publicada.
+        self._inventory = Inventory(copy_on_write=True)
+        self.last_changes = ChangeSet()
         self._updates: List[dict] = []  # cache de updates (PSWindowsUpdate)
+        self._index = UpdateIndex([])   # índice de títulos, se reconstruye con cada lista de updates
+        # Host(s) PowerShell persistentes: PSWindowsUpdate se importa una sola vez
+        self._pool = PSPool(size=int(os.environ.get("DRIVERAID_PS_POOL", "1") or 1))
+        self._mu_ready = False
+        self._catalog = UpdateCatalogCache(os.path.join(REPORTS_DIR, "update_catalog.json"))
+        self._local_catalog = load_catalog(CATALOG_PATH)
+        # Equipos sin conexión: solo el catálogo local, sin consultar Windows Update
+        self.offline = os.environ.get("DRIVERAID_OFFLINE") == "1" and self._local_catalog is not None
+        # Arranque en caliente: inventario del último snapshot mientras se reescanea en segundo plano
+        self.stale = False
+        self.stale_since: Optional[float] = None
+        self._bg: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        atexit.register(self._pool.close)
+
+    @property
+    def drivers(self) -> DriverTable:
+        return self._inventory.table  # se sustituye entera en cada reconcile, nunca se modifica
 
     # -------------------- Utilidades PowerShell --------------------
-    def _ps(self, script: str) -> Tuple[int, str, str]:
+    def _ps(self, script: str, label: str = "ps") -> Tuple[int, str, str]:
+        with telemetry.span("ps", script=label) as sp:
+            rc, out, err = self._run_ps(script)
+            sp.set(rc=rc, stdout_bytes=len(out or ""))
+        return rc, out, err
+
+    def _run_ps(self, script: str) -> Tuple[int, str, str]:
+        if self._pool is not None:
+            try:
+                return self._pool.run(script, timeout=PS_TIMEOUT)
+            except OSError:
+                # No se pudo lanzar el host persistente: volvemos a un proceso por llamada
+                self._pool = None
         cmd = ["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", script]
         cp = subprocess.run(cmd, capture_output=True, text=True)
         return cp.returncode, cp.stdout, cp.stderr
 
     def _ensure_microsoft_update(self):
-        self._ps("Try { Add-WUServiceManager -MicrosoftUpdate -ErrorAction SilentlyContinue | Out-Null } Catch {}")
+        # El registro de Microsoft Update persiste en el sistema: basta una vez por sesión
+        if self._mu_ready:
+            return
+        rc, _out, _err = self._ps("Try { Add-WUServiceManager -MicrosoftUpdate -Confirm:$false -ErrorAction SilentlyContinue | Out-Null } Catch {}",
+                                  label="microsoft-update")
+        self._mu_ready = rc == 0
 
-    def _get_driver_updates(self) -> List[dict]:
+    def _get_driver_updates(self, force: bool = False) -> List[dict]:
+        """Updates de drivers pendientes; usa el catálogo en disco mientras no caduque."""
+        with telemetry.span("updates.get", force=force) as sp:
+            if not force:
+                cached = self._catalog.load()
+                if cached is not None:
+                    sp.set(source="cache", updates=len(cached))
+                    return cached
+            sp.set(source="online")
+            updates = self._fetch_driver_updates()
+            sp.set(updates=len(updates))
+            return updates
+
+    def _fetch_driver_updates(self) -> List[dict]:
         self._ensure_microsoft_update()
         ps = r"""
 $ErrorActionPreference='SilentlyContinue'
 Import-Module PSWindowsUpdate -ErrorAction SilentlyContinue
 $u = Get-WindowsUpdate -MicrosoftUpdate -Category 'Drivers' -IgnoreReboot -ErrorAction SilentlyContinue
 if ($u) {
-  $u | Select-Object Title,KB,Size,Categories,IsDownloaded,IsInstalled,AutoSelectOnWebSites |
+  $u | Select-Object Title,KB,Size,Categories,IsDownloaded,IsInstalled,AutoSelectOnWebSites,
+    @{n='UpdateID';e={$_.Identity.UpdateID}} |
   ConvertTo-Json -Depth 4
 } else {
   "[]"
 }
 """
-        rc, out, err = self._ps(ps)
+        rc, out, err = self._ps(ps, label="get-windowsupdate")
         try:
-            updates = json.loads(out) if out.strip() else []
+            with telemetry.span("updates.parse", bytes=len(out)):
+                updates = json.loads(out) if out.strip() else []
         except json.JSONDecodeError:
-            updates = []
-        return updates if isinstance(updates, list) else []
+            return []  # no se guarda en caché una respuesta ilegible
+        if isinstance(updates, dict):  # ConvertTo-Json no envuelve un único resultado
+            updates = [updates]
+        if not isinstance(updates, list):
+            return []
+        if rc == 0:
+            self._catalog.store(updates)
+        return updates
+
+    def _download_script(self, ids: List[str]) -> str:
+        """Descarga de varios updates en una sola búsqueda por UpdateID; mismo JSON que la instalación."""
+        id_list = ",".join("'" + str(i).replace("'", "''") + "'" for i in ids)
+        return fr"""
+$ErrorActionPreference='SilentlyContinue'
+Import-Module PSWindowsUpdate -ErrorAction SilentlyContinue
+Get-WindowsUpdate -MicrosoftUpdate -UpdateID @({id_list}) -Download -AcceptAll -IgnoreReboot -ErrorAction SilentlyContinue |
+  {_RESULT_SELECT}
+"""
+
+    def _install_script(self, updates: List[dict]) -> str:
+        """Script de instalación dirigido por UpdateID (sin volver a buscar todo el catálogo).
+
+        Emite un JSON con UpdateID/Title/Result por update procesado.
+        """
+        ids = [u.get("UpdateID") for u in updates if u.get("UpdateID")]
+        if ids and len(ids) == len(updates):
+            id_list = ",".join("'" + str(i).replace("'", "''") + "'" for i in ids)
+            return fr"""
+$ErrorActionPreference='SilentlyContinue'
+Import-Module PSWindowsUpdate -ErrorAction SilentlyContinue
+Get-WindowsUpdate -MicrosoftUpdate -UpdateID @({id_list}) -Install -AcceptAll -IgnoreReboot -ErrorAction SilentlyContinue |
+  {_RESULT_SELECT}
+"""
+        # Catálogo sin identidad (p. ej. caché antigua): se resuelve por título
+        titles = ",".join("'" + u.get("Title", "").replace("'", "''") + "'" for u in updates)
+        return fr"""
+$ErrorActionPreference='SilentlyContinue'
+Import-Module PSWindowsUpdate -ErrorAction SilentlyContinue
+$t = @({titles})
+$u = Get-WindowsUpdate -MicrosoftUpdate -Category 'Drivers' -IgnoreReboot | Where-Object {{ $t -contains $_.Title }}
+if ($u) {{
+  Install-WindowsUpdate -Updates $u -AcceptAll -IgnoreReboot -ErrorAction SilentlyContinue |
+    {_RESULT_SELECT}
+}}
+"""
 
     # -------------------- Inventario --------------------
-    def scan(self) -> List[Driver]:
-        c = wmi.WMI()
-        items: List[Driver] = []
-        idx = 1
-        for d in c.Win32_PnPSignedDriver():
-            dev = getattr(d, "DeviceName", None) or getattr(d, "FriendlyName", "") or ""
-            inst_ver = getattr(d, "DriverVersion", "") or ""
-            prov = getattr(d, "DriverProviderName", "") or ""
-            hwid = ""
-            try:
-                hw = getattr(d, "HardwareID", None)
-                if hw:
-                    hwid = ", ".join(hw)
-            except Exception:
-                pass
-
-            items.append(Driver(
-                id=idx,
-                device=str(dev),
-                provider=str(prov),
-                version_installed=str(inst_ver),
-                version_latest="",
-                hardware_id=hwid
-            ))
-            idx += 1
-
-        self._drivers = items
-
-        self._updates = self._get_driver_updates()
-        titles = [u.get("Title", "") for u in self._updates]
-
-        for drv in self._drivers:
-            drv.refresh_status()
-            low_dev = drv.device.lower() if drv.device else ""
-            low_prov = drv.provider.lower() if drv.provider else ""
-            if any((low_dev and low_dev in t.lower()) or (low_prov and low_prov in t.lower()) for t in titles):
-                drv.status = "Desactualizado"
-            else:
-                if not self._updates:
-                    drv.status = "Actualizado"
-            drv.refresh_status()
+    def _iter_drivers(self, instance_ids: Optional[List[str]] = None) -> Iterator[Driver]:
+        """Drivers de Win32_PnPSignedDriver según llegan (consulta proyectada, sin materializar)."""
+        _wmi()  # mismo mensaje de error si falta pywin32/wmi
+        import win32com.client
+        svc = win32com.client.GetObject(r"winmgmts:{impersonationLevel=impersonate}!\\.\root\cimv2")
+        if instance_ids is None:
+            queries = [_WQL_DRIVERS]
+        else:
+            queries = [_WQL_DRIVERS + " WHERE " + " OR ".join("DeviceID = " + _wql_string(i)
+                                                               for i in instance_ids[n:n + _WQL_CHUNK])
+                       for n in range(0, len(instance_ids), _WQL_CHUNK)]
+        for wql in queries:
+            for obj in svc.ExecQuery(wql, "WQL", _WQL_FLAGS):
+                yield driver_from_wmi(obj)
+
+    def _query_drivers(self, instance_ids: Optional[List[str]] = None) -> List[Driver]:
+        """Lee Win32_PnPSignedDriver completo, o solo las instancias indicadas."""
+        with telemetry.span("wmi.enum", partial=instance_ids is not None) as sp:
+            items: List[Driver] = list(self._iter_drivers(instance_ids))
+            sp.set(rows=len(items))
+        return items
+
+    def warm_start(self, path: str = SNAPSHOT_PATH, refresh: bool = False) -> bool:
+        """Carga el último inventario guardado (marcado como 'stale') y lanza un escaneo en segundo plano.
+
+        Devuelve True si había un snapshot válido; si no, el escaneo en segundo plano es el primero.
+        Con 'refresh' ese escaneo ignora el catálogo de updates en disco y busca online.
+        """
+        snap = load_snapshot(path)
+        if snap is not None:
+            with telemetry.span("snapshot.load", rows=len(snap)), snap:
+                self._inventory.restore(snap.records())
+                self._updates = snap.updates
+                self._index = UpdateIndex(self._updates)
+                self.stale, self.stale_since = True, snap.taken_at
+        # La acción en curso se pasa al hilo: sus spans no deben contarse en la próxima opción del menú
+        self._bg = threading.Thread(target=self._background_scan, args=(telemetry.current(), refresh),
+                                    name="warm-rescan", daemon=True)
+        self._bg.start()
+        return snap is not None
+
+    def _background_scan(self, parent: Optional[telemetry.Span] = None, refresh: bool = False):
+        try:
+            import pythoncom  # WMI (COM) necesita inicializarse en cada hilo
+            pythoncom.CoInitialize()
+        except ImportError:
+            pythoncom = None
+        try:
+            with telemetry.span("scan.background", parent=parent):
+                self._scan(refresh)
+        except Exception as e:
+            # Se sigue mostrando el snapshot; el próximo scan() lo reintenta en primer plano
+            log.warning("Escaneo en segundo plano fallido: %s", e)
+        finally:
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
 
-        return self._drivers
+    def wait_background(self, timeout: Optional[float] = None) -> bool:
+        """Espera al escaneo en segundo plano; True si ya no hay ninguno en curso."""
+        bg = self._bg
+        if bg is not None and bg is not threading.current_thread():
+            bg.join(timeout)
+            if bg.is_alive():
+                return False
+            self._bg = None
+        return True
+
+    def scan(self, refresh: bool = False) -> DriverTable:
+        """Inventario completo. 'refresh' fuerza una búsqueda online aunque el catálogo esté vigente."""
+        if self._bg is not None:
+            self.wait_background()
+            if not refresh and not self.stale:
+                return self.drivers  # el escaneo en segundo plano acaba de refrescarlo
+        return self._scan(refresh)
+
+    def _scan(self, refresh: bool = False) -> DriverTable:
+        for _ in self._scan_iter(refresh):
+            pass
+        return self.drivers
+
+    def scan_iter(self, refresh: bool = False) -> Iterator[Driver]:
+        """Escaneo en tubería: entrega cada driver según lo devuelve WMI mientras Windows Update
+        busca en paralelo; al agotarse clasifica, reconcilia y guarda el snapshot como scan().
+
+        Los drivers entregados aún no tienen estado ni ID (los asigna la clasificación final).
+        Si un escaneo en segundo plano acaba de refrescar el inventario, no entrega nada.
+        """
+        if self._bg is not None:
+            self.wait_background()
+            if not refresh and not self.stale:
+                return
+        yield from self._scan_iter(refresh)
 
-    def outdated(self) -> List[Driver]:
-        if not self._drivers:
+    def _scan_iter(self, refresh: bool) -> Iterator[Driver]:
+        fetch = None if self.offline else (lambda: self._get_driver_updates(force=refresh))
+        pipe = PipelinedScan(self._iter_drivers, fetch)
+        parent = telemetry.current()
+        yield from pipe  # sin spans abiertos mientras el consumidor tiene el control
+        telemetry.record("wmi.enum", pipe.enum_s * 1000, parent=parent, partial=False, pipelined=True,
+                         rows=len(pipe.drivers))
+        with telemetry.span("scan.pipeline", rows=len(pipe.drivers)) as sp:
+            updates = pipe.wait_updates()
+            sp.set(enum_s=round(pipe.enum_s, 3), updates_s=round(pipe.updates_s, 3))
+            items = pipe.drivers
+            index = UpdateIndex(updates or [])
+            classify(items, updates, index, self._local_catalog)
+            with self._lock:
+                self._updates, self._index = updates or [], index
+                self.last_changes = self._inventory.reconcile(items)
+                self.stale, self.stale_since = False, None
+        self._save_snapshot()
+
+    def _save_snapshot(self):
+        try:
+            with telemetry.span("snapshot.save", rows=len(self.drivers)):
+                write_snapshot(SNAPSHOT_PATH, self.drivers, self._updates, time.time())
+        except OSError as e:
+            # Otro proceso puede tener el archivo mapeado (Windows): el próximo escaneo lo reintenta
+            log.warning("No se pudo guardar el snapshot del inventario: %s", e)
+
+    def rescan(self, driver_ids: Optional[List[int]] = None) -> ChangeSet:
+        """Reescaneo incremental: solo vuelve a leer los drivers indicados (p. ej. tras instalar).
+
+        La lista de updates sí se vuelve a consultar (sin caché), porque es lo que cambia al instalar.
+        """
+        self.wait_background()
+        if driver_ids is None or not self.drivers:
+            self.scan()
+            return self.last_changes
+        keys, instances = set(), []
+        for i in driver_ids:
+            k = self._inventory.key_of(i)
+            d = self._inventory.get(i)
+            if k is None:
+                continue
+            keys.add(k)
+            if d.instance_id:
+                instances.append(d.instance_id)
+        if len(instances) < len(keys):
+            # Sin DeviceID no hay forma de filtrar en WMI: reescaneo completo
             self.scan()
-        return [d for d in self._drivers if d.status == "Desactualizado"]
+            return self.last_changes
+        items = self._query_drivers(instances)
+        updates = None if self.offline else self._get_driver_updates(force=True)
+        index = UpdateIndex(updates or [])
+        classify(items, updates, index, self._local_catalog)
+        with self._lock:
+            self._updates, self._index = updates or [], index
+            self.last_changes = self._inventory.reconcile(items, keys=keys)
+        self._save_snapshot()
+        return self.last_changes
+
+    def rescan_devices(self, instance_ids: List[str], refresh_updates: bool = False) -> ChangeSet:
+        """Reescaneo por DeviceID PnP (p. ej. eventos de conexión): sirve también para dispositivos nuevos.
+
+        Sin 'refresh_updates' se usa el catálogo en caché: un dispositivo conectado no cambia
+        la lista de updates lo bastante como para justificar una búsqueda online.
+        """
+        self.wait_background()
+        instances = [i for i in instance_ids if i]
+        keys = {i.lower() for i in instances}
+        items = self._query_drivers(instances)
+        updates = None if self.offline else self._get_driver_updates(force=refresh_updates)
+        index = UpdateIndex(updates or [])
+        classify(items, updates, index, self._local_catalog)
+        with self._lock:
+            self._updates, self._index = updates or [], index
+            self.last_changes = self._inventory.reconcile(items, keys=keys)
+        self._save_snapshot()
+        return self.last_changes
+
+    def outdated(self) -> DriverView:
+        if not self.drivers:
+            self.scan()
+        return self.drivers.outdated()
 
     # -------------------- Actualización (Online) --------------------
-    def update_all(self) -> Tuple[int, int]:
+    def update_all(self, on_progress: Optional[Callable] = None,
+                   max_downloads: int = 1, batch_size: int = 4) -> List[InstallResult]:
+        """Instala los updates de todos los drivers desactualizados; devuelve el resultado por driver.
+
+        El plan se resuelve una sola vez contra el índice; los updates se descargan en una sola
+        sesión y se instalan en lotes, y al final un reescaneo incremental confirma cada instalación.
+        En Windows la descarga es en serie (WUInstaller): 'max_downloads' > 1 no tiene efecto.
+        """
+        if max_downloads > 1:
+            log.warning("Windows Update descarga en una sola sesión: se ignora max_downloads=%d",
+                        max_downloads)
+        self.wait_background()  # no se instala a partir de un inventario antiguo
+        pending = list(self.outdated())
+        if not pending:
+            return []
         self._ensure_microsoft_update()
-        ps = r"""
-$ErrorActionPreference='SilentlyContinue'
-Import-Module PSWindowsUpdate -ErrorAction SilentlyContinue
-Install-WindowsUpdate -MicrosoftUpdate -Category 'Drivers' -AcceptAll -IgnoreReboot -ErrorAction SilentlyContinue | Out-Null
-"""
-        _rc, _out, _err = self._ps(ps)
-        before = len(self.outdated())
-        self.scan()
-        after = len(self.outdated())
-        updated = max(before - after, 0)
-        skipped = len(self._drivers) - updated
-        return updated, skipped
+        plan, skipped = build_plan(pending, self._index.match_all(pending))
+        results = InstallScheduler(WUInstaller(self, plan), max_downloads, batch_size, on_progress).run(plan)
+        self._catalog.invalidate()
+        self.rescan([d.id for d in pending])
+        return verify(results + skipped, self.drivers)
 
     def update_one(self, driver_id: int) -> bool:
-        if not self._drivers:
+        self.wait_background()
+        if not self.drivers:
             self.scan()
-        target = next((d for d in self._drivers if d.id == driver_id), None)
+        target = self._inventory.get(driver_id)
         if not target:
             return False
 
         if not self._updates:
             self._updates = self._get_driver_updates()
+            self._index = UpdateIndex(self._updates)
 
-        title_match = None
-        for u in self._updates:
-            title = u.get("Title", "")
-            if target.device and target.device.lower() in title.lower():
-                title_match = title; break
-            if target.provider and target.provider.lower() in title.lower():
-                title_match = title; break
-
-        if not title_match:
+        upd = self._index.match(target)
+        if not upd:
             return False
-
-        safe = title_match.replace('"', '`"')
-        ps = fr"""
-$ErrorActionPreference='SilentlyContinue'
-Import-Module PSWindowsUpdate -ErrorAction SilentlyContinue
-$u = Get-WindowsUpdate -MicrosoftUpdate -Category 'Drivers' -IgnoreReboot | Where-Object {{ $_.Title -like "*{safe}*" }}
-if ($u) {{
-  Install-WindowsUpdate -Updates $u -AcceptAll -IgnoreReboot -ErrorAction SilentlyContinue | Out-Null
-}}
-"""
-        _rc, _out, _err = self._ps(ps)
-        self.scan()
+        with telemetry.span("install", updates=1):
+            _rc, _out, _err = self._ps(self._install_script([upd]), label="install")
+        self._catalog.invalidate()
+        self.rescan([driver_id])
         return True
 
     # -------------------- Instalación OFFLINE (pnputil + .INF) --------------------
     def install_offline(self, folder: str) -> Tuple[int, str]:
+        """Instala con pnputil solo los INF que aplican al hardware presente y son más nuevos."""
         folder_abs = os.path.abspath(folder)
         if not os.path.isdir(folder_abs):
             return -1, f"La carpeta no existe: {folder_abs}"
-        win_path = folder_abs.replace("/", "\\")
-        pattern = rf"{win_path}\*.inf"
-        cmd = ["pnputil.exe", "/add-driver", pattern, "/subdirs", "/install"]
+        repo = DriverRepository(folder_abs, os.path.join(REPORTS_DIR, "driver_index.json"))
         try:
-            cp = subprocess.run(cmd, capture_output=True, text=True)
-            return cp.returncode, (cp.stdout or "") + (cp.stderr or "")
-        except Exception as e:
-            return -1, f"Error ejecutando pnputil: {e}"
+            packages = repo.refresh()
+        except OSError as e:
+            return -1, f"Error indexando {folder_abs}: {e}"
+        # Sin conexión no tiene sentido consultar Windows Update: basta el inventario WMI
+        installed = self.drivers or self._query_drivers()
+        matches = repo.match(installed)
+        lines = [f"{len(packages)} INF en el repositorio ({repo.parsed} parseados), {len(matches)} aplicables."]
+        if not matches:
+            return 0, lines[0] + "\nNingún paquete es más nuevo que lo instalado en este equipo."
+
+        rc = 0
+        for m in matches:
+            inf = m.package.path.replace("/", "\\")
+            lines.append(f"\n> {m.driver.device}: {m.driver.version_installed} -> {m.package.version} ({inf})")
+            # Paquetes de la caché: nada llega a pnputil si no coincide con lo descargado y verificado
+            problems = check_package(m.package.path, folder_abs)
+            if problems:
+                lines.append("Omitido: el paquete no supera la verificación de integridad (" +
+                             "; ".join(problems[:5]) + ")")
+                rc = rc or -1
+                continue
+            cmd = ["pnputil.exe", "/add-driver", inf, "/install"]
+            try:
+                cp = subprocess.run(cmd, capture_output=True, text=True)
+            except Exception as e:
+                return -1, "\n".join(lines) + f"\nError ejecutando pnputil: {e}"
+            lines.append((cp.stdout or "") + (cp.stderr or ""))
+            if cp.returncode not in (0, 3010) and rc == 0:  # 3010: instalado, requiere reinicio
+                rc = cp.returncode
+        return rc, "\n".join(lines)
 
     # -------------------- Reportes / Links --------------------
-    def export_report(self, folder: str) -> Tuple[str, str]:
-        ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-        html_path = os.path.join(folder, f"DriverAid-Report-{ts}.html")
-        csv_path = os.path.join(folder, f"DriverAid-Report-{ts}.csv")
-
-        data = self._drivers or self.scan()
-
-        rows = []
-        for d in data:
-            rows.append(
-                f"<tr><td>{d.id}</td><td>{d.device}</td><td>{d.provider}</td>"
-                f"<td>{d.version_installed}</td><td>{d.version_latest}</td>"
-                f"<td>{d.status}</td><td><a href='{d.manual_link}' target='_blank'>Catálogo</a></td></tr>"
-            )
-        html = f"""<html><head><meta charset="utf-8"><title>DriverAid Report</title>
-<style>body{{font-family:Segoe UI, Arial}} table{{border-collapse:collapse;width:100%}}
-th,td{{border:1px solid #ddd;padding:8px}} th{{background:#f2f2f2}}</style></head>
-<body><h1>DriverAid - Reporte (Windows Real)</h1>
-<p>Fecha: {datetime.now()}</p>
-<table><thead><tr>
-<th>ID</th><th>Dispositivo</th><th>Proveedor</th><th>Instalada</th><th>Última</th><th>Estado</th><th>Link</th>
-</tr></thead><tbody>{''.join(rows)}</tbody></table></body></html>"""
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(html)
-
-        with open(csv_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["ID", "Dispositivo", "Proveedor", "VersionInstalada", "VersionLatest", "Estado", "Link"])
-            for d in data:
-                writer.writerow([d.id, d.device, d.provider, d.version_installed, d.version_latest, d.status, d.manual_link])
-
-        return html_path, csv_path
+    def export_report(self, folder: str) -> Tuple[str, str, str]:
+        data = self.drivers or self.scan()
+        return export_report(data, folder, "Windows Real")
 
     def manual_links(self):
-        if not self._drivers:
+        if not self.drivers:
             self.scan()
-        return [(d.id, d.device, d.manual_link) for d in self._drivers]
+        return [(d.id, d.device, d.manual_link) for d in self.drivers]